@@ -0,0 +1,227 @@
+# backend/app/catalog.py
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from app.propagate import Re, parse_tles, tle_line2_to_elements, _parse_tle_epoch, _satellite_id
+from app.tle_parser import validate_tle
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS satellites (
+    catalog_id INTEGER PRIMARY KEY,  -- catalog number, line 1 columns 3-7 (Alpha-5 decoded)
+    name TEXT NOT NULL,
+    line1 TEXT NOT NULL,
+    line2 TEXT NOT NULL,
+    tle_key TEXT NOT NULL,
+    epoch REAL NOT NULL,          -- unix seconds
+    a REAL NOT NULL, e REAL NOT NULL, i REAL NOT NULL,
+    raan REAL NOT NULL, argp REAL NOT NULL, m REAL NOT NULL,
+    rx REAL NOT NULL, ry REAL NOT NULL, rz REAL NOT NULL,
+    vx REAL NOT NULL, vy REAL NOT NULL, vz REAL NOT NULL,
+    perigee_km REAL NOT NULL,
+    apogee_km REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+DROP INDEX IF EXISTS satellites_name;
+DROP INDEX IF EXISTS satellites_band;
+"""
+
+_COLUMNS = ("catalog_id", "name", "line1", "line2", "tle_key", "epoch", "a", "e", "i", "raan", "argp", "m",
+            "rx", "ry", "rz", "vx", "vy", "vz", "perigee_km", "apogee_km", "updated_at")
+
+# a stored TLE is only replaced by one with the same or a newer epoch
+_UPSERT = (
+    f"INSERT INTO satellites ({', '.join(_COLUMNS)}) VALUES ({', '.join('?' * len(_COLUMNS))}) "
+    f"ON CONFLICT (catalog_id) DO UPDATE SET "
+    + ", ".join(f"{col} = excluded.{col}" for col in _COLUMNS[1:])
+    + " WHERE excluded.epoch >= satellites.epoch"
+)
+
+
+# Alpha-5 leading letters for catalog numbers 100000-339999 (I and O are not used)
+_ALPHA5 = "ABCDEFGHJKLMNPQRSTUVWXYZ"
+
+
+def normalize_id(value: Any) -> int:
+    """
+    Catalog number as an int: "025544", " 25544" and 25544 are the same
+    object, and Alpha-5 ids ("A0001") decode to their number (100001).
+    Raises ValueError for anything else.
+    """
+    if isinstance(value, (int, np.integer)) and not isinstance(value, bool):
+        return int(value)
+    text = str(value).strip().upper()
+    if len(text) == 5 and text[0] in _ALPHA5 and text[1:].isdigit():
+        return (10 + _ALPHA5.index(text[0])) * 10000 + int(text[1:])
+    if not text.isdigit():
+        raise ValueError(f"invalid catalog id {value!r}")
+    return int(text)
+
+
+def catalog_id(line1: str) -> int:
+    return normalize_id(line1[2:7])
+
+
+class Catalog:
+    """
+    Persistent TLE catalog in SQLite. Upserts store the lines together with
+    what parse_tles would compute from them (epoch, elements, initial state)
+    and the perigee/apogee altitudes, so requests that reference catalog
+    objects skip TLE parsing entirely: select() hands out parse_tles-style
+    records (plus catalog_id, line1/line2 and the altitude band) that the
+    propagators accept as they are. The records are loaded into memory once
+    and reloaded after the next upsert; select() filters that in-memory
+    copy, so the table has no secondary indexes.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        if path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self._records: Optional[Dict[int, Dict[str, Any]]] = None
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def upsert(self, tles: List[Dict[str, Any]], validate_checksums: bool = True) -> Dict[str, Any]:
+        """
+        Insert or update {name, line1, line2} dicts in one transaction, keyed by
+        catalog number. Returns counts of stored and stale (older epoch than
+        the stored TLE) records, and per-item `errors` for unusable ones.
+        """
+        errors: List[Dict[str, Any]] = []
+        latest: Dict[int, Dict[str, Any]] = {}
+        for idx, t in enumerate(tles):
+            line1, line2 = (t.get("line1") or "").strip(), (t.get("line2") or "").strip()
+            problem = validate_tle(line1, line2, validate_checksums)
+            if problem is None and _parse_tle_epoch(line1) is None:
+                problem = "unparsable epoch"
+            if problem is None:
+                try:
+                    tle_line2_to_elements(line2)
+                except ValueError as e:
+                    problem = f"unparsable elements: {e}"
+            if problem:
+                errors.append({"index": idx, "name": t.get("name"), "error": problem})
+                continue
+            # a later duplicate in the same batch wins
+            latest[catalog_id(line1)] = {"name": t.get("name") or catalog_id(line1), "line1": line1, "line2": line2}
+        valid = list(latest.values())
+        records = parse_tles(valid)
+        now = datetime.now(timezone.utc).timestamp()
+        rows = []
+        for t, rec in zip(valid, records):
+            a, e = rec["elements"][0], rec["elements"][1]
+            rows.append((catalog_id(t["line1"]), t["name"], t["line1"], t["line2"], rec["key"],
+                         rec["epoch"].timestamp(), *rec["elements"], *rec["r0"].tolist(), *rec["v0"].tolist(),
+                         a * (1 - e) - Re, a * (1 + e) - Re, now))
+        with self._lock:
+            before = self._conn.total_changes
+            with self._conn:
+                self._conn.executemany(_UPSERT, rows)
+            stored = self._conn.total_changes - before
+            self._records = None
+        return {"received": len(tles), "stored": stored, "stale": len(rows) - stored, "errors": errors}
+
+    def delete(self, ids: Iterable[Any]) -> int:
+        keys = []
+        for x in ids:
+            try:
+                keys.append((normalize_id(x),))
+            except ValueError:
+                pass  # can't be in the catalog
+        with self._lock:
+            with self._conn:
+                deleted = self._conn.executemany("DELETE FROM satellites WHERE catalog_id = ?", keys).rowcount
+            self._records = None
+        return deleted
+
+    def _load(self) -> Dict[int, Dict[str, Any]]:
+        with self._lock:
+            if self._records is None:
+                rows = self._conn.execute(
+                    f"SELECT {', '.join(_COLUMNS)} FROM satellites ORDER BY catalog_id").fetchall()
+                self._records = {rec["catalog_id"]: rec for rec in map(_record, rows)}
+            return self._records
+
+    def __len__(self) -> int:
+        return len(self._load())
+
+    def select(self, ids: Optional[Iterable[Any]] = None, name_prefix: Optional[str] = None,
+               min_alt_km: Optional[float] = None, max_alt_km: Optional[float] = None,
+               limit: Optional[int] = None) -> Tuple[List[Dict[str, Any]], List[Any]]:
+        """
+        Records for the given catalog ids (in that order; normalize_id spellings)
+        or the whole catalog, narrowed by name prefix (case-insensitive) and by
+        an altitude band the orbit's perigee-apogee range must overlap. Returns
+        (records, ids not in the catalog, as given).
+        """
+        records = self._load()
+        if ids is not None:
+            missing, chosen = [], []
+            for x in ids:
+                try:
+                    key = normalize_id(x)
+                except ValueError:
+                    key = None
+                if key in records:
+                    chosen.append(records[key])
+                else:
+                    missing.append(x)
+        else:
+            missing, chosen = [], records.values()
+        prefix = name_prefix.upper() if name_prefix else None
+        out = []
+        for rec in chosen:
+            if prefix is not None and not rec["name"].upper().startswith(prefix):
+                continue
+            if min_alt_km is not None and rec["apogee_km"] < min_alt_km:
+                continue
+            if max_alt_km is not None and rec["perigee_km"] > max_alt_km:
+                continue
+            out.append(rec)
+            if limit is not None and len(out) >= limit:
+                break
+        return out, missing
+
+
+def _record(row) -> Dict[str, Any]:
+    values = dict(zip(_COLUMNS, row))
+    r0 = np.array([values["rx"], values["ry"], values["rz"]])
+    v0 = np.array([values["vx"], values["vy"], values["vz"]])
+    # shared between requests, like tle_cache entries
+    r0.setflags(write=False); v0.setflags(write=False)
+    return {
+        "key": values["tle_key"],
+        "epoch": datetime.fromtimestamp(values["epoch"], timezone.utc),
+        "elements": tuple(values[k] for k in ("a", "e", "i", "raan", "argp", "m")),
+        "r0": r0,
+        "v0": v0,
+        "name": values["name"],
+        "id": _satellite_id(values["name"], values["tle_key"]),
+        "catalog_id": normalize_id(values["catalog_id"]),
+        "line1": values["line1"],
+        "line2": values["line2"],
+        "perigee_km": values["perigee_km"],
+        "apogee_km": values["apogee_km"],
+    }
+
+
+def describe(rec: Dict[str, Any]) -> Dict[str, Any]:
+    # JSON view of a catalog record
+    return {
+        "catalog_id": rec["catalog_id"],
+        "name": rec["name"],
+        "epoch": rec["epoch"].isoformat(),
+        "perigee_km": rec["perigee_km"],
+        "apogee_km": rec["apogee_km"],
+        "line1": rec["line1"],
+        "line2": rec["line2"],
+    }
@@ -0,0 +1,159 @@
+# backend/app/chebyshev.py
+import os
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.cache import LRUCache
+from app.ephemeris import propagate_to_grid
+
+# Piecewise Chebyshev ephemerides. Time is cut into segments of SEGMENT_S
+# seconds aligned to the unix epoch; on each segment x, y and z are
+# polynomials of degree DEGREE in the segment-normalized time
+# x = 2 (t - start) / SEGMENT_S - 1, fitted by least squares to the RK4 J2
+# positions and velocities at NODES equally spaced times. Velocities are the
+# derivative of the position polynomial.
+DEFAULT_SEGMENT_S = 900.0
+DEFAULT_DEGREE = 12
+
+# Fitted segments: (3, degree + 1) coefficient arrays keyed by
+# (tle key, segment index, segment_s, degree)
+segment_cache = LRUCache(
+    max_entries=int(os.environ.get("CHEBYSHEV_CACHE_MAX_ENTRIES", "200000")),
+    max_bytes=int(os.environ.get("CHEBYSHEV_CACHE_MAX_BYTES", str(128 * 1024 * 1024))),
+    sizeof=lambda coeffs: 128 + coeffs.nbytes,
+)
+
+
+def chebyshev_basis(x, degree: int):
+    # T_k(x) and dT_k/dx for k <= degree, shapes (len(x), degree + 1)
+    x = np.asarray(x, dtype=float)
+    T = np.empty((len(x), degree + 1))
+    dT = np.empty((len(x), degree + 1))
+    T[:, 0], dT[:, 0] = 1.0, 0.0
+    if degree >= 1:
+        T[:, 1], dT[:, 1] = x, 1.0
+    for k in range(2, degree + 1):
+        T[:, k] = 2*x*T[:, k-1] - T[:, k-2]
+        dT[:, k] = 2*T[:, k-1] + 2*x*dT[:, k-1] - dT[:, k-2]
+    return T, dT
+
+
+def _fit_operator(nodes: int, degree: int, segment_s: float):
+    # least-squares operator mapping stacked [positions; velocities * segment_s / 2]
+    # at `nodes` equally spaced times to coefficients
+    T, dT = chebyshev_basis(np.linspace(-1.0, 1.0, nodes), degree)
+    return np.linalg.pinv(np.vstack([T, dT]))
+
+
+def fit_segments(records: List[Dict[str, Any]], first: int, last: int, segment_s: float = DEFAULT_SEGMENT_S,
+                 degree: int = DEFAULT_DEGREE) -> np.ndarray:
+    """
+    Fit segments first..last (inclusive segment indices) for parse_tles-style
+    records in one vectorized propagation over the shared grid. Returns
+    coefficients of shape (records, segments, 3, degree + 1).
+    """
+    nodes = 2 * degree + 1
+    per_seg = nodes - 1  # grid steps per segment; neighbouring segments share a node
+    n_seg = last - first + 1
+    start = datetime.fromtimestamp(first * segment_s, timezone.utc)
+    states = np.empty((len(records), n_seg * per_seg + 1, 6))
+    propagate_to_grid(records, start, segment_s / per_seg, states.shape[1], states)
+    idx = np.arange(n_seg)[:, None] * per_seg + np.arange(nodes)  # (segments, nodes) grid indices
+    r = states[:, idx, :3]                   # (records, segments, nodes, 3)
+    v = states[:, idx, 3:] * (segment_s / 2)  # d/dx = d/dt * segment_s / 2
+    rhs = np.concatenate([r, v], axis=2)     # (records, segments, 2 * nodes, 3)
+    return np.einsum("kn,rsnj->rsjk", _fit_operator(nodes, degree, segment_s), rhs)
+
+
+def evaluate(coeffs, x, segment_s: float):
+    # r (km) and v (km/s) from per-query (Q, 3, degree + 1) coefficients at normalized times x (Q,)
+    T, dT = chebyshev_basis(x, coeffs.shape[-1] - 1)
+    r = np.einsum("qk,qjk->qj", T, coeffs)
+    v = np.einsum("qk,qjk->qj", dT, coeffs) * (2.0 / segment_s)
+    return r, v
+
+
+def segment_of(unix_times, segment_s: float) -> Tuple[np.ndarray, np.ndarray]:
+    # segment index and normalized time within it for unix timestamps
+    t = np.asarray(unix_times, dtype=float)
+    seg = np.floor(t / segment_s).astype(np.int64)
+    return seg, 2.0 * (t - seg * segment_s) / segment_s - 1.0
+
+
+def _runs(segs) -> List[Tuple[int, int]]:
+    # contiguous (first, last) runs of sorted segment indices
+    runs: List[List[int]] = []
+    for seg in sorted(segs):
+        if runs and seg == runs[-1][1] + 1:
+            runs[-1][1] = seg
+        else:
+            runs.append([seg, seg])
+    return [(first, last) for first, last in runs]
+
+
+def segment_coefficients(records: List[Dict[str, Any]], wanted: List[List[int]],
+                         segment_s: float = DEFAULT_SEGMENT_S, degree: int = DEFAULT_DEGREE,
+                         max_age_s: Optional[float] = None,
+                         max_segments: Optional[int] = None) -> List[Dict[int, Any]]:
+    """
+    Coefficients for the segment indices wanted[n] of records[n], from
+    segment_cache where possible. Missing segments are fitted in contiguous
+    runs, each run together for every record missing the same one, then
+    cached; gaps between runs are never fitted. Raises ValueError when a
+    missing segment reaches further than max_age_s from its record's TLE
+    epoch, or when more than max_segments record segments would be fitted.
+    """
+    out: List[Dict[int, Any]] = [dict() for _ in records]
+    todo: Dict[Tuple[int, int], List[int]] = {}
+    fitted_total = 0
+    for n, (rec, segs) in enumerate(zip(records, wanted)):
+        missing = []
+        for seg in set(segs):
+            cached = segment_cache.get((rec["key"], seg, segment_s, degree))
+            if cached is None:
+                missing.append(seg)
+            else:
+                out[n][seg] = cached
+        if not missing:
+            continue
+        if max_age_s is not None:
+            epoch = rec["epoch"].timestamp()
+            reach = max(epoch - min(missing) * segment_s, (max(missing) + 1) * segment_s - epoch)
+            if reach > max_age_s:
+                raise ValueError(f"{rec['name']}: times more than {max_age_s:g} s from the TLE epoch")
+        fitted_total += len(missing)
+        if max_segments is not None and fitted_total > max_segments:
+            raise ValueError(f"More than {max_segments} segments to fit")
+        for run in _runs(missing):
+            todo.setdefault(run, []).append(n)
+    for (first, last), members in todo.items():
+        fitted = fit_segments([records[n] for n in members], first, last, segment_s, degree)
+        for m, n in enumerate(members):
+            for s in range(first, last + 1):
+                coeffs = fitted[m, s - first].copy()  # a view would keep the whole run alive in the cache
+                coeffs.setflags(write=False)
+                segment_cache.put((records[n]["key"], s, segment_s, degree), coeffs)
+                out[n][s] = coeffs
+    return out
+
+
+def evaluate_records(records: List[Dict[str, Any]], which, unix_times, segment_s: float = DEFAULT_SEGMENT_S,
+                     degree: int = DEFAULT_DEGREE, max_age_s: Optional[float] = None,
+                     max_segments: Optional[int] = None):
+    """
+    Positions/velocities for queries (records[which[q]], unix_times[q]);
+    returns r, v arrays of shape (Q, 3). max_age_s / max_segments as for
+    segment_coefficients.
+    """
+    which = np.asarray(which, dtype=np.int64)
+    seg, x = segment_of(unix_times, segment_s)
+    wanted = [[] for _ in records]
+    for n, s in zip(which.tolist(), seg.tolist()):
+        wanted[n].append(s)
+    coeffs = segment_coefficients(records, wanted, segment_s, degree, max_age_s, max_segments)
+    per_query = np.empty((len(which), 3, degree + 1))
+    for q, (n, s) in enumerate(zip(which.tolist(), seg.tolist())):
+        per_query[q] = coeffs[n][s]
+    return evaluate(per_query, x, segment_s)
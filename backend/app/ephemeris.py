@@ -0,0 +1,197 @@
+# backend/app/ephemeris.py
+import glob
+import json
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.propagate import eci_to_geodetic_array, julian_date, propagate_rk4_J2, propagate_rk4_J2_stepper
+from app.trajectory import Trajectory
+
+try:
+    import fcntl
+except ImportError:  # not on POSIX: a single process is assumed
+    fcntl = None
+
+EPHEMERIS_DTYPE = np.float32  # ~0.5 m position resolution at LEO radii
+_CHUNK = 2048  # objects propagated (and held in memory) at a time
+
+
+def grid_start(now: datetime, step_s: float) -> datetime:
+    # first grid time at or before `now`; grids align to multiples of step_s since the unix epoch
+    ts = now.timestamp()
+    return datetime.fromtimestamp(ts - ts % step_s, timezone.utc)
+
+
+def propagate_to_grid(records: List[Dict[str, Any]], start: datetime, step_s: float, count: int, out,
+                      max_step: float = 10.0):
+    """
+    Propagate parse_tles-style records onto the common time grid
+    start + k*step_s (k < count) and write the (r, v) states into `out`
+    ((objects, count, 6) array, e.g. a memmap) in chunks of objects. Each
+    object is first carried from its own epoch to `start` with equal RK4 J2
+    steps of at most `max_step` seconds (per-object step length, one
+    vectorized pass per chunk), then the chunk steps along the shared grid.
+    """
+    offsets = [step_s * k for k in range(count)]
+    age = np.array([(start - rec["epoch"]).total_seconds() for rec in records])
+    # chunks of similar TLE age, so one stale TLE doesn't set the step count for everybody
+    by_age = np.argsort(np.abs(age), kind="stable")
+    for lo in range(0, len(records), _CHUNK):
+        rows = np.sort(by_age[lo:lo + _CHUNK])
+        r = np.array([records[row]["r0"] for row in rows])
+        v = np.array([records[row]["v0"] for row in rows])
+        dt = age[rows][:, None]
+        steps = max(1, int(np.ceil(np.abs(dt).max() / max_step)))
+        r, v = propagate_rk4_J2(r, v, dt, steps=steps)
+        for k, (rk, vk) in enumerate(propagate_rk4_J2_stepper(r, v, offsets, max_step=max_step)):
+            out[rows, k, :3] = rk
+            out[rows, k, 3:] = vk
+
+
+class Ephemeris:
+    """
+    One published ephemeris: read-only memory-mapped (objects, samples, 6)
+    states (r km, v km/s) on the grid start + k*step_s, plus the catalog ids
+    and names of the rows. Every process maps the same file, so the OS page
+    cache holds a single copy however many API workers serve it.
+    """
+
+    def __init__(self, meta: Dict[str, Any], states):
+        self.meta = meta
+        self.states = states
+        self.generation = meta["generation"]
+        self.start = datetime.fromisoformat(meta["start"])
+        self.step_s = float(meta["step_s"])
+        self.count = int(meta["count"])
+        self.ids: List[int] = meta["catalog_ids"]
+        self.names: List[str] = meta["names"]
+        self.rows = {cid: row for row, cid in enumerate(self.ids)}
+
+    @property
+    def end(self) -> datetime:
+        return self.start + timedelta(seconds=self.step_s * (self.count - 1))
+
+    def window(self, t0: datetime, t1: datetime) -> Tuple[int, int]:
+        # sample index range [k0, k1) of grid times inside [t0, t1]
+        k0 = int(np.ceil((t0 - self.start).total_seconds() / self.step_s - 1e-9))
+        k1 = int(np.floor((t1 - self.start).total_seconds() / self.step_s + 1e-9)) + 1
+        if k0 < 0 or k1 > self.count or k0 >= k1:
+            raise ValueError(f"Window {t0.isoformat()} - {t1.isoformat()} is outside the ephemeris "
+                             f"({self.start.isoformat()} - {self.end.isoformat()})")
+        return k0, k1
+
+    def trajectories(self, rows: List[int], k0: int, k1: int, stride: int = 1,
+                     geodetic: bool = False) -> List[Trajectory]:
+        # slice rows/samples out of the mapped file; lat/lon/alt are derived here
+        if not rows:
+            return []
+        order = np.argsort(rows)  # fancy indexing reads a memmap fastest in row order
+        block = np.empty((len(rows), len(range(k0, k1, stride)), 6))
+        block[order] = self.states[np.asarray(rows)[order], k0:k1:stride]
+        t = np.arange(k0, k1, stride) * self.step_s
+        epoch = self.start + timedelta(seconds=float(t[0]))
+        t = t - t[0]
+        lat, lon, alt = eci_to_geodetic_array(block[..., :3], t, julian_date(epoch), geodetic)
+        return [
+            Trajectory(self.ids[row], self.names[row], epoch, t,
+                       block[n, :, :3], block[n, :, 3:], lat[n], lon[n], alt[n])
+            for n, row in enumerate(rows)
+        ]
+
+
+class EphemerisStore:
+    """
+    Directory holding the published ephemeris: `ephemeris-<generation>.npy`
+    state files and `ephemeris.json` describing the current one. A build
+    writes a new state file and then atomically replaces the JSON, so readers
+    never see a half-written file; the previous generation is kept for
+    readers that still map it. Only the process holding `ephemeris.lock`
+    (see acquire_writer) should build.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.meta_path = os.path.join(directory, "ephemeris.json")
+        self._current: Optional[Ephemeris] = None
+        self._stamp = None
+        self._writer_lock = None
+        os.makedirs(directory, exist_ok=True)
+
+    def acquire_writer(self) -> bool:
+        # non-blocking exclusive lock held for the life of the process; it is
+        # released when the process exits, so another worker can take over
+        if self._writer_lock is not None:
+            return True
+        handle = open(os.path.join(self.directory, "ephemeris.lock"), "a+")
+        if fcntl is not None:
+            try:
+                fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                handle.close()
+                return False
+        self._writer_lock = handle
+        return True
+
+    @property
+    def is_writer(self) -> bool:
+        return self._writer_lock is not None
+
+    def build(self, records: List[Dict[str, Any]], start: datetime, step_s: float, count: int,
+              max_age_s: Optional[float] = None) -> Dict[str, Any]:
+        # TLEs more than max_age_s from `start` are left out (listed under "stale"):
+        # their predictions are poor and catching them up costs the most steps
+        stale = []
+        if max_age_s is not None:
+            fresh = [rec for rec in records if abs((start - rec["epoch"]).total_seconds()) <= max_age_s]
+            if len(fresh) < len(records):
+                kept = {id(rec) for rec in fresh}
+                stale = [rec["catalog_id"] for rec in records if id(rec) not in kept]
+            records = fresh
+        generation = int(datetime.now(timezone.utc).timestamp() * 1000)
+        name = f"ephemeris-{generation}.npy"
+        path = os.path.join(self.directory, name)
+        states = np.lib.format.open_memmap(path + ".tmp", mode="w+", dtype=EPHEMERIS_DTYPE,
+                                           shape=(len(records), count, 6))
+        propagate_to_grid(records, start, step_s, count, states)
+        states.flush()
+        del states
+        os.replace(path + ".tmp", path)
+        meta = {
+            "generation": generation,
+            "file": name,
+            "start": start.isoformat(),
+            "step_s": step_s,
+            "count": count,
+            "objects": len(records),
+            "dtype": np.dtype(EPHEMERIS_DTYPE).name,
+            "built_at": datetime.now(timezone.utc).isoformat(),
+            "catalog_ids": [rec["catalog_id"] for rec in records],
+            "names": [rec["name"] for rec in records],
+            "stale": stale,
+        }
+        with open(self.meta_path + ".tmp", "w") as f:
+            json.dump(meta, f)
+        os.replace(self.meta_path + ".tmp", self.meta_path)
+        for old in sorted(glob.glob(os.path.join(self.directory, "ephemeris-*.npy")))[:-2]:
+            os.remove(old)
+        return meta
+
+    def current(self) -> Optional[Ephemeris]:
+        # the published ephemeris, remapped when another process has built a newer one
+        try:
+            stamp = os.stat(self.meta_path).st_mtime_ns
+        except OSError:
+            return None
+        if self._current is not None and self._stamp == stamp:
+            return self._current
+        try:
+            with open(self.meta_path) as f:
+                meta = json.load(f)
+            states = np.load(os.path.join(self.directory, meta["file"]), mmap_mode="r")
+        except (OSError, ValueError):
+            return self._current
+        self._current, self._stamp = Ephemeris(meta, states), stamp
+        return self._current
@@ -0,0 +1,157 @@
+# backend/app/jobs.py
+import asyncio
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+# Job states; done, failed and cancelled are final
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+FINAL_STATES = (DONE, FAILED, CANCELLED)
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+class Job:
+    """
+    One submitted job. Runners report progress by updating `progress` (a plain
+    dict returned as is by the status endpoint) and call check_cancelled() at
+    convenient points, including from worker threads, so cancellation also
+    stops work that runs off the event loop.
+    """
+
+    def __init__(self, kind: str):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.status = QUEUED
+        self.progress: Dict[str, Any] = {}
+        self.result: Any = None
+        self.error: Optional[Any] = None
+        self.created = time.time()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self.cancel_requested = False
+        self._task: Optional[asyncio.Task] = None
+
+    def check_cancelled(self):
+        if self.cancel_requested:
+            raise JobCancelled()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "state": self.status,
+            "progress": dict(self.progress),
+            "error": self.error,
+            "cancel_requested": self.cancel_requested,
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished,
+        }
+
+
+class JobManager:
+    """
+    Bounded asyncio job queue served by `workers` worker tasks on the event
+    loop; runners are coroutines and push their heavy parts to threads or the
+    process pool themselves. At most `max_queued` jobs wait at a time
+    (submit raises JobQueueFull beyond that). Finished jobs, with their
+    results, are kept for `result_ttl_s` seconds after they end, and only the
+    `max_results` most recently finished ones; older ones are dropped first.
+    """
+
+    def __init__(self, workers: int = 2, max_queued: int = 16, result_ttl_s: float = 3600.0,
+                 max_results: int = 64):
+        self.workers = max(1, workers)
+        self.result_ttl_s = result_ttl_s
+        self.max_results = max(0, max_results)
+        self._jobs: Dict[str, Job] = {}
+        self._queue: "asyncio.Queue[tuple]" = asyncio.Queue(maxsize=max(1, max_queued))
+        self._tasks: List[asyncio.Task] = []
+
+    def _start(self):
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    def submit(self, kind: str, runner: Callable[[Job], Awaitable[Any]]) -> Job:
+        self._expire()
+        self._start()
+        job = Job(kind)
+        try:
+            self._queue.put_nowait((job, runner))
+        except asyncio.QueueFull:
+            raise JobQueueFull()
+        self._jobs[job.id] = job
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        self._expire()
+        return self._jobs.get(job_id)
+
+    def list(self) -> List[Job]:
+        self._expire()
+        return list(self._jobs.values())
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        job = self.get(job_id)
+        if job is None or job.status in FINAL_STATES:
+            return job
+        job.cancel_requested = True
+        if job.status == QUEUED:
+            self._finish(job, CANCELLED)  # the worker skips it when dequeued
+        elif job._task is not None:
+            job._task.cancel()
+        return job
+
+    def _finish(self, job: Job, status: str, result: Any = None, error: Any = None):
+        job.status, job.result, job.error = status, result, error
+        job.finished = time.time()
+        self._expire()
+
+    def _expire(self):
+        cutoff = time.time() - self.result_ttl_s
+        finished = sorted((j for j in self._jobs.values() if j.finished is not None), key=lambda j: j.finished)
+        excess = len(finished) - self.max_results
+        for n, job in enumerate(finished):
+            if n < excess or job.finished < cutoff:
+                del self._jobs[job.id]
+
+    async def _worker(self):
+        while True:
+            job, runner = await self._queue.get()
+            try:
+                if job.status != QUEUED:
+                    continue
+                job.status, job.started = RUNNING, time.time()
+                job._task = asyncio.ensure_future(runner(job))
+                try:
+                    result = await job._task
+                except (asyncio.CancelledError, JobCancelled):
+                    if not job.cancel_requested:
+                        raise  # the worker itself is being cancelled
+                    self._finish(job, CANCELLED)
+                except Exception as e:
+                    self._finish(job, FAILED, error=getattr(e, "detail", None) or str(e) or type(e).__name__)
+                else:
+                    self._finish(job, DONE, result=result)
+                finally:
+                    job._task = None
+            finally:
+                self._queue.task_done()
+
+    async def shutdown(self):
+        for job in self._jobs.values():
+            if job.status == RUNNING:
+                job.cancel_requested = True
+                if job._task is not None:
+                    job._task.cancel()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
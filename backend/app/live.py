@@ -0,0 +1,260 @@
+# backend/app/live.py
+import asyncio
+import json
+import math
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.ephemeris import propagate_to_grid
+from app.metrics import stage
+from app.propagate import eci_to_geodetic_array, propagate_rk4_J2
+from app.utils import close_pairs
+
+_MAX_STEP = 10.0  # RK4 step (s), as for /api/propagate
+
+
+class Subscription:
+    """
+    One client's view of a channel: the TLE keys it watches with the id/name
+    to report them under, its alert threshold, and a small outbox of encoded
+    tick messages. A client that can't keep up loses the oldest ticks
+    instead of queueing them.
+    """
+
+    def __init__(self, labels: Dict[str, Tuple[str, str]], threshold_km: float, outbox_size: int = 2):
+        self.labels = labels  # tle key -> (id, name)
+        self.threshold_km = threshold_km
+        self.outbox: "asyncio.Queue[str]" = asyncio.Queue(maxsize=outbox_size)
+        self.dropped = 0
+        # subscriptions with the same signature receive the same encoded message
+        self.signature = (tuple(sorted(labels.items())), threshold_km)
+
+    def deliver(self, text: str):
+        if self.outbox.full():
+            self.outbox.get_nowait()
+            self.dropped += 1
+        self.outbox.put_nowait(text)
+
+
+class Channel:
+    """
+    Shared propagation loop for every subscriber with the same tick interval
+    (and lat/alt convention). Holds the union of the watched objects as
+    (N, 3) r/v arrays at the channel clock `t` (unix seconds) and advances
+    them incrementally, one interval of RK4 J2 steps per tick, instead of
+    integrating from each TLE epoch again. Objects are reference-counted by
+    TLE key, so the cost of a tick depends on the distinct objects, not on
+    the number of subscribers. Each tick also runs the close-pair check on
+    the new states at the largest subscriber threshold.
+
+    Subscriptions change while a tick may be running in a worker thread, so
+    the event loop only queues retain/release; join() and step() apply the
+    queue under the lock in the threadpool, and the object set is never
+    locked or changed on the loop.
+    """
+
+    def __init__(self, interval_s: float, geodetic: bool = False):
+        self.interval_s = interval_s
+        self.geodetic = geodetic
+        now = time.time()
+        self.t = now - now % interval_s
+        self.keys: List[str] = []
+        self.rows: Dict[str, int] = {}
+        self.refs: Dict[str, int] = {}
+        self.r = np.empty((0, 3))
+        self.v = np.empty((0, 3))
+        self.subscribers: List[Subscription] = []
+        self.ticks = 0
+        self._pending: deque = deque()  # (method, args) retain/release queued by the event loop
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    def missing(self, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return list({rec["key"]: rec for rec in records
+                     if rec["key"] in self.refs and rec["key"] not in self.rows}.values())
+
+    def join(self, records: List[Dict[str, Any]]):
+        # worker thread: add the retained objects that have no state yet; catch-up runs outside the lock
+        with self._lock:
+            self._apply_pending()
+            todo = self.missing(records)
+        if todo:
+            t, states = self.catch_up(todo)
+            with self._lock:
+                self._add([rec["key"] for rec in todo], t, states)
+
+    def catch_up(self, records: List[Dict[str, Any]]) -> Tuple[float, np.ndarray]:
+        # states of new objects at the current channel time, integrated from their epochs (slow part of a join)
+        t = self.t
+        states = np.empty((len(records), 1, 6))
+        propagate_to_grid(records, datetime.fromtimestamp(t, timezone.utc), self.interval_s, 1, states,
+                          max_step=_MAX_STEP)
+        return t, states[:, 0]
+
+    def retain(self, keys):
+        self._pending.append((self._retain, (list(keys),)))
+
+    def release(self, keys):
+        self._pending.append((self._release, (list(keys),)))
+
+    def _apply_pending(self):
+        while self._pending:
+            method, args = self._pending.popleft()
+            method(*args)
+
+    def _add(self, keys: List[str], t: float, states: np.ndarray):
+        # join caught-up states; the channel may have ticked since catch_up, so close the gap first
+        new = [n for n, key in enumerate(keys) if key not in self.rows and key in self.refs]
+        if not new:
+            return
+        r, v = states[new, :3], states[new, 3:]
+        if self.t != t:
+            r, v = propagate_rk4_J2(r, v, self.t - t, steps=max(1, math.ceil(abs(self.t - t) / _MAX_STEP)))
+        for n in new:
+            self.rows[keys[n]] = len(self.keys)
+            self.keys.append(keys[n])
+        self.r = np.concatenate([self.r, r])
+        self.v = np.concatenate([self.v, v])
+
+    def _retain(self, keys):
+        for key in keys:
+            self.refs[key] = self.refs.get(key, 0) + 1
+
+    def _release(self, keys):
+        # drop objects nobody watches any more
+        gone = []
+        for key in keys:
+            self.refs[key] -= 1
+            if self.refs[key] == 0:
+                del self.refs[key]
+                gone.append(key)
+        if gone:
+            keep = np.array([key in self.refs for key in self.keys], dtype=bool)
+            self.keys = [key for key in self.keys if key in self.refs]
+            self.rows = {key: row for row, key in enumerate(self.keys)}
+            self.r, self.v = self.r[keep], self.v[keep]
+
+    def step(self, t: float, threshold_km: float) -> Dict[str, Any]:
+        """
+        Apply the queued joins/leaves, advance every object to `t` and return
+        the tick snapshot: keys, r, lat/lon/alt arrays and the close pairs
+        (i, j, d) within threshold_km.
+        """
+        with self._lock:
+            self._apply_pending()
+            with stage("live_tick", objects=len(self.keys), samples=len(self.keys)):
+                dt = t - self.t
+                if len(self.keys) and dt:
+                    self.r, self.v = propagate_rk4_J2(self.r, self.v, dt,
+                                                      steps=max(1, math.ceil(abs(dt) / _MAX_STEP)))
+                self.t = t
+                self.ticks += 1
+                jd = t / 86400.0 + 2440587.5
+                lat, lon, alt = eci_to_geodetic_array(self.r, jd, geodetic=self.geodetic)
+                i, j, d = close_pairs(self.r, threshold_km, inclusive=False)
+                return {"keys": list(self.keys), "rows": dict(self.rows), "r": self.r.copy(),
+                        "lat": lat, "lon": lon, "alt": alt, "pairs": (i, j, d)}
+
+    def publish(self, snap: Dict[str, Any]):
+        # encode once per distinct subscription, then hand the text to every matching subscriber
+        when = datetime.fromtimestamp(self.t, timezone.utc).isoformat()
+        encoded: Dict[Any, str] = {}
+        i, j, d = snap["pairs"]
+        keys, rows = snap["keys"], snap["rows"]
+        for sub in list(self.subscribers):
+            text = encoded.get(sub.signature)
+            if text is None:
+                positions = []
+                for key, (ident, name) in sub.labels.items():
+                    row = rows.get(key)
+                    if row is None:
+                        continue  # still catching up
+                    positions.append({
+                        "id": ident, "name": name, "lat": float(snap["lat"][row]), "lon": float(snap["lon"][row]),
+                        "alt_m": float(snap["alt"][row]), "r_km": snap["r"][row].tolist(),
+                    })
+                alerts = [
+                    {"sat1": sub.labels[keys[a]][1], "sat2": sub.labels[keys[b]][1], "distance_km": float(dist)}
+                    for a, b, dist in zip(i.tolist(), j.tolist(), d.tolist())
+                    if dist < sub.threshold_km and keys[a] in sub.labels and keys[b] in sub.labels
+                ]
+                text = encoded[sub.signature] = json.dumps(
+                    {"type": "tick", "time": when, "tick": self.ticks, "positions": positions, "alerts": alerts})
+            sub.deliver(text)
+
+    async def run(self, run_sync):
+        # tick loop; `run_sync(fn, *args)` runs the numeric work off the event loop
+        next_t = self.t + self.interval_s
+        while self.subscribers:
+            await asyncio.sleep(max(0.0, next_t - time.time()))
+            threshold = max((sub.threshold_km for sub in self.subscribers), default=0.0)
+            snap = await run_sync(self.step, next_t, threshold)
+            self.publish(snap)
+            next_t += self.interval_s
+            if next_t < time.time():  # fell behind: skip the missed ticks rather than bunching them up
+                now = time.time()
+                next_t = now - now % self.interval_s + self.interval_s
+
+
+class LiveFeed:
+    """
+    Registry of live channels keyed by (interval_s, geodetic). subscribe()
+    joins a channel (starting its loop on first use), unsubscribe() leaves it
+    and the loop ends with its last subscriber.
+    """
+
+    def __init__(self, run_sync):
+        self.run_sync = run_sync
+        self.channels: Dict[Tuple[float, bool], Channel] = {}
+
+    async def subscribe(self, records: List[Dict[str, Any]], labels: Dict[str, Tuple[str, str]], interval_s: float,
+                        threshold_km: float, geodetic: bool = False) -> Tuple[Channel, Subscription]:
+        channel = self.channels.get((interval_s, geodetic))
+        if channel is None:
+            channel = self.channels[(interval_s, geodetic)] = Channel(interval_s, geodetic)
+        sub = Subscription(labels, threshold_km)
+        channel.retain(labels)
+        channel.subscribers.append(sub)
+        try:
+            await self.run_sync(channel.join, records)
+        except BaseException:
+            self.unsubscribe(channel, sub)
+            raise
+        if channel._task is None or channel._task.done():
+            channel._task = asyncio.create_task(self._run(channel))
+        return channel, sub
+
+    async def _run(self, channel: Channel):
+        try:
+            await channel.run(self.run_sync)
+        finally:
+            if not channel.subscribers and self.channels.get((channel.interval_s, channel.geodetic)) is channel:
+                del self.channels[(channel.interval_s, channel.geodetic)]
+
+    def unsubscribe(self, channel: Channel, sub: Subscription):
+        if sub in channel.subscribers:
+            channel.subscribers.remove(sub)
+            channel.release(sub.labels)
+
+    def status(self) -> List[Dict[str, Any]]:
+        return [
+            {"interval_s": ch.interval_s, "geodetic": ch.geodetic, "objects": len(ch.keys),
+             "subscribers": len(ch.subscribers), "ticks": ch.ticks,
+             "time": datetime.fromtimestamp(ch.t, timezone.utc).isoformat(),
+             "dropped": sum(sub.dropped for sub in ch.subscribers)}
+            for ch in self.channels.values()
+        ]
+
+    async def shutdown(self):
+        tasks = [ch._task for ch in self.channels.values() if ch._task is not None]
+        for ch in self.channels.values():
+            ch.subscribers.clear()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self.channels.clear()
@@ -1,26 +1,103 @@
 # backend/app/main.py
+import asyncio
+import io
+import json
 import logging
 import os
-from typing import Any, Dict, List, Optional
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
 
-from fastapi import FastAPI, HTTPException, Request, Response, File, UploadFile, Form
+import numpy as np
+from fastapi import FastAPI, HTTPException, Request, Response, File, UploadFile, Form, WebSocket
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel
 
+from app.jobs import Job, JobManager, JobQueueFull
+from app.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, REGISTRY, SCREEN_PAIRS, MetricsMiddleware, stage
+from app.tle_parser import iter_tle_events, iter_upload_chunks, validate_tle
+from app.trajectory import Trajectory
+
 log = logging.getLogger("uvicorn.error")
 
 # Attempt to import your real business logic modules; if they fail,
-# we keep placeholders so the app can start for debugging.
+# we keep placeholders so the app can start for debugging. Each optional
+# subsystem is imported on its own, so a broken one only disables itself.
 propagate_from_tle = None
+propagate_batch = None
+parse_tles = None
+propagate_parsed = None
+cached_trajectories = None
+store_trajectories = None
+tle_cache = None
+trajectory_cache = None
 pairwise_collision_check = None
+close_approach_episodes = None
+PROPAGATION_MODELS = ("rk4",)
+DEFAULT_MODEL = "rk4"
+model_options = None
+eci_to_geodetic_array = None
+julian_date = None
 try:
     # these imports are optional — if they raise, we catch below
-    from app.propagate import propagate_from_tle  # type: ignore
-    from app.utils import pairwise_collision_check  # type: ignore
+    from app.propagate import (  # type: ignore
+        propagate_from_tle, propagate_batch, parse_tles, propagate_parsed,
+        cached_trajectories, store_trajectories, tle_cache, trajectory_cache,
+        PROPAGATION_MODELS, DEFAULT_MODEL, model_options, eci_to_geodetic_array, julian_date,
+    )
+    from app.utils import pairwise_collision_check, close_approach_episodes  # type: ignore
 except Exception as e:
     log.warning("Optional import failed at startup: %s", e)
     propagate_from_tle = None
+    propagate_batch = None
+    parse_tles = None
+    propagate_parsed = None
+    cached_trajectories = None
+    store_trajectories = None
+    tle_cache = None
+    trajectory_cache = None
+    model_options = None
+    eci_to_geodetic_array = None
+    julian_date = None
     pairwise_collision_check = None
+    close_approach_episodes = None
+
+try:
+    from app.catalog import (Catalog, catalog_id as tle_catalog_id, describe as catalog_entry,  # type: ignore
+                             normalize_id as catalog_number)
+except Exception as e:
+    log.warning("Catalog unavailable: %s", e)
+    Catalog = tle_catalog_id = catalog_entry = catalog_number = None
+
+try:
+    from app.ephemeris import EphemerisStore, grid_start as ephemeris_grid_start, propagate_to_grid  # type: ignore
+except Exception as e:
+    log.warning("Ephemeris unavailable: %s", e)
+    EphemerisStore = ephemeris_grid_start = propagate_to_grid = None
+
+try:
+    from app.chebyshev import evaluate_records, segment_coefficients, segment_of  # type: ignore
+    from app.chebyshev import DEFAULT_SEGMENT_S, DEFAULT_DEGREE, segment_cache  # type: ignore
+except Exception as e:
+    log.warning("Chebyshev ephemerides unavailable: %s", e)
+    evaluate_records = segment_coefficients = segment_of = None
+    DEFAULT_SEGMENT_S = DEFAULT_DEGREE = segment_cache = None
+
+try:
+    from app.screening import ScreeningSession  # type: ignore
+except Exception as e:
+    log.warning("Screening sessions unavailable: %s", e)
+    ScreeningSession = None
+
+try:
+    from app.live import LiveFeed  # type: ignore
+except Exception as e:
+    log.warning("Live feed unavailable: %s", e)
+    LiveFeed = None
 
 app = FastAPI(title="LEO Propagation & Collision API", version="0.1.0")
 
@@ -44,6 +121,20 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing", "X-Profile"],
+)
+
+# Request and per-stage metrics, served at /metrics. SERVER_TIMING=1 adds a
+# Server-Timing header with the stage breakdown to every response. Setting
+# PROFILE_DIR lets single requests opt in to the sampling profiler with an
+# `X-Profile: 1` header; their collapsed stacks are written there when they
+# take at least PROFILE_MIN_S seconds (sampled every PROFILE_INTERVAL_S).
+app.add_middleware(
+    MetricsMiddleware,
+    server_timing=os.environ.get("SERVER_TIMING", "0").lower() in ("1", "true", "yes"),
+    profile_dir=os.environ.get("PROFILE_DIR") or None,
+    profile_min_s=float(os.environ.get("PROFILE_MIN_S", "0")),
+    profile_interval_s=float(os.environ.get("PROFILE_INTERVAL_S", "0.005")),
 )
 
 
@@ -53,12 +144,97 @@ def _startup_log_routes():
     log.info("Registered routes: %s", routes)
 
 
+# Propagation worker pool. PROPAGATION_WORKERS > 0 spreads large requests over
+# that many processes; 0 (default) propagates in a thread so the event loop
+# still stays responsive. Requests are split into chunks of at least
+# PROPAGATION_MIN_CHUNK satellites so small requests don't pay IPC overhead.
+PROPAGATION_WORKERS = int(os.environ.get("PROPAGATION_WORKERS", "0"))
+PROPAGATION_MIN_CHUNK = max(1, int(os.environ.get("PROPAGATION_MIN_CHUNK", "64")))
+_process_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _get_process_pool() -> Optional[ProcessPoolExecutor]:
+    global _process_pool
+    if PROPAGATION_WORKERS <= 0:
+        return None
+    if _process_pool is None:
+        _process_pool = ProcessPoolExecutor(max_workers=PROPAGATION_WORKERS)
+        log.info("Started propagation pool with %d workers", PROPAGATION_WORKERS)
+    return _process_pool
+
+
+@app.on_event("shutdown")
+def _shutdown_process_pool():
+    global _process_pool
+    if _process_pool is not None:
+        _process_pool.shutdown(cancel_futures=True)
+        _process_pool = None
+
+
+# Server-side TLE catalog (SQLite file at CATALOG_DB), so clients can upsert
+# TLEs once and reference them by catalog number or filter afterwards.
+CATALOG_DB = os.environ.get("CATALOG_DB", "catalog.db")
+_catalog = None
+
+
+def _get_catalog():
+    global _catalog
+    if Catalog is None:
+        raise HTTPException(status_code=503, detail="Catalog store unavailable")
+    if _catalog is None:
+        _catalog = Catalog(CATALOG_DB)
+        log.info("Opened TLE catalog at %s", CATALOG_DB)
+    return _catalog
+
+
+@app.on_event("shutdown")
+def _close_catalog():
+    global _catalog
+    if _catalog is not None:
+        _catalog.close()
+        _catalog = None
+
+
 # Simple health endpoint
 @app.get("/health")
 def health():
     return {"status": "ok"}
 
 
+@app.get("/api/cache/stats")
+def cache_stats():
+    # counters of this API process; pool workers receive already-parsed records
+    return {
+        "status": "ok",
+        "tle": tle_cache.stats() if tle_cache is not None else None,
+        "trajectory": trajectory_cache.stats() if trajectory_cache is not None else None,
+        "chebyshev": segment_cache.stats() if evaluate_records is not None else None,
+    }
+
+
+def _cache_metrics():
+    # cache counters for /metrics, read at scrape time
+    caches = {name: stats for name, stats in cache_stats().items() if isinstance(stats, dict)}
+    families = (
+        ("leo_cache_hits_total", "counter", "Cache lookups that found an entry.", "hits"),
+        ("leo_cache_misses_total", "counter", "Cache lookups that found no entry.", "misses"),
+        ("leo_cache_evictions_total", "counter", "Entries evicted to stay within the cache limits.", "evictions"),
+        ("leo_cache_entries", "gauge", "Entries currently cached.", "entries"),
+        ("leo_cache_bytes", "gauge", "Approximate bytes currently cached.", "bytes"),
+    )
+    return [(name, kind, help, [({"cache": cache}, stats[key]) for cache, stats in caches.items()])
+            for name, kind, help, key in families]
+
+
+REGISTRY.add_collector(_cache_metrics)
+
+
+@app.get("/metrics")
+def metrics():
+    # Prometheus text format; counters are per API process
+    return Response(REGISTRY.render(), media_type=METRICS_CONTENT_TYPE)
+
+
 # Accept preflight OPTIONS explicitly for both possible endpoints
 @app.options("/api/propagate")
 def options_api_propagate():
@@ -88,6 +264,10 @@ class LocalPropagateRequest(BaseModel):
     predict_seconds: Optional[int] = None
     samples: Optional[int] = 60
     sample_interval: Optional[int] = None
+    model: Optional[str] = None
+    rtol: Optional[float] = None
+    atol: Optional[float] = None
+    geodetic: Optional[bool] = None
 
 
 def _normalize_tle_item(raw: Dict[str, Any]) -> Dict[str, Any]:
@@ -136,6 +316,1014 @@ def _call_propagator(name: str, line1: str, line2: str, propagate_seconds: int,
     return {"id": mock_id, "name": name or mock_id, "trajectory": trajectory}
 
 
+MODEL_OPTION_KEYS = ("rtol", "atol", "geodetic")
+
+
+def _propagation_model(params) -> Tuple[str, Dict[str, float]]:
+    """
+    `model` and its options (rtol/atol for "dp45", `geodetic` for WGS-84
+    latitude/altitude with any model) from a JSON payload, form or query
+    string; unknown models or options that don't apply are a 400.
+    """
+    model = (params.get("model") or DEFAULT_MODEL).lower()
+    if model not in PROPAGATION_MODELS:
+        raise HTTPException(status_code=400, detail=f"Unknown model '{model}', expected one of {PROPAGATION_MODELS}")
+    options = {key: params.get(key) for key in MODEL_OPTION_KEYS if params.get(key) not in (None, "")}
+    if model_options is None:
+        return model, {}
+    try:
+        return model, model_options(model, options)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _call_batch_propagator(tles: List[Dict[str, Any]], propagate_seconds: int, samples: int,
+                           model: str = DEFAULT_MODEL, options: Optional[Dict[str, float]] = None,
+                           store: bool = True) -> List[Trajectory]:
+    """
+    Propagate a list of normalized {name, line1, line2} dicts in one vectorized
+    call; Trajectory results come back in input order. Falls back to the
+    per-satellite path (real or mock) when the batch propagator is unavailable.
+    """
+    if propagate_batch is None:
+        return [Trajectory.from_dict(_call_propagator(t["name"], t["line1"], t["line2"], propagate_seconds, samples))
+                for t in tles]
+    try:
+        return propagate_batch(tles, propagate_seconds, samples, model, options, store)
+    except Exception as e:
+        import traceback
+        tb = traceback.format_exc()
+        log.error("propagate_batch raised an exception: %s\n%s", e, tb)
+        raise HTTPException(status_code=500, detail=f"Propagation error (server): {str(e)}")
+
+
+def _chunk_tles(tles: List[Dict[str, Any]], n_chunks: int) -> List[List[Dict[str, Any]]]:
+    n_chunks = max(1, min(n_chunks, len(tles) // PROPAGATION_MIN_CHUNK))
+    size = -(-len(tles) // n_chunks)
+    return [tles[i:i + size] for i in range(0, len(tles), size)]
+
+
+async def _propagate_async(tles: List[Dict[str, Any]], propagate_seconds: int, samples: int,
+                           model: str = DEFAULT_MODEL, options: Optional[Dict[str, float]] = None,
+                           store: bool = True) -> List[Trajectory]:
+    """
+    Run the batch propagator off the event loop. With a process pool the TLEs
+    are parsed here (through the TLE cache), trajectories not already cached
+    are chunked across workers and the results merged back in input order.
+    New trajectories go to trajectory_cache unless `store` is false.
+    """
+    pool = _get_process_pool()
+    chunks = _chunk_tles(tles, PROPAGATION_WORKERS) if pool is not None and propagate_parsed is not None else []
+    if len(chunks) < 2:
+        return await run_in_threadpool(_call_batch_propagator, tles, propagate_seconds, samples, model, options, store)
+    loop = asyncio.get_running_loop()
+    try:
+        records = await run_in_threadpool(parse_tles, tles)
+        results, missing = cached_trajectories(records, propagate_seconds, samples, model, options)
+        todo = [records[idx] for idx in missing]
+        chunks = _chunk_tles(todo, PROPAGATION_WORKERS) if todo else []
+        # the workers' own stage timings stay in their processes; time the whole fan-out here
+        with stage("propagate", objects=len(todo), samples=len(todo) * samples):
+            parts = await asyncio.gather(*[
+                loop.run_in_executor(pool, propagate_parsed, chunk, propagate_seconds, samples, model, options)
+                for chunk in chunks
+            ])
+    except Exception as e:
+        log.exception("propagation failed in worker pool: %s", e)
+        raise HTTPException(status_code=500, detail=f"Propagation error (server): {str(e)}")
+    fresh = [sat for part in parts for sat in part]
+    if store:
+        store_trajectories(todo, fresh, propagate_seconds, samples, model, options)
+    for idx, sat in zip(missing, fresh):
+        results[idx] = sat
+    return results
+
+
+def _final_state_alerts(trajectories: List[Trajectory]) -> List[Dict[str, Any]]:
+    # collision detection on the last sample of each trajectory: call pairwise
+    # util if available; otherwise empty
+    if pairwise_collision_check is None:
+        return []  # no alerts if no checker provided
+    try:
+        return pairwise_collision_check(trajectories, threshold_km=50.0)
+    except Exception as e:
+        log.exception("pairwise_collision_check failed: %s", e)
+        return []
+
+
+# -------------------------------
+# Response formats: `?format=json` (default, per-sample dicts), `?format=columnar`
+# (per-satellite column arrays in JSON) or `?format=npz` / `Accept:
+# application/x-npz` (NumPy .npz archive of (sats, samples[, 3]) blocks)
+# -------------------------------
+NPZ_MEDIA_TYPE = "application/x-npz"
+RESPONSE_FORMATS = ("json", "columnar", "npz")
+
+
+CATALOG_FILTER_KEYS = ("name_prefix", "min_alt_km", "max_alt_km", "limit")
+
+
+def _catalog_filters(params) -> Dict[str, Any]:
+    try:
+        return {
+            "name_prefix": params.get("name_prefix") or None,
+            "min_alt_km": float(params["min_alt_km"]) if params.get("min_alt_km") not in (None, "") else None,
+            "max_alt_km": float(params["max_alt_km"]) if params.get("max_alt_km") not in (None, "") else None,
+            "limit": int(params["limit"]) if params.get("limit") not in (None, "") else None,
+        }
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail=f"Invalid catalog filter, expected {CATALOG_FILTER_KEYS}")
+
+
+async def _catalog_records(raw: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Catalog objects referenced by a JSON payload: `catalog_ids` (list of
+    catalog numbers) and/or `catalog` ({name_prefix, min_alt_km, max_alt_km,
+    limit}; `{}` or true selects the whole catalog). The records are already
+    parsed, so they go to the propagators as they are.
+    """
+    ids, filters = raw.get("catalog_ids"), raw.get("catalog")
+    if ids is None and filters in (None, False):
+        return []
+    if ids is not None and not isinstance(ids, list):
+        raise HTTPException(status_code=400, detail="`catalog_ids` must be an array")
+    if filters is not None and not isinstance(filters, (dict, bool)):
+        raise HTTPException(status_code=400, detail="`catalog` must be an object of filters")
+    catalog = _get_catalog()
+    records, missing = await run_in_threadpool(
+        catalog.select, ids, **_catalog_filters(filters if isinstance(filters, dict) else {}))
+    if missing:
+        raise HTTPException(status_code=404, detail={"message": "Unknown catalog ids", "catalog_ids": missing})
+    return records
+
+
+@app.post("/api/catalog")
+async def catalog_upsert(request: Request):
+    """
+    Bulk insert/update TLEs in the catalog, in one transaction. Accepts JSON
+    { tles: [{name,line1,line2}, ...], validate_checksums } or a TLE file as a
+    text/plain body (`?validate_checksums=false` to skip checksums). Records
+    are keyed by catalog number; a TLE older than the stored one is counted
+    as `stale` and ignored.
+    """
+    catalog = _get_catalog()
+    if request.headers.get("content-type", "").startswith("text/plain"):
+        validate_checksums = request.query_params.get("validate_checksums", "true").lower() not in ("0", "false", "no")
+        tle_errors: List[Dict[str, Any]] = []
+        events = iter_tle_events(request.stream(), validate_checksums)
+        tles = [t async for t in _tles_from_events(events, tle_errors)]
+    else:
+        try:
+            raw = await request.json()
+        except Exception:
+            raise HTTPException(status_code=400, detail="Invalid JSON payload")
+        tles = raw.get("tles") or raw.get("satellites") or []
+        if not isinstance(tles, list):
+            raise HTTPException(status_code=400, detail="`tles`/`satellites` must be an array")
+        validate_checksums = str(raw.get("validate_checksums", "true")).lower() not in ("0", "false", "no")
+        tles = [_normalize_tle_item(t if isinstance(t, dict) else {}) for t in tles]
+        tle_errors = []
+    result = await run_in_threadpool(catalog.upsert, tles, validate_checksums)
+    return {"status": "ok", **result, "tle_errors": tle_errors, "count": len(catalog)}
+
+
+@app.get("/api/catalog")
+async def catalog_list(request: Request):
+    # catalog entries; `ids` (comma-separated) plus the CATALOG_FILTER_KEYS query params
+    catalog = _get_catalog()
+    ids = request.query_params.get("ids")
+    ids = [x for x in ids.split(",") if x.strip()] if ids else None
+    records, missing = await run_in_threadpool(catalog.select, ids, **_catalog_filters(request.query_params))
+    return {"status": "ok", "count": len(records), "missing": missing,
+            "satellites": [catalog_entry(rec) for rec in records]}
+
+
+@app.get("/api/catalog/{catalog_id}")
+async def catalog_get(catalog_id: str):
+    records, _ = await run_in_threadpool(_get_catalog().select, [catalog_id])
+    if not records:
+        raise HTTPException(status_code=404, detail=f"Catalog id {catalog_id} not found")
+    return {"status": "ok", "satellite": catalog_entry(records[0])}
+
+
+@app.delete("/api/catalog/{catalog_id}")
+async def catalog_delete(catalog_id: str):
+    if not await run_in_threadpool(_get_catalog().delete, [catalog_id]):
+        raise HTTPException(status_code=404, detail=f"Catalog id {catalog_id} not found")
+    return {"status": "ok", "deleted": catalog_id}
+
+
+# Rolling ephemeris: every EPHEMERIS_REFRESH_S seconds the whole catalog is
+# propagated from the current grid time over EPHEMERIS_HORIZON_S (plus one
+# refresh interval, so the horizon stays covered until the next build) at
+# EPHEMERIS_STEP_S spacing into a memory-mapped file under EPHEMERIS_DIR.
+# With several uvicorn workers only the one holding the directory's lock
+# builds; all of them map the published file. Objects whose TLE epoch is more
+# than EPHEMERIS_MAX_TLE_AGE_S away are left out. The scheduler is opt-in: it
+# only runs with EPHEMERIS_REFRESH_S > 0 (e.g. 600), so a plain app start
+# doesn't open CATALOG_DB or create EPHEMERIS_DIR; POST /api/ephemeris/refresh
+# still builds on demand.
+EPHEMERIS_DIR = os.environ.get("EPHEMERIS_DIR", "ephemeris")
+EPHEMERIS_STEP_S = float(os.environ.get("EPHEMERIS_STEP_S", "60"))
+EPHEMERIS_HORIZON_S = float(os.environ.get("EPHEMERIS_HORIZON_S", str(6 * 3600)))
+EPHEMERIS_REFRESH_S = float(os.environ.get("EPHEMERIS_REFRESH_S", "0"))
+EPHEMERIS_MAX_TLE_AGE_S = float(os.environ.get("EPHEMERIS_MAX_TLE_AGE_S", str(7 * 86400)))
+_ephemeris_store = None
+_ephemeris_task: Optional[asyncio.Task] = None
+
+
+def _get_ephemeris_store():
+    global _ephemeris_store
+    if EphemerisStore is None:
+        raise HTTPException(status_code=503, detail="Ephemeris store unavailable")
+    if _ephemeris_store is None:
+        _ephemeris_store = EphemerisStore(EPHEMERIS_DIR)
+    return _ephemeris_store
+
+
+def _refresh_ephemeris() -> Optional[Dict[str, Any]]:
+    store = _get_ephemeris_store()
+    records, _ = _get_catalog().select()
+    if not records:
+        return None
+    start = ephemeris_grid_start(datetime.now(timezone.utc), EPHEMERIS_STEP_S)
+    count = int(-(-(EPHEMERIS_HORIZON_S + max(EPHEMERIS_REFRESH_S, 0)) // EPHEMERIS_STEP_S)) + 2
+    meta = store.build(records, start, EPHEMERIS_STEP_S, count, max_age_s=EPHEMERIS_MAX_TLE_AGE_S)
+    log.info("Built ephemeris generation %s: %d objects x %d samples (%d stale TLEs left out)",
+             meta["generation"], meta["objects"], count, len(meta["stale"]))
+    return meta
+
+
+async def _ephemeris_loop():
+    while True:
+        try:
+            if _get_ephemeris_store().acquire_writer():
+                await run_in_threadpool(_refresh_ephemeris)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            log.exception("ephemeris refresh failed: %s", e)
+        await asyncio.sleep(EPHEMERIS_REFRESH_S)
+
+
+@app.on_event("startup")
+async def _start_ephemeris_scheduler():
+    global _ephemeris_task
+    if EPHEMERIS_REFRESH_S > 0 and EphemerisStore is not None:
+        _ephemeris_task = asyncio.create_task(_ephemeris_loop())
+
+
+@app.on_event("shutdown")
+async def _stop_ephemeris_scheduler():
+    global _ephemeris_task
+    if _ephemeris_task is not None:
+        _ephemeris_task.cancel()
+        _ephemeris_task = None
+
+
+def _ephemeris_status(eph) -> Dict[str, Any]:
+    meta = {k: v for k, v in eph.meta.items() if k not in ("catalog_ids", "names", "stale")}
+    return {**meta, "stale": len(eph.meta.get("stale", [])), "end": eph.end.isoformat()}
+
+
+def _current_ephemeris():
+    eph = _get_ephemeris_store().current()
+    if eph is None:
+        raise HTTPException(status_code=503, detail="No ephemeris has been built yet")
+    return eph
+
+
+def _parse_time(value, field: str):
+    try:
+        t = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"`{field}` must be an ISO 8601 time")
+    return t if t.tzinfo is not None else t.replace(tzinfo=timezone.utc)
+
+
+async def _ephemeris_slice(raw: Dict[str, Any], default_duration_s: float = 3600.0):
+    """
+    Rows and sample range of the current ephemeris for a JSON query:
+    catalog_ids / catalog filters as for /api/propagate (default: every object),
+    `start` (ISO, default now), `end` or `duration_s`, and `stride` (keep every
+    n-th grid sample). Returns (ephemeris, rows, k0, k1, stride, missing ids).
+    """
+    eph = _current_ephemeris()
+    if raw.get("catalog_ids") is not None or raw.get("catalog") not in (None, False):
+        ids = [rec["catalog_id"] for rec in await _catalog_records(raw)]
+    else:
+        ids = eph.ids
+    rows = [eph.rows[x] for x in ids if x in eph.rows]
+    missing = [x for x in ids if x not in eph.rows]  # added to the catalog after the last build
+    t0 = _parse_time(raw["start"], "start") if raw.get("start") else datetime.now(timezone.utc)
+    try:
+        if raw.get("end"):
+            t1 = _parse_time(raw["end"], "end")
+        else:
+            t1 = t0 + timedelta(seconds=float(raw.get("duration_s") or default_duration_s))
+        stride = max(1, int(raw.get("stride") or 1))
+        k0, k1 = eph.window(t0, t1)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return eph, rows, k0, k1, stride, missing
+
+
+@app.get("/api/ephemeris")
+def ephemeris_status():
+    eph = _current_ephemeris()
+    return {"status": "ok", "writer": _get_ephemeris_store().is_writer, **_ephemeris_status(eph)}
+
+
+@app.post("/api/ephemeris/refresh")
+async def ephemeris_refresh():
+    # rebuild now (only in the worker holding the writer lock)
+    if not _get_ephemeris_store().acquire_writer():
+        raise HTTPException(status_code=409, detail="Another worker owns the ephemeris")
+    meta = await run_in_threadpool(_refresh_ephemeris)
+    if meta is None:
+        raise HTTPException(status_code=400, detail="The catalog is empty")
+    return {"status": "ok", **_ephemeris_status(_current_ephemeris())}
+
+
+@app.post("/api/ephemeris/positions")
+async def ephemeris_positions(req: Request):
+    """
+    Positions of catalog objects from the precomputed ephemeris instead of
+    propagating: the grid samples inside [start, end] (see _ephemeris_slice),
+    in the /api/propagate response shape and formats, plus `missing` ids and
+    the ephemeris `generation`. `geodetic: true` as for /api/propagate.
+    """
+    fmt = _response_format(req)
+    try:
+        raw = await req.json()
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid JSON payload")
+    eph, rows, k0, k1, stride, missing = await _ephemeris_slice(raw)
+    geodetic = str(raw.get("geodetic", "false")).lower() in ("1", "true", "yes")
+    results = await run_in_threadpool(eph.trajectories, rows, k0, k1, stride, geodetic)
+    return await _formatted_propagation(fmt, req, results, _final_state_alerts(results),
+                                  missing=missing, generation=eph.generation)
+
+
+@app.post("/api/ephemeris/screen")
+async def ephemeris_screen(req: Request):
+    """
+    Close-approach screening over the precomputed ephemeris: the same
+    selection and window as /api/ephemeris/positions (default one hour from
+    now) plus `threshold_km`; returns encounter episodes as /api/alert does.
+    """
+    try:
+        raw = await req.json()
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid JSON payload")
+    eph, rows, k0, k1, stride, missing = await _ephemeris_slice(raw)
+    threshold_km = float(raw.get("threshold_km") or 50.0)
+
+    def screen():
+        return _check_close_approaches(eph.trajectories(rows, k0, k1, stride), threshold_km)
+
+    encounters = await run_in_threadpool(screen)
+    return {"status": "ok", "objects": len(rows), "missing": missing, "generation": eph.generation,
+            "start": (eph.start + timedelta(seconds=k0 * eph.step_s)).isoformat(),
+            "end": (eph.start + timedelta(seconds=(k1 - 1) * eph.step_s)).isoformat(),
+            "encounters": encounters}
+
+
+# Chebyshev ephemerides (see app/chebyshev.py): positions at arbitrary times
+# from cached per-segment polynomial fits instead of sampled trajectories.
+# A request may touch and fit at most CHEBYSHEV_MAX_SEGMENTS satellite
+# segments, and segments more than CHEBYSHEV_MAX_TLE_AGE_S from a TLE's epoch
+# are refused (propagation cost grows with that distance, accuracy drops).
+CHEBYSHEV_MAX_QUERIES = int(os.environ.get("CHEBYSHEV_MAX_QUERIES", "200000"))
+CHEBYSHEV_MAX_SEGMENTS = int(os.environ.get("CHEBYSHEV_MAX_SEGMENTS", "200000"))
+CHEBYSHEV_MAX_TLE_AGE_S = float(os.environ.get("CHEBYSHEV_MAX_TLE_AGE_S", str(7 * 86400)))
+
+
+async def _chebyshev_request(raw: Dict[str, Any]):
+    """
+    Satellites (`tles` and/or catalog_ids / catalog filters) and fit settings
+    (`segment_s`, `degree`) of a Chebyshev request, as (records, segment_s, degree).
+    """
+    if evaluate_records is None or parse_tles is None:
+        raise HTTPException(status_code=503, detail="Chebyshev ephemerides unavailable")
+    tles_raw = raw.get("tles") or raw.get("satellites") or []
+    if not isinstance(tles_raw, list):
+        raise HTTPException(status_code=400, detail="`tles`/`satellites` must be an array")
+    items = [_normalize_tle_item(t if isinstance(t, dict) else {}) for t in tles_raw]
+    try:
+        records = await run_in_threadpool(parse_tles, items) if items else []
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid TLE: {e}")
+    records += await _catalog_records(raw)
+    if not records:
+        raise HTTPException(status_code=400, detail="No TLEs provided")
+    try:
+        segment_s = float(raw.get("segment_s") or DEFAULT_SEGMENT_S)
+        degree = int(raw.get("degree") or DEFAULT_DEGREE)
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="`segment_s` and `degree` must be numbers")
+    if not (60 <= segment_s <= 86400 and 2 <= degree <= 30):
+        raise HTTPException(status_code=400, detail="Expected 60 <= segment_s <= 86400 and 2 <= degree <= 30")
+    return records, segment_s, degree
+
+
+@app.post("/api/chebyshev/evaluate")
+async def chebyshev_evaluate(req: Request):
+    """
+    Positions at arbitrary times from Chebyshev fits:
+    { tles / catalog_ids / catalog, queries: [{satellite, time}, ...] } where
+    `satellite` is a result id, name or catalog number and `time` ISO 8601, or
+    `times: [...]` to evaluate every selected satellite at each time. Fits are
+    made on first use and cached per segment (see app/chebyshev.py).
+    Responds with { results: [{satellite, time, r_km, v_km_s, lat, lon, alt_m}] }.
+    """
+    try:
+        raw = await req.json()
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid JSON payload")
+    records, segment_s, degree = await _chebyshev_request(raw)
+    lookup: Dict[str, int] = {}
+    for n, rec in enumerate(records):
+        for key in (rec.get("catalog_id"), rec["name"], rec["id"]):
+            if key:
+                lookup.setdefault(str(key), n)
+    queries = raw.get("queries")
+    if queries is None:
+        times = raw.get("times") or []
+        if not isinstance(times, list):
+            raise HTTPException(status_code=400, detail="`times` must be an array")
+        queries = [{"satellite": rec["id"], "time": t} for t in times for rec in records]
+    if not isinstance(queries, list) or not queries:
+        raise HTTPException(status_code=400, detail="Provide `queries` or `times`")
+    if len(queries) > CHEBYSHEV_MAX_QUERIES:
+        raise HTTPException(status_code=400, detail=f"At most {CHEBYSHEV_MAX_QUERIES} queries per request")
+    unknown = sorted({str(q.get("satellite")) for q in queries if str(q.get("satellite")) not in lookup})
+    if unknown:
+        raise HTTPException(status_code=400, detail={"message": "Unknown satellites", "satellites": unknown})
+    which = [lookup[str(q["satellite"])] for q in queries]
+    stamps = [_parse_time(q.get("time"), "time").timestamp() for q in queries]
+    segs, _ = segment_of(stamps, segment_s)
+    if len({(n, s) for n, s in zip(which, segs.tolist())}) > CHEBYSHEV_MAX_SEGMENTS:
+        raise HTTPException(status_code=400, detail="Queries span too many segments")
+    geodetic = str(raw.get("geodetic", "false")).lower() in ("1", "true", "yes")
+
+    def run():
+        r, v = evaluate_records(records, which, stamps, segment_s, degree,
+                                max_age_s=CHEBYSHEV_MAX_TLE_AGE_S, max_segments=CHEBYSHEV_MAX_SEGMENTS)
+        jd = np.asarray(stamps) / 86400.0 + 2440587.5
+        return r, v, eci_to_geodetic_array(r, jd, geodetic=geodetic)
+
+    try:
+        r, v, (lat, lon, alt) = await run_in_threadpool(run)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    results = [
+        {"satellite": q["satellite"], "time": q["time"], "r_km": r[k].tolist(), "v_km_s": v[k].tolist(),
+         "lat": float(lat[k]), "lon": float(lon[k]), "alt_m": float(alt[k])}
+        for k, q in enumerate(queries)
+    ]
+    return {"status": "ok", "segment_s": segment_s, "degree": degree, "results": results}
+
+
+@app.post("/api/chebyshev")
+async def chebyshev_coefficients(req: Request):
+    """
+    Chebyshev coefficients for client-side evaluation over [start, end]
+    (ISO; `end` defaults to start + 1 h): per satellite, segments of
+    `segment_s` seconds starting at unix multiples of segment_s, each with
+    [[x...], [y...], [z...]] km coefficients in x = 2 (t - start) / segment_s - 1.
+    Velocities are the time derivative of the polynomials.
+    """
+    try:
+        raw = await req.json()
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid JSON payload")
+    records, segment_s, degree = await _chebyshev_request(raw)
+    t0 = _parse_time(raw["start"], "start") if raw.get("start") else datetime.now(timezone.utc)
+    t1 = _parse_time(raw["end"], "end") if raw.get("end") else t0 + timedelta(hours=1)
+    (first, last), _ = segment_of([t0.timestamp(), t1.timestamp()], segment_s)
+    first, last = int(first), int(last)
+    if last < first:
+        raise HTTPException(status_code=400, detail="`end` is before `start`")
+    if (last - first + 1) * len(records) > CHEBYSHEV_MAX_SEGMENTS:
+        raise HTTPException(status_code=400, detail="Request spans too many segments")
+    wanted = [list(range(first, last + 1))] * len(records)
+    try:
+        coeffs = await run_in_threadpool(segment_coefficients, records, wanted, segment_s, degree,
+                                         CHEBYSHEV_MAX_TLE_AGE_S, CHEBYSHEV_MAX_SEGMENTS)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {
+        "status": "ok",
+        "segment_s": segment_s,
+        "degree": degree,
+        "satellites": [
+            {
+                "id": rec["id"],
+                "name": rec["name"],
+                "catalog_id": rec.get("catalog_id"),
+                "segments": [
+                    {"start": datetime.fromtimestamp(s * segment_s, timezone.utc).isoformat(),
+                     "coeffs": per_seg[s].tolist()}
+                    for s in range(first, last + 1)
+                ],
+            }
+            for rec, per_seg in zip(records, coeffs)
+        ],
+    }
+
+
+# Incremental screening sessions (see app/screening.py): the states and
+# encounters of a screening are kept in memory so that after a TLE refresh
+# only the changed objects are propagated and screened again. At most
+# SCREENING_MAX_SESSIONS are kept (the least recently used is dropped first),
+# sessions idle for SCREENING_TTL_S expire, and objects x samples per session
+# is capped at SCREENING_MAX_STATES (48 bytes each).
+SCREENING_MAX_SESSIONS = int(os.environ.get("SCREENING_MAX_SESSIONS", "8"))
+SCREENING_TTL_S = float(os.environ.get("SCREENING_TTL_S", str(24 * 3600)))
+SCREENING_MAX_STATES = int(os.environ.get("SCREENING_MAX_STATES", "4000000"))
+SCREENING_STEP_S = float(os.environ.get("SCREENING_STEP_S", "60"))
+SCREENING_DURATION_S = float(os.environ.get("SCREENING_DURATION_S", str(3 * 3600)))
+_screenings: Dict[str, Any] = {}  # session id -> ScreeningSession, least recently used first
+
+
+def _screening_or_404(session_id: str):
+    for sid in [sid for sid, s in _screenings.items() if s.updated < time.time() - SCREENING_TTL_S]:
+        del _screenings[sid]
+    session = _screenings.pop(session_id, None)
+    if session is None:
+        raise HTTPException(status_code=404, detail=f"Screening session {session_id} not found or expired")
+    _screenings[session_id] = session
+    return session
+
+
+async def _screening_records(raw: Dict[str, Any]) -> List[Dict[str, Any]]:
+    # records for `tles` and/or catalog_ids / catalog filters, each with its catalog id
+    tles_raw = raw.get("tles") or raw.get("satellites") or []
+    if not isinstance(tles_raw, list):
+        raise HTTPException(status_code=400, detail="`tles`/`satellites` must be an array")
+    items = [_normalize_tle_item(t if isinstance(t, dict) else {}) for t in tles_raw]
+    ids = []
+    for idx, item in enumerate(items):
+        # objects are keyed by catalog number, so it must be valid (as for POST /api/catalog)
+        problem = validate_tle(item["line1"].strip(), item["line2"].strip(), validate_checksums=False)
+        if problem is None:
+            try:
+                ids.append(tle_catalog_id(item["line1"]))
+            except ValueError as e:
+                problem = str(e)
+        if problem:
+            raise HTTPException(status_code=400, detail={"message": "Invalid TLE", "index": idx,
+                                                        "name": item["name"], "error": problem})
+    try:
+        parsed = await run_in_threadpool(parse_tles, items) if items else []
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid TLE: {e}")
+    records = [dict(rec, catalog_id=cid) for cid, rec in zip(ids, parsed)]
+    return records + await _catalog_records(raw)
+
+
+async def _screening_update(session, records: List[Dict[str, Any]], remove: List[int]):
+    added = len({rec["catalog_id"] for rec in records} - set(session.records))
+    if (len(session) + added) * session.count > SCREENING_MAX_STATES:
+        raise HTTPException(status_code=400, detail=f"A session holds at most {SCREENING_MAX_STATES} "
+                                                    "objects x samples")
+    with stage("screen_incremental", objects=len(records)):
+        return await run_in_threadpool(session.update, records, remove)
+
+
+@app.post("/api/screenings")
+async def screening_create(req: Request):
+    """
+    Start an incremental screening session: { tles / catalog_ids / catalog,
+    start (ISO, default now), duration_s, step_s, threshold_km,
+    distance_tolerance_km, tca_tolerance_s }. Every object is propagated and
+    screened once; the response lists all encounters under `new`. Feed later
+    TLE sets to POST /api/screenings/{id}/update.
+    """
+    if ScreeningSession is None or parse_tles is None or tle_catalog_id is None:
+        raise HTTPException(status_code=503, detail="Screening sessions unavailable")
+    try:
+        raw = await req.json()
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid JSON payload")
+    try:
+        step_s = float(raw.get("step_s") or SCREENING_STEP_S)
+        duration_s = float(raw.get("duration_s") or SCREENING_DURATION_S)
+        threshold_km = float(raw.get("threshold_km") or 50.0)
+        distance_tol_km = float(raw.get("distance_tolerance_km", 0.1))
+        tca_tol_s = float(raw.get("tca_tolerance_s", 1.0))
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Session settings must be numbers")
+    if step_s <= 0 or duration_s < step_s:
+        raise HTTPException(status_code=400, detail="Expected step_s > 0 and duration_s >= step_s")
+    start = _parse_time(raw["start"], "start") if raw.get("start") else datetime.now(timezone.utc)
+    count = int(duration_s // step_s) + 1
+    records = await _screening_records(raw)
+    if not records:
+        raise HTTPException(status_code=400, detail="No TLEs provided")
+    session = ScreeningSession(ephemeris_grid_start(start, step_s), step_s, count, threshold_km,
+                               distance_tol_km, tca_tol_s)
+    changes = await _screening_update(session, records, [])
+    while len(_screenings) >= SCREENING_MAX_SESSIONS:
+        del _screenings[next(iter(_screenings))]
+    _screenings[session.id] = session
+    return {"status": "ok", **session.summary(), **changes}
+
+
+@app.post("/api/screenings/{session_id}/update")
+async def screening_update(session_id: str, req: Request):
+    """
+    Apply a TLE refresh to a session: { tles / catalog_ids / catalog, remove:
+    [catalog ids] }. Objects whose TLE is unchanged are skipped, so the whole
+    catalog can be sent every cycle; only new and changed objects are
+    propagated and only pairs involving them re-screened. Returns the `new`,
+    `updated` and `cleared` encounters (stable `encounter_id`s) and the ids
+    that were `propagated` / `removed`.
+    """
+    session = _screening_or_404(session_id)
+    try:
+        raw = await req.json()
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid JSON payload")
+    remove = raw.get("remove") or []
+    if not isinstance(remove, list):
+        raise HTTPException(status_code=400, detail="`remove` must be an array of catalog ids")
+    try:
+        remove = [catalog_number(x) for x in remove]
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    records = await _screening_records(raw)
+    changes = await _screening_update(session, records, remove)
+    return {"status": "ok", **session.summary(), **changes}
+
+
+@app.get("/api/screenings/{session_id}")
+async def screening_get(session_id: str):
+    session = _screening_or_404(session_id)
+    return {"status": "ok", **session.summary(), "encounters": session.encounter_list()}
+
+
+@app.delete("/api/screenings/{session_id}")
+async def screening_delete(session_id: str):
+    _screening_or_404(session_id)
+    del _screenings[session_id]
+    return {"status": "ok", "deleted": session_id}
+
+
+# -------------------------------
+# Live position feed (WebSocket, see app/live.py)
+# -------------------------------
+# Subscribers with the same tick interval share one propagation loop that
+# steps every watched object forward from its previous state each tick and
+# runs the close-approach check on the new positions. Intervals are limited to
+# [LIVE_MIN_INTERVAL_S, LIVE_MAX_INTERVAL_S], a subscription to
+# LIVE_MAX_OBJECTS objects, and TLEs whose epoch is more than
+# LIVE_MAX_TLE_AGE_S from now are rejected.
+LIVE_MIN_INTERVAL_S = float(os.environ.get("LIVE_MIN_INTERVAL_S", "0.5"))
+LIVE_MAX_INTERVAL_S = float(os.environ.get("LIVE_MAX_INTERVAL_S", "3600"))
+LIVE_MAX_OBJECTS = int(os.environ.get("LIVE_MAX_OBJECTS", "5000"))
+LIVE_MAX_TLE_AGE_S = float(os.environ.get("LIVE_MAX_TLE_AGE_S", str(7 * 86400)))
+_live_feed = None
+
+
+def _get_live_feed():
+    global _live_feed
+    if LiveFeed is None or parse_tles is None or tle_catalog_id is None:
+        raise HTTPException(status_code=503, detail="Live feed unavailable")
+    if _live_feed is None:
+        _live_feed = LiveFeed(run_in_threadpool)
+    return _live_feed
+
+
+@app.on_event("shutdown")
+async def _shutdown_live_feed():
+    global _live_feed
+    if _live_feed is not None:
+        await _live_feed.shutdown()
+        _live_feed = None
+
+
+async def _live_subscribe(feed, raw: Dict[str, Any]):
+    try:
+        interval_s = float(raw.get("interval_s") or 1.0)
+        threshold_km = float(raw.get("threshold_km") or 50.0)
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="`interval_s` and `threshold_km` must be numbers")
+    if not LIVE_MIN_INTERVAL_S <= interval_s <= LIVE_MAX_INTERVAL_S:
+        raise HTTPException(status_code=400, detail=f"`interval_s` must be between {LIVE_MIN_INTERVAL_S} "
+                                                    f"and {LIVE_MAX_INTERVAL_S}")
+    records = await _screening_records(raw)
+    now = datetime.now(timezone.utc)
+    rejected = [{"id": rec["id"], "name": rec["name"], "catalog_id": rec["catalog_id"], "reason": "stale TLE"}
+                for rec in records if abs((now - rec["epoch"]).total_seconds()) > LIVE_MAX_TLE_AGE_S]
+    records = [rec for rec in records if abs((now - rec["epoch"]).total_seconds()) <= LIVE_MAX_TLE_AGE_S]
+    if not records:
+        raise HTTPException(status_code=400, detail={"message": "No current TLEs provided", "rejected": rejected})
+    if len(records) > LIVE_MAX_OBJECTS:
+        raise HTTPException(status_code=400, detail=f"A subscription holds at most {LIVE_MAX_OBJECTS} objects")
+    labels = {rec["key"]: (rec["id"], rec["name"]) for rec in records}
+    channel, sub = await feed.subscribe(records, labels, interval_s, threshold_km, bool(raw.get("geodetic")))
+    reply = {"type": "subscribed", "interval_s": interval_s, "threshold_km": threshold_km,
+             "objects": [{"id": ident, "name": name} for ident, name in labels.values()], "rejected": rejected}
+    return channel, sub, reply
+
+
+@app.websocket("/ws/live")
+async def live_positions(ws: WebSocket):
+    """
+    Live positions over a WebSocket. Client messages (JSON):
+      {"type": "subscribe", tles / catalog_ids / catalog, interval_s,
+       threshold_km, geodetic}  -> {"type": "subscribed", objects, rejected}
+      {"type": "unsubscribe"}   -> {"type": "unsubscribed"}
+    A new subscribe replaces the current subscription. Every interval the
+    server sends {"type": "tick", time, tick, positions: [{id, name, lat, lon,
+    alt_m, r_km}], alerts: [{sat1, sat2, distance_km}]}; a client that reads
+    too slowly skips ticks. Errors come back as {"type": "error", detail}.
+    """
+    await ws.accept()
+    try:
+        feed = _get_live_feed()
+    except HTTPException as e:
+        await ws.send_json({"type": "error", "detail": e.detail})
+        await ws.close(code=1011)
+        return
+    current = None  # (channel, subscription, sender task)
+
+    async def forward(sub):
+        try:
+            while True:
+                await ws.send_text(await sub.outbox.get())
+        except Exception:
+            pass  # disconnected; the receive loop cleans up
+
+    def leave():
+        nonlocal current
+        if current is not None:
+            channel, sub, sender = current
+            if sender is not None:
+                sender.cancel()
+            feed.unsubscribe(channel, sub)
+            current = None
+
+    try:
+        while True:
+            message = await ws.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            try:
+                raw = json.loads(message.get("text") or message.get("bytes") or "")
+            except ValueError:
+                await ws.send_json({"type": "error", "detail": "Invalid JSON message"})
+                continue
+            kind = raw.get("type") if isinstance(raw, dict) else None
+            if kind == "subscribe":
+                leave()
+                try:
+                    channel, sub, reply = await _live_subscribe(feed, raw)
+                except HTTPException as e:
+                    await ws.send_json({"type": "error", "detail": e.detail})
+                    continue
+                current = (channel, sub, None)
+                await ws.send_json(reply)
+                current = (channel, sub, asyncio.create_task(forward(sub)))
+            elif kind == "unsubscribe":
+                leave()
+                await ws.send_json({"type": "unsubscribed"})
+            else:
+                await ws.send_json({"type": "error", "detail": "Expected a message of type subscribe or unsubscribe"})
+    finally:
+        leave()
+
+
+@app.get("/api/live")
+def live_status():
+    return {"status": "ok", "channels": _get_live_feed().status() if LiveFeed is not None else []}
+
+
+def _response_format(request: Request) -> str:
+    fmt = (request.query_params.get("format") or "").lower()
+    if not fmt:
+        fmt = "npz" if NPZ_MEDIA_TYPE in request.headers.get("accept", "") else "json"
+    if fmt not in RESPONSE_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unknown format '{fmt}', expected one of {RESPONSE_FORMATS}")
+    return fmt
+
+
+def _columnar_json(traj: Trajectory) -> Dict[str, Any]:
+    # vectors become component-major [[x...], [y...], [z...]] lists
+    out = {}
+    for key, value in traj.to_columns().items():
+        if hasattr(value, "tolist"):
+            value = value.T.tolist() if getattr(value, "ndim", 1) == 2 else value.tolist()
+        out[key] = value
+    return out
+
+
+def _npz_response(trajs: List[Trajectory], float32: bool = False, **json_fields) -> Response:
+    """
+    Pack trajectories into one .npz: id/name/epoch string arrays,
+    step_s, count and nfev per satellite, lat/lon/alt_m as (sats, samples) and
+    r_km/v_km_s as (sats, samples, 3) blocks, NaN-padded to the longest
+    trajectory. Extra fields (alerts, encounters) are stored as JSON strings.
+    """
+    dtype = np.float32 if float32 else np.float64
+    n = len(trajs)
+    width = max((len(t) for t in trajs), default=0)
+    arrays = {
+        "id": np.array([t.id or "" for t in trajs], dtype=str),
+        "name": np.array([t.name or "" for t in trajs], dtype=str),
+        "epoch": np.array([t.epoch.isoformat() if t.epoch is not None else "" for t in trajs], dtype=str),
+        "step_s": np.array([t.step_s for t in trajs], dtype=np.float64),
+        "count": np.array([len(t) for t in trajs], dtype=np.int64),
+        "nfev": np.array([t.nfev for t in trajs], dtype=np.int64),
+    }
+    for key, attr in (("lat", "lat"), ("lon", "lon"), ("alt_m", "alt")):
+        block = np.full((n, width), np.nan, dtype=dtype)
+        for idx, t in enumerate(trajs):
+            block[idx, :len(t)] = getattr(t, attr)
+        arrays[key] = block
+    for key, attr in (("r_km", "r"), ("v_km_s", "v")):
+        block = np.full((n, width, 3), np.nan, dtype=dtype)
+        for idx, t in enumerate(trajs):
+            block[idx, :len(t)] = getattr(t, attr)
+        arrays[key] = block
+    for key, value in json_fields.items():
+        arrays[key] = np.array(json.dumps(value))
+    buf = io.BytesIO()
+    np.savez(buf, **arrays)
+    return Response(content=buf.getvalue(), media_type=NPZ_MEDIA_TYPE)
+
+
+def _encoded(build, *args, **kwargs) -> Response:
+    # runs in the threadpool: builds the response and encodes its body there
+    with stage("encode"):
+        content = build(*args, **kwargs)
+        return content if isinstance(content, Response) else JSONResponse(content)
+
+
+async def _encoded_response(build, *args, **kwargs) -> Response:
+    """
+    Build and encode a response off the event loop. Returning the plain dict
+    from a handler would leave FastAPI's jsonable_encoder walking every
+    sample on the loop, which blocks other requests for seconds on large
+    catalogs.
+    """
+    return await run_in_threadpool(_encoded, build, *args, **kwargs)
+
+
+def _propagation_content(fmt: str, float32: bool, results: List[Trajectory], alerts, **extra):
+    if fmt == "npz":
+        return _npz_response(results, float32=float32, alerts=alerts, **extra)
+    if fmt == "columnar":
+        return {
+            "status": "ok",
+            "format": "columnar",
+            "results": [_columnar_json(traj) for traj in results],
+            "alerts": alerts,
+            "collision_alerts": alerts,
+            **extra,
+        }
+    return {
+        "status": "ok",
+        "results": [traj.to_dict() for traj in results],
+        "alerts": alerts,
+        # include both keys used across your frontend variants
+        "collision_alerts": alerts,
+        **extra,
+    }
+
+
+async def _formatted_propagation(fmt: str, request: Request, results: List[Trajectory], alerts, **extra):
+    return await _encoded_response(_propagation_content, fmt, request.query_params.get("dtype") == "float32",
+                                   results, alerts, **extra)
+
+
+# -------------------------------
+# NDJSON streaming (opt-in with `Accept: application/x-ndjson`)
+# -------------------------------
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+# satellites propagated per step of a streamed response; bounds peak memory
+STREAM_CHUNK_SIZE = max(1, int(os.environ.get("STREAM_CHUNK_SIZE", "256")))
+# chunks propagating concurrently while more TLEs are still being read
+STREAM_MAX_INFLIGHT = max(2, PROPAGATION_WORKERS)
+
+
+def _wants_ndjson(request: Request) -> bool:
+    return NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+
+
+def _ndjson_line(obj: Dict[str, Any]) -> bytes:
+    return (json.dumps(obj) + "\n").encode("utf-8")
+
+
+async def _aiter_items(items: List[Dict[str, Any]]):
+    for item in items:
+        yield item
+
+
+async def _iter_propagated(items, propagate_seconds: int, samples: int, model: str = DEFAULT_MODEL,
+                           options: Optional[Dict[str, float]] = None):
+    """
+    Yield Trajectory objects in input order, propagating STREAM_CHUNK_SIZE at a time.
+    `items` is a list or an async iterator of TLE dicts (e.g. straight from the
+    streaming upload parser); each chunk is dispatched as soon as it fills, with
+    up to STREAM_MAX_INFLIGHT chunks propagating while more input is read.
+    Cached trajectories are reused, but new ones are not added to
+    trajectory_cache: that would hold every chunk of a large stream in memory
+    (up to the cache's byte limit) and defeat the chunking.
+    """
+    source = items if hasattr(items, "__aiter__") else _aiter_items(items)
+    pending: deque = deque()
+
+    def dispatch(chunk):
+        return asyncio.ensure_future(_propagate_async(chunk, propagate_seconds, samples, model, options, store=False))
+
+    batch: List[Dict[str, Any]] = []
+    try:
+        async for item in source:
+            batch.append(item)
+            if len(batch) < STREAM_CHUNK_SIZE:
+                continue
+            pending.append(dispatch(batch))
+            batch = []
+            while pending and (len(pending) > STREAM_MAX_INFLIGHT or pending[0].done()):
+                for sat in await pending.popleft():
+                    yield sat
+        if batch:
+            pending.append(dispatch(batch))
+        while pending:
+            for sat in await pending.popleft():
+                yield sat
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+async def _tles_from_events(events, errors: List[Dict[str, Any]]):
+    # TLE dicts from parser events; malformed records are collected in `errors`
+    try:
+        async for kind, payload in events:
+            if kind == "tle":
+                yield payload
+            else:
+                errors.append(payload)
+    except UnicodeDecodeError as e:
+        raise HTTPException(status_code=400, detail=f"Failed to read uploaded file: {e}")
+
+
+def _no_valid_tles(errors: List[Dict[str, Any]]) -> HTTPException:
+    return HTTPException(status_code=400, detail={"message": "No valid TLE records found", "tle_errors": errors})
+
+
+async def _stream_propagate(items: List[Dict[str, Any]], propagate_seconds: int, samples: int, columnar: bool = False,
+                            model: str = DEFAULT_MODEL, options: Optional[Dict[str, float]] = None):
+    """
+    NDJSON body for /api/propagate: one {"type": "satellite", ...} line per
+    satellite as soon as its chunk is propagated, then the final-state alerts
+    and an end marker. Errors after the stream started become an error line.
+    """
+    final_states = []
+    try:
+        async for traj in _iter_propagated(items, propagate_seconds, samples, model, options):
+            yield _ndjson_line({"type": "satellite", **(_columnar_json(traj) if columnar else traj.to_dict())})
+            # keep only the last sample for the final-state check
+            final_states.append(traj[-1:])
+        alerts = _final_state_alerts(final_states)
+        yield _ndjson_line({"type": "alerts", "alerts": alerts})
+        yield _ndjson_line({"type": "end", "status": "ok", "count": len(items)})
+    except HTTPException as e:
+        yield _ndjson_line({"type": "error", "status": "error", "detail": e.detail})
+
+
+async def _stream_alert(items, propagate_seconds: int, samples: int, threshold_km: float,
+                        columnar: bool = False, tle_errors: Optional[List[Dict[str, Any]]] = None,
+                        model: str = DEFAULT_MODEL, options: Optional[Dict[str, float]] = None):
+    """
+    NDJSON body for /api/alert: one {"type": "trajectory", ...} line per
+    satellite while only its compact states are kept for screening, then one
+    {"type": "encounter", ...} line per encounter and an end marker. `items`
+    may be an async iterator (uploads); rejected records from the upload
+    parser are reported in a {"type": "tle_errors"} line.
+    """
+    buf = _StateBuffer(len(items) if isinstance(items, list) else STREAM_CHUNK_SIZE, max(0, samples),
+                       bool((options or {}).get("geodetic")))
+    try:
+        idx = 0
+        async for traj in _iter_propagated(items, propagate_seconds, samples, model, options):
+            buf.add(idx, traj)
+            idx += 1
+            yield _ndjson_line({"type": "trajectory", **(_columnar_json(traj) if columnar else traj.to_dict())})
+        encounters = await run_in_threadpool(buf.encounters, threshold_km)
+        for enc in encounters:
+            yield _ndjson_line({"type": "encounter", **enc})
+        if tle_errors:
+            yield _ndjson_line({"type": "tle_errors", "tle_errors": tle_errors})
+        yield _ndjson_line({"type": "end", "status": "ok", "count": idx, "encounters": len(encounters)})
+    except HTTPException as e:
+        yield _ndjson_line({"type": "error", "status": "error", "detail": e.detail})
+
+
 @app.post("/api/propagate")
 @app.post("/propagate")
 async def propagate_endpoint(req: Request):
@@ -143,10 +1331,21 @@ async def propagate_endpoint(req: Request):
     Accepts multiple possible payload shapes from frontend:
     - { tles: [{name,line1,line2}, ...], propagate_seconds, samples }
     - { satellites: [{ name, tle_line1, tle_line2 }], predict_seconds, sample_interval }
-    Responds with { status: "ok", results: [...], alerts: [...], collision_alerts: [...] }
+    - { catalog_ids: [...], catalog: {name_prefix, min_alt_km, max_alt_km, limit}, ... } to
+      propagate objects from the server-side catalog (see _catalog_records), alone or with `tles`
+    An optional `model` selects the propagator: "rk4" (default, fixed-step
+    numerical J2), "dp45" (adaptive, with optional `rtol`/`atol`) or
+    "secular_j2" (closed-form, much faster, km-level; see propagate_secular_j2).
+    Each satellite reports `nfev`, the acceleration evaluations spent on it.
+    `geodetic: true` reports WGS-84 geodetic lat/alt_m instead of spherical-Earth values.
+    Responds with { status: "ok", results: [...], alerts: [...], collision_alerts: [...] },
+    or streams NDJSON lines when the client sends `Accept: application/x-ndjson`.
+    `?format=columnar|npz` selects a columnar response (see _response_format).
     """
+    fmt = _response_format(req)
     try:
-        raw = await req.json()
+        with stage("read_body"):
+            raw = await req.json()
     except Exception:
         raise HTTPException(status_code=400, detail="Invalid JSON payload")
 
@@ -174,50 +1373,29 @@ async def propagate_endpoint(req: Request):
     else:
         samples = 60
 
-    if not tles_raw:
+    model, options = _propagation_model(raw)
+    records = await _catalog_records(raw)
+    if not tles_raw and not records:
         raise HTTPException(status_code=400, detail="No TLEs provided")
 
-    results = []
-    final_states = []
-    for raw_item in tles_raw:
-        if not isinstance(raw_item, dict):
-            raw_item = dict(raw_item) if raw_item else {}
-        item = _normalize_tle_item(raw_item)
-        # call the propagator (either real or mock)
-        sat = _call_propagator(item["name"], item["line1"], item["line2"], propagate_seconds, samples)
-        results.append(sat)
-        # record final state if available (for collision check)
-        traj = sat.get("trajectory") or []
-        if traj:
-            last = traj[-1]
-            final_states.append(
-                {
-                    "id": sat.get("id"),
-                    "name": sat.get("name"),
-                    "r_km": last.get("r_km"),
-                    "v_km_s": last.get("v_km_s"),
-                }
-            )
-
-    # collision detection: call pairwise util if available; otherwise empty
-    alerts = []
-    if pairwise_collision_check is not None:
-        try:
-            alerts = pairwise_collision_check(final_states, threshold_km=50.0)
-        except Exception as e:
-            log.exception("pairwise_collision_check failed: %s", e)
-            alerts = []
-    else:
-        alerts = []  # no alerts if no checker provided
+    items = []
+    with stage("normalize", objects=len(tles_raw)):
+        for raw_item in tles_raw:
+            if not isinstance(raw_item, dict):
+                raw_item = dict(raw_item) if raw_item else {}
+            items.append(_normalize_tle_item(raw_item))
+    items += records
+    columnar = fmt != "json"
+    if _wants_ndjson(req) and fmt != "npz":
+        return StreamingResponse(_stream_propagate(items, propagate_seconds, samples, columnar, model, options),
+                                 media_type=NDJSON_MEDIA_TYPE)
 
-    response = {
-        "status": "ok",
-        "results": results,
-        "alerts": alerts,
-        # include both keys used across your frontend variants
-        "collision_alerts": alerts,
-    }
-    return response
+    # call the propagator (either real or mock) once for the whole list
+    results = await _propagate_async(items, propagate_seconds, samples, model, options)
+
+    # collision check on the final states
+    alerts = _final_state_alerts(results)
+    return await _formatted_propagation(fmt, req, results, alerts)
 
 
 # -------------------------------
@@ -225,173 +1403,471 @@ async def propagate_endpoint(req: Request):
 # -------------------------------
 @app.post("/upload_and_propagate")
 async def upload_and_propagate(
+    request: Request,
     tle_file: UploadFile = File(...),
     propagate_seconds: int = Form(300),
     samples: int = Form(60),
+    validate_checksums: bool = Form(True),
+    model: str = Form(DEFAULT_MODEL),
+    rtol: Optional[float] = Form(None),
+    atol: Optional[float] = Form(None),
+    geodetic: bool = Form(False),
 ):
     """
-    Accepts a text file containing multiple TLEs (3 lines per satellite):
+    Accepts a text file containing multiple TLEs (3 lines per satellite, or
+    2-line records without names):
       Name
       Line1
       Line2
-    Returns the same structure as /propagate.
+    The multipart body is spooled completely before this handler runs
+    (Starlette's form parser), so parsing overlaps reading the spooled file,
+    not the upload itself; POST the text as a text/plain body to /api/alert
+    to propagate while it arrives. The file is parsed in chunks and
+    propagation starts as soon as the first records are read. Malformed records (bad structure or checksum) are skipped
+    and listed in `tle_errors`. Returns the same structure as /propagate
+    (including `?format=`).
     """
-    try:
-        content = await tle_file.read()
-        text = content.decode("utf-8")
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Failed to read uploaded file: {e}")
-
-    # build tles array for reuse of existing logic
-    lines = [l.strip() for l in text.splitlines() if l.strip() != ""]
-    if len(lines) % 3 != 0:
-        raise HTTPException(status_code=400, detail="TLE file must contain 3 lines per satellite: name, line1, line2")
+    fmt = _response_format(request)
+    model, options = _propagation_model({"model": model, "rtol": rtol, "atol": atol, "geodetic": geodetic})
+    tle_errors: List[Dict[str, Any]] = []
+    events = iter_tle_events(iter_upload_chunks(tle_file), validate_checksums)
+    results = [
+        traj async for traj in _iter_propagated(_tles_from_events(events, tle_errors), propagate_seconds, samples,
+                                                model, options)
+    ]
+    if not results:
+        raise _no_valid_tles(tle_errors)
 
-    tles = []
-    for i in range(0, len(lines), 3):
-        tles.append({"name": lines[i], "line1": lines[i+1], "line2": lines[i+2]})
-
-    results = []
-    final_states = []
-    for item in tles:
-        sat = _call_propagator(item["name"], item["line1"], item["line2"], propagate_seconds, samples)
-        results.append(sat)
-        traj = sat.get("trajectory") or []
-        if traj:
-            last = traj[-1]
-            final_states.append({"id": sat.get("id"), "name": sat.get("name"), "r_km": last.get("r_km"), "v_km_s": last.get("v_km_s")})
-    alerts = []
-    if pairwise_collision_check is not None:
-        try:
-            alerts = pairwise_collision_check(final_states, threshold_km=50.0)
-        except Exception:
-            alerts = []
-    return {"status": "ok", "results": results, "alerts": alerts, "collision_alerts": alerts}
+    alerts = _final_state_alerts(results)
+    return await _formatted_propagation(fmt, request, results, alerts, tle_errors=tle_errors)
 
 
 # -------------------------------
 # Alert endpoint (sample-based close approach detection)
 # -------------------------------
-def _parse_tle_text(text: str):
-    lines = [l.strip() for l in text.splitlines() if l.strip() != ""]
-    if len(lines) % 3 != 0:
-        raise ValueError("TLE text must contain 3 lines per satellite: name, line1, line2")
-    out = []
-    for i in range(0, len(lines), 3):
-        out.append({"name": lines[i], "line1": lines[i+1], "line2": lines[i+2]})
-    return out
-
-
-def _build_trajectories_from_tles(tles_list, propagate_seconds: int, samples: int):
-    results = []
+def _alert_items(tles_list):
+    items = []
     for item in tles_list:
         name = item.get("name") or item.get("sat") or "UNKNOWN"
         line1 = item.get("line1") or item.get("tle_line1") or ""
         line2 = item.get("line2") or item.get("tle_line2") or ""
-        sat = _call_propagator(name, line1, line2, propagate_seconds, samples)
-        results.append(sat)
-    return results
+        items.append({"name": name, "line1": line1, "line2": line2})
+    return items
 
 
-def _check_close_approaches(trajectories, threshold_km: float = 50.0):
-    encounters = []
-    if not trajectories or len(trajectories) < 2:
+async def _build_trajectories_from_tles(tles_list, propagate_seconds: int, samples: int,
+                                        model: str = DEFAULT_MODEL, options: Optional[Dict[str, float]] = None):
+    if isinstance(tles_list, list):
+        return await _propagate_async(tles_list, propagate_seconds, samples, model, options)
+    # async iterator of parsed upload records
+    return [traj async for traj in _iter_propagated(tles_list, propagate_seconds, samples, model, options)]
+
+
+class _StateBuffer:
+    """
+    Compact (samples, sats, 3) arrays of the per-sample states needed for
+    close-approach screening, filled one satellite at a time so trajectories
+    can be streamed out (and dropped) while the screen still sees everything.
+    `n_sats` is the initial capacity; the buffer grows when the satellite count
+    is not known upfront (streamed uploads).
+    """
+
+    def __init__(self, n_sats: int, n_samples: int, geodetic: bool = False):
+        self.size = 0  # satellites added so far
+        self.geodetic = geodetic  # lat/alt convention of the trajectories
+        self.names: List[Optional[str]] = [None] * n_sats
+        self.starts: List[Any] = [None] * n_sats  # first sample datetime per satellite
+        self.counts = np.zeros(n_sats, dtype=int)
+        self.T = None  # sample offsets (s) taken from the first satellite's clock
+        # NaN where a sample has no r_km / v_km_s
+        self.R = np.full((n_samples, n_sats, 3), np.nan)
+        self.V = np.full((n_samples, n_sats, 3), np.nan)
+        self.LLA = np.full((n_samples, n_sats, 3), np.nan)
+        self.clock_ok = True
+
+    @classmethod
+    def from_trajectories(cls, trajectories, geodetic: bool = False):
+        buf = cls(len(trajectories), min(len(t) for t in trajectories), geodetic)
+        for idx, traj in enumerate(trajectories):
+            buf.add(idx, traj)
+        return buf
+
+    def _grow(self, idx: int):
+        old = len(self.names)
+        cap = max(idx + 1, 2 * old)
+        self.names += [None] * (cap - old)
+        self.starts += [None] * (cap - old)
+        self.counts = np.concatenate([self.counts, np.zeros(cap - old, dtype=int)])
+        for attr in ("R", "V", "LLA"):
+            arr = getattr(self, attr)
+            grown = np.full((arr.shape[0], cap, 3), np.nan)
+            grown[:, :old] = arr
+            setattr(self, attr, grown)
+
+    def add(self, idx: int, traj: Trajectory):
+        if idx >= len(self.names):
+            self._grow(idx)
+        self.size = max(self.size, idx + 1)
+        n = min(len(traj), self.R.shape[0])
+        self.names[idx] = traj.name
+        self.counts[idx] = n
+        self.R[:n, idx] = traj.r[:n]
+        self.V[:n, idx] = traj.v[:n]
+        self.LLA[:n, idx, 0] = traj.lat[:n]
+        self.LLA[:n, idx, 1] = traj.lon[:n]
+        self.LLA[:n, idx, 2] = traj.alt[:n]
+        if traj.epoch is None or np.isnan(traj.t[:n]).any():
+            self.clock_ok = False
+            return
+        self.starts[idx] = traj.epoch
+        if self.T is None and n:
+            self.T = np.array(traj.t[:n])
+
+    def _pos(self, k: int, idx: int):
+        lat, lon, alt_m = (None if x != x else float(x) for x in self.LLA[k, idx])
+        r = self.R[k, idx]
+        return {"r_km": None if r[0] != r[0] else [float(x) for x in r], "lat": lat, "lon": lon, "alt_m": alt_m}
+
+    def _common_grid(self, T, n_samples: int):
+        """
+        Put every satellite on one UTC grid, start + T[k] with `start` the
+        latest epoch, and return `start`. Trajectories are sampled from their
+        own TLE epochs, so comparing them by sample index pairs states up to the
+        epoch difference apart. Satellites with an earlier epoch are therefore
+        re-propagated onto the grid with RK4 J2 (ephemeris.propagate_to_grid)
+        from their sample nearest its start; their stored states are replaced.
+        """
+        starts = self.starts[:self.size]
+        start = max(starts)
+        lag = np.array([(start - s).total_seconds() for s in starts])
+        moved = np.flatnonzero(lag > 1e-3)
+        if not len(moved):
+            return start
+        if propagate_to_grid is None:
+            raise HTTPException(status_code=503, detail="Screening TLEs with different epochs is unavailable")
+        step = (T[-1] - T[0]) / (n_samples - 1) if n_samples > 1 else 0.0
+        if n_samples > 1 and not np.allclose(np.diff(T), step):
+            raise HTTPException(status_code=400,
+                                detail="Screening TLEs with different epochs needs evenly spaced samples")
+        nearest = np.clip(np.rint(lag[moved] / step) if step else 0, 0, n_samples - 1).astype(int)
+        records = [{"epoch": starts[i] + timedelta(seconds=float(T[k])), "r0": self.R[k, i], "v0": self.V[k, i]}
+                   for i, k in zip(moved.tolist(), nearest.tolist())]
+        out = np.empty((len(moved), n_samples, 6))
+        propagate_to_grid(records, start + timedelta(seconds=float(T[0])), step, n_samples, out)
+        self.R[:n_samples, moved] = out[:, :, :3].transpose(1, 0, 2)
+        self.V[:n_samples, moved] = out[:, :, 3:].transpose(1, 0, 2)
+        lat, lon, alt = eci_to_geodetic_array(self.R[:n_samples, moved], T[:, None], epoch_jd=julian_date(start),
+                                              geodetic=self.geodetic)
+        self.LLA[:n_samples, moved] = np.stack([lat, lon, alt], axis=-1)
+        return start
+
+    def encounters(self, threshold_km: float, progress=None):
+        """
+        Encounter episodes: one per satellite pair and pass within `threshold_km`,
+        so pairs meeting on several orbits are reported once per pass. Each has
+        `entry`/`exit` times where the separation crosses the threshold and the
+        closest approach refined between samples (`tca`, `min_distance_km`,
+        `relative_speed_km_s`) from the stored r_km/v_km_s; `timestamp`,
+        `sample_index` and the positions refer to the sample nearest the TCA.
+        Satellites are compared on a common UTC grid (see _common_grid); the
+        `*_offset_s` fields count from its start, the latest TLE epoch.
+        `progress` is passed on to the screen (see close_approach_episodes).
+        """
+        encounters = []
+        n_samples = int(self.counts[:self.size].min()) if self.size else 0
+        if self.size < 2 or n_samples == 0:
+            return encounters
+        if close_approach_episodes is None:
+            log.warning("close_approach_episodes unavailable; skipping close-approach check")
+            return encounters
+        if self.clock_ok and self.T is not None and len(self.T) >= n_samples:
+            T = self.T[:n_samples]
+            start = self._common_grid(T, n_samples)
+            R, V = self.R[:n_samples, :self.size], self.V[:n_samples, :self.size]
+            timed = True
+        else:
+            # no usable clock: compare samples only
+            R = self.R[:n_samples, :self.size]
+            T, V = np.arange(n_samples, dtype=float), np.full_like(R, np.nan)
+            timed = False
+
+        pairs = 0
+
+        def counted(done: int, total: int, candidate_pairs: int):
+            nonlocal pairs
+            pairs = candidate_pairs
+            if progress is not None:
+                progress(done, total, candidate_pairs)
+
+        with stage("screen", objects=self.size, samples=self.size * n_samples):
+            episodes = close_approach_episodes(T, R, V, threshold_km=threshold_km, progress=counted)
+        SCREEN_PAIRS.inc(amount=pairs)
+        for n, (i, j) in enumerate(zip(episodes["i"].tolist(), episodes["j"].tolist())):
+            idx = int(episodes["k"][n])
+            times = dict.fromkeys(("tca", "tca_offset_s", "entry", "entry_offset_s", "exit", "exit_offset_s",
+                                   "duration_s", "relative_speed_km_s", "timestamp"))
+            if timed:
+                for key, field in (("tca", "tca"), ("entry", "entry"), ("exit", "exit")):
+                    offset = float(episodes[field][n])
+                    times[key + "_offset_s"] = offset
+                    times[key] = (start + timedelta(seconds=offset)).isoformat()
+                times["duration_s"] = times["exit_offset_s"] - times["entry_offset_s"]
+                times["relative_speed_km_s"] = float(episodes["relative_speed_km_s"][n])
+                times["timestamp"] = (start + timedelta(seconds=float(T[idx]))).isoformat()
+            encounters.append({
+                "sat1": self.names[i],
+                "sat2": self.names[j],
+                "min_distance_km": float(episodes["distance_km"][n]),
+                **times,
+                "sample_index": idx,
+                "pos1": self._pos(idx, i),
+                "pos2": self._pos(idx, j),
+            })
         return encounters
-    sample_counts = [len(t["trajectory"]) for t in trajectories]
-    n_samples = min(sample_counts)
-    n_sats = len(trajectories)
-    import numpy as _np
-    for idx in range(n_samples):
-        for i in range(n_sats):
-            for j in range(i+1, n_sats):
-                t1 = trajectories[i]["trajectory"][idx]
-                t2 = trajectories[j]["trajectory"][idx]
-                r1 = t1.get("r_km")
-                r2 = t2.get("r_km")
-                if r1 is None or r2 is None:
-                    continue
-                d = float(_np.linalg.norm(_np.array(r1) - _np.array(r2)))
-                if d <= threshold_km:
-                    already = any(
-                        e["sat1"] == trajectories[i]["name"] and e["sat2"] == trajectories[j]["name"]
-                        for e in encounters
-                    )
-                    if not already:
-                        encounters.append({
-                            "sat1": trajectories[i]["name"],
-                            "sat2": trajectories[j]["name"],
-                            "min_distance_km": d,
-                            "timestamp": t1.get("timestamp") or t2.get("timestamp"),
-                            "sample_index": idx,
-                            "pos1": {"r_km": t1.get("r_km"), "lat": t1.get("lat"), "lon": t1.get("lon"), "alt_m": t1.get("alt_m")},
-                            "pos2": {"r_km": t2.get("r_km"), "lat": t2.get("lat"), "lon": t2.get("lon"), "alt_m": t2.get("alt_m")},
-                        })
-    return encounters
 
 
-@app.post("/api/alert")
-@app.post("/alert")
-async def alert_endpoint(request: Request):
+def _check_close_approaches(trajectories, threshold_km: float = 50.0, geodetic: bool = False):
+    if not trajectories or len(trajectories) < 2:
+        return []
+    return _StateBuffer.from_trajectories(trajectories, geodetic).encounters(threshold_km)
+
+
+async def _alert_request(request: Request, buffer_body: bool = False):
     """
-    Two usage modes:
-     1) JSON: POST { tles: [{name,line1,line2}, ...], propagate_seconds: int, samples: int, threshold_km: float }
-     2) Multipart: POST formdata with 'tle_file' (text), 'propagate_seconds', 'samples', 'threshold_km'
+    Parameters of an /api/alert request in any of its three modes, as
+    (tles, propagate_seconds, samples, threshold_km, model, options, tle_errors).
+    `tles` is a list for JSON payloads and an async iterator of parsed upload
+    records otherwise, in which case `tle_errors` collects the rejected ones
+    (None for JSON). With `buffer_body` the uploaded text is read completely
+    first instead of being parsed as it arrives.
     """
     content_type = request.headers.get("content-type", "")
     propagate_seconds = 300
     samples = 60
     threshold_km = 50.0
+    tle_errors: Optional[List[Dict[str, Any]]] = None
 
-    # Multipart file upload handling
-    if "multipart/form-data" in content_type:
-        form = await request.form()
-        tle_file = form.get("tle_file")
-        if not tle_file:
-            raise HTTPException(status_code=400, detail="No 'tle_file' uploaded in form-data")
-        text = None
-        try:
-            if hasattr(tle_file, "read"):
-                content = await tle_file.read()
-                text = content.decode("utf-8")
+    if "multipart/form-data" in content_type or content_type.startswith("text/plain"):
+        if "multipart/form-data" in content_type:
+            with stage("read_body"):
+                params = await request.form()
+            tle_file = params.get("tle_file")
+            if not tle_file:
+                raise HTTPException(status_code=400, detail="No 'tle_file' uploaded in form-data")
+            if not hasattr(tle_file, "read"):
+                chunks = _aiter_items([str(tle_file).encode("utf-8")])
+            elif buffer_body:
+                chunks = _aiter_items([await tle_file.read()])
             else:
-                text = str(tle_file)
-        except Exception as e:
-            raise HTTPException(status_code=400, detail=f"Failed reading uploaded file: {e}")
+                chunks = iter_upload_chunks(tle_file)
+        else:
+            params = request.query_params
+            chunks = _aiter_items([await request.body()]) if buffer_body else request.stream()
 
         try:
-            tles_list = _parse_tle_text(text)
-        except Exception as e:
-            raise HTTPException(status_code=400, detail=f"TLE parse error: {e}")
-
-        try:
-            if form.get("propagate_seconds"):
-                propagate_seconds = int(form.get("propagate_seconds"))
-            if form.get("samples"):
-                samples = int(form.get("samples"))
-            if form.get("threshold_km"):
-                threshold_km = float(form.get("threshold_km"))
+            if params.get("propagate_seconds"):
+                propagate_seconds = int(params.get("propagate_seconds"))
+            if params.get("samples"):
+                samples = int(params.get("samples"))
+            if params.get("threshold_km"):
+                threshold_km = float(params.get("threshold_km"))
         except Exception:
             pass
+        validate_checksums = str(params.get("validate_checksums", "true")).lower() not in ("0", "false", "no")
+        model, options = _propagation_model(params)
+        tle_errors = []
+        tles_list = _tles_from_events(iter_tle_events(chunks, validate_checksums), tle_errors)
 
     else:
         try:
-            raw = await request.json()
+            with stage("read_body"):
+                raw = await request.json()
         except Exception:
             raise HTTPException(status_code=400, detail="Invalid JSON payload")
         tles_list = raw.get("tles") or raw.get("satellites") or raw.get("sat") or []
-        if not isinstance(tles_list, list) or len(tles_list) == 0:
+        if not isinstance(tles_list, list):
+            raise HTTPException(status_code=400, detail="Provide `tles` array in JSON or upload file")
+        with stage("normalize", objects=len(tles_list)):
+            tles_list = _alert_items(tles_list)
+        tles_list += await _catalog_records(raw)
+        if not tles_list:
             raise HTTPException(status_code=400, detail="Provide `tles` array in JSON or upload file")
         propagate_seconds = int(raw.get("propagate_seconds") or raw.get("predict_seconds") or propagate_seconds)
         samples = int(raw.get("samples") or raw.get("sample_interval") or samples)
         threshold_km = float(raw.get("threshold_km") or threshold_km)
+        model, options = _propagation_model(raw)
+    return tles_list, propagate_seconds, samples, threshold_km, model, options, tle_errors
+
+
+@app.post("/api/alert")
+@app.post("/alert")
+async def alert_endpoint(request: Request):
+    """
+    Three usage modes:
+     1) JSON: POST { tles: [{name,line1,line2}, ...], propagate_seconds: int, samples: int, threshold_km: float,
+        model: str, rtol: float, atol: float, geodetic: bool }; catalog objects can be added or used
+        instead of `tles` with `catalog_ids` / `catalog` filters as for /api/propagate
+     2) Multipart: POST formdata with 'tle_file' (text), 'propagate_seconds', 'samples', 'threshold_km',
+        'validate_checksums', 'model', 'rtol', 'atol', 'geodetic'
+     3) Plain text: POST the TLE file itself as a text/plain body with the parameters in the query
+        string; propagation starts while the body is still arriving
+    Uploaded text is parsed incrementally (multipart bodies only after Starlette has spooled them);
+    malformed records are skipped and listed in `tle_errors`.
+    Every mode streams NDJSON lines when the client sends `Accept: application/x-ndjson`,
+    and `?format=columnar|npz` returns columnar trajectories.
+    """
+    fmt = _response_format(request)
+    columnar = fmt != "json"
+    # a StreamingResponse also listens on receive() for disconnects, so the
+    # body has to be read before the response starts
+    (tles_list, propagate_seconds, samples, threshold_km, model, options,
+     tle_errors) = await _alert_request(request, buffer_body=_wants_ndjson(request) and fmt != "npz")
+
+    if _wants_ndjson(request) and fmt != "npz":
+        return StreamingResponse(
+            _stream_alert(tles_list, propagate_seconds, samples, threshold_km, columnar, tle_errors, model, options),
+            media_type=NDJSON_MEDIA_TYPE,
+        )
 
     try:
-        trajectories = _build_trajectories_from_tles(tles_list, propagate_seconds, samples)
+        trajectories = await _build_trajectories_from_tles(tles_list, propagate_seconds, samples, model, options)
     except HTTPException:
         raise
     except Exception as e:
         log.exception("Failed building trajectories for alert: %s", e)
         raise HTTPException(status_code=500, detail="Server error while propagating trajectories")
+    if tle_errors is not None and not trajectories:
+        raise _no_valid_tles(tle_errors)
+    extra = {} if tle_errors is None else {"tle_errors": tle_errors}
+
+    encounters = await run_in_threadpool(_check_close_approaches, trajectories, threshold_km,
+                                         bool((options or {}).get("geodetic")))
+    return await _encoded_response(_alert_content, fmt, request.query_params.get("dtype") == "float32",
+                                   trajectories, encounters, **extra)
+
+
+def _alert_content(fmt: str, float32: bool, trajectories: List[Trajectory], encounters, **extra):
+    if fmt == "npz":
+        return _npz_response(trajectories, float32=float32, encounters=encounters, **extra)
+    if fmt == "columnar":
+        return {"status": "ok", "format": "columnar", "trajectories": [_columnar_json(traj) for traj in trajectories],
+                "encounters": encounters, **extra}
+    return {"status": "ok", "trajectories": [traj.to_dict() for traj in trajectories], "encounters": encounters,
+            **extra}
+
+
+# -------------------------------
+# Background jobs (long-running screenings)
+# -------------------------------
+# JOB_WORKERS screenings run at a time and at most JOB_QUEUE_SIZE more wait;
+# finished jobs and their results are kept for JOB_RESULT_TTL_S seconds, and
+# only the JOB_MAX_RESULTS most recent ones (the oldest are dropped first).
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", "2"))
+JOB_QUEUE_SIZE = int(os.environ.get("JOB_QUEUE_SIZE", "16"))
+JOB_RESULT_TTL_S = float(os.environ.get("JOB_RESULT_TTL_S", "3600"))
+JOB_MAX_RESULTS = int(os.environ.get("JOB_MAX_RESULTS", "64"))
+_job_manager: Optional[JobManager] = None
+
+
+def _get_job_manager() -> JobManager:
+    global _job_manager
+    if _job_manager is None:
+        _job_manager = JobManager(JOB_WORKERS, JOB_QUEUE_SIZE, JOB_RESULT_TTL_S, JOB_MAX_RESULTS)
+    return _job_manager
+
+
+@app.on_event("shutdown")
+async def _shutdown_jobs():
+    global _job_manager
+    if _job_manager is not None:
+        await _job_manager.shutdown()
+        _job_manager = None
+
+
+def _alert_job(tles_list, propagate_seconds: int, samples: int, threshold_km: float, model: str,
+               options: Dict[str, Any], tle_errors: Optional[List[Dict[str, Any]]], include_trajectories: bool):
+    # job runner for a screening: propagates in chunks like the streamed alert,
+    # keeping only the compact states unless the trajectories were asked for
+    async def run(job: Job) -> Dict[str, Any]:
+        total = len(tles_list) if isinstance(tles_list, list) else None
+        job.progress.update(stage="propagating", satellites_total=total, satellites_propagated=0)
+        buf = _StateBuffer(total or STREAM_CHUNK_SIZE, max(0, samples), bool((options or {}).get("geodetic")))
+        trajectories = []
+        idx = 0
+        async for traj in _iter_propagated(tles_list, propagate_seconds, samples, model, options):
+            job.check_cancelled()
+            buf.add(idx, traj)
+            if include_trajectories:
+                trajectories.append(traj)
+            idx += 1
+            job.progress["satellites_propagated"] = idx
+        if tle_errors is not None and idx == 0:
+            raise _no_valid_tles(tle_errors)
+        job.progress.update(stage="screening", satellites_total=idx, samples_screened=0, candidate_pairs=0)
+
+        def progress(done: int, total_samples: int, pairs: int):
+            job.check_cancelled()
+            job.progress.update(samples_screened=done, samples_total=total_samples, candidate_pairs=pairs)
+
+        encounters = await run_in_threadpool(buf.encounters, threshold_km, progress)
+        job.progress.update(stage="done", encounters=len(encounters))
+        result = {"status": "ok", "count": idx, "encounters": encounters}
+        if include_trajectories:
+            result["trajectories"] = [traj.to_dict() for traj in trajectories]
+        if tle_errors is not None:
+            result["tle_errors"] = tle_errors
+        return result
+
+    return run
+
+
+@app.post("/api/jobs/alert", status_code=202)
+async def submit_alert_job(request: Request):
+    """
+    Queue an /api/alert screening (any of its three payload modes) as a
+    background job and return its id right away. Poll GET /api/jobs/{id} for
+    progress (satellites propagated, samples screened, candidate pairs) and
+    fetch GET /api/jobs/{id}/result when done; DELETE /api/jobs/{id} cancels.
+    Results hold the encounters (and trajectories with
+    `?include_trajectories=true`). A full queue is a 429.
+    """
+    (tles_list, propagate_seconds, samples, threshold_km, model, options,
+     tle_errors) = await _alert_request(request, buffer_body=True)
+    include = request.query_params.get("include_trajectories", "false").lower() in ("1", "true", "yes")
+    try:
+        job = _get_job_manager().submit("alert", _alert_job(tles_list, propagate_seconds, samples, threshold_km,
+                                                             model, options, tle_errors, include))
+    except JobQueueFull:
+        raise HTTPException(status_code=429, detail="Job queue is full, retry later")
+    return {"status": "ok", **job.to_dict()}
+
+
+def _job_or_404(job_id: str) -> Job:
+    job = _get_job_manager().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found or expired")
+    return job
+
+
+@app.get("/api/jobs")
+async def list_jobs():
+    return {"status": "ok", "jobs": [job.to_dict() for job in _get_job_manager().list()]}
+
+
+@app.get("/api/jobs/{job_id}")
+async def job_status(job_id: str):
+    return {"status": "ok", **_job_or_404(job_id).to_dict()}
+
+
+@app.get("/api/jobs/{job_id}/result")
+async def job_result(job_id: str):
+    job = _job_or_404(job_id)
+    if job.status != "done":
+        raise HTTPException(status_code=409, detail=job.to_dict())
+    return await _encoded_response(lambda: job.result)
+
 
-    encounters = _check_close_approaches(trajectories, threshold_km=threshold_km)
-    return {"status": "ok", "trajectories": trajectories, "encounters": encounters}
+@app.delete("/api/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    _job_or_404(job_id)
+    return {"status": "ok", **_get_job_manager().cancel(job_id).to_dict()}
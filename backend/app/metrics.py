@@ -0,0 +1,286 @@
+# backend/app/metrics.py
+import bisect
+import os
+import sys
+import threading
+import time
+from collections import Counter as _Tally
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+# Prometheus text exposition (format 0.0.4) without the client library: a
+# handful of counters and histograms updated under a lock, plus collectors
+# that report values owned elsewhere (cache counters) at scrape time.
+CONTENT_TYPE = "text/plain; version=0.0.4"  # starlette appends the charset
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Iterable[str], values: Iterable[Any], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = ()):
+        self.name, self.help, self.labelnames = name, help, tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: Any, amount: float = 1.0):
+        key = tuple(str(x) for x in labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{_labels(self.labelnames, key)} {_number(v)}" for key, v in values]
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name, self.help, self.labelnames = name, help, tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._values: Dict[Tuple[str, ...], List[Any]] = {}  # key -> [per-bucket counts, sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: Any):
+        key = tuple(str(x) for x in labels)
+        slot = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][slot] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = sorted((key, (list(counts), total, n)) for key, (counts, total, n) in self._values.items())
+        out = []
+        for key, (counts, total, n) in values:
+            running = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                running += count
+                le = 'le="' + _number(bound) + '"'
+                out.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {running}")
+            out.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(total)}")
+            out.append(f"{self.name}_count{_labels(self.labelnames, key)} {n}")
+        return out
+
+
+# collector output: (name, kind, help, [(labels dict, value), ...])
+Family = Tuple[str, str, str, List[Tuple[Dict[str, Any], float]]]
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: List[Any] = []
+        self.collectors: List[Callable[[], List[Family]]] = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Callable[[], List[Family]]):
+        self.collectors.append(collector)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines += [f"# HELP {metric.name} {metric.help}", f"# TYPE {metric.name} {metric.kind}"]
+            lines += metric.samples()
+        for collector in self.collectors:
+            for name, kind, help, values in collector():
+                lines += [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+                lines += [f"{name}{_labels(labels.keys(), labels.values())} {_number(value)}"
+                          for labels, value in values]
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+REQUESTS = REGISTRY.register(Counter(
+    "leo_http_requests_total", "HTTP requests by handler, method and status.", ("handler", "method", "status")))
+REQUEST_SECONDS = REGISTRY.register(Histogram(
+    "leo_http_request_duration_seconds", "HTTP request latency, until the response is complete.",
+    ("handler", "method")))
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "leo_stage_duration_seconds", "Time spent per processing stage.", ("stage",)))
+STAGE_OBJECTS = REGISTRY.register(Counter(
+    "leo_stage_objects_total", "Objects (satellites or TLE records) handled per stage.", ("stage",)))
+STAGE_SAMPLES = REGISTRY.register(Counter(
+    "leo_stage_samples_total", "Object-samples (objects x time samples) handled per stage.", ("stage",)))
+SCREEN_PAIRS = REGISTRY.register(Counter(
+    "leo_screen_candidate_pairs_total", "Candidate pairs (per sample) refined by the close-approach screens."))
+
+# per-request stage timings, (stage, seconds, end perf_counter) tuples; set by MetricsMiddleware
+_request_timings: ContextVar[Optional[List[Tuple[str, float, float]]]] = ContextVar("request_timings", default=None)
+
+
+def record_stage(name: str, seconds: float, objects: Optional[int] = None, samples: Optional[int] = None):
+    STAGE_SECONDS.observe(seconds, name)
+    if objects:
+        STAGE_OBJECTS.inc(name, amount=objects)
+    if samples:
+        STAGE_SAMPLES.inc(name, amount=samples)
+    timings = _request_timings.get()
+    if timings is not None:
+        timings.append((name, seconds, time.perf_counter()))
+
+
+@contextmanager
+def stage(name: str, objects: Optional[int] = None, samples: Optional[int] = None):
+    """
+    Time a block as processing stage `name`: observed in the stage histogram,
+    counted with its objects/samples, and listed in the current request's
+    Server-Timing header. Costs two perf_counter calls and a lock.
+    """
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(name, time.perf_counter() - t0, objects, samples)
+
+
+class SamplingProfiler:
+    """
+    Statistical profiler: a background thread samples the Python stacks of
+    all other threads every `interval_s` and tallies them as collapsed stacks
+    ("thread;outer;...;inner count" lines, the input of flamegraph.pl and
+    speedscope). Nothing is traced in between samples, so the profiled code
+    runs at full speed.
+    """
+
+    def __init__(self, interval_s: float = 0.005):
+        self.interval_s = interval_s
+        self.stacks: _Tally = _Tally()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        me = threading.get_ident()
+        names = {}
+        while not self._stop.wait(self.interval_s):
+            if len(names) != threading.active_count():
+                names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+def _handler(scope) -> str:
+    endpoint = scope.get("endpoint")
+    return getattr(endpoint, "__name__", None) or "unmatched"
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware counting requests and their latency per handler. With
+    `server_timing` the response carries a Server-Timing header of the stages
+    finished before it started (summed per stage), plus `respond`: the time
+    from the last stage to the response start (building and encoding it) and
+    `total`. With a `profile_dir`, requests sent with `X-Profile: 1` run under
+    SamplingProfiler; if they take at least `profile_min_s`, the collapsed
+    stacks are written to that directory under the name given in the
+    response's X-Profile header.
+    """
+
+    def __init__(self, app, server_timing: bool = False, profile_dir: Optional[str] = None,
+                 profile_min_s: float = 0.0, profile_interval_s: float = 0.005):
+        self.app = app
+        self.server_timing = server_timing
+        self.profile_dir = profile_dir
+        self.profile_min_s = profile_min_s
+        self.profile_interval_s = profile_interval_s
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        timings: List[Tuple[str, float, float]] = []
+        token = _request_timings.set(timings)
+        t0 = time.perf_counter()
+        status = 500
+        profiler, profile_name = None, None
+        if self.profile_dir and dict(scope.get("headers") or []).get(b"x-profile", b"").lower() in (b"1", b"true"):
+            profile_name = f"{int(time.time() * 1000)}-{os.getpid()}.folded"
+            profiler = SamplingProfiler(self.profile_interval_s)
+            profiler.start()
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                now = time.perf_counter()
+                if timings:
+                    record_stage("respond", now - max(end for _, _, end in timings))
+                headers = list(message.get("headers") or [])
+                if self.server_timing:
+                    headers.append((b"server-timing", _server_timing(timings, now - t0).encode()))
+                if profile_name:
+                    headers.append((b"x-profile", profile_name.encode()))
+                message = dict(message, headers=headers)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _request_timings.reset(token)
+            elapsed = time.perf_counter() - t0
+            handler = _handler(scope)
+            REQUESTS.inc(handler, scope["method"], status)
+            REQUEST_SECONDS.observe(elapsed, handler, scope["method"])
+            if profiler is not None:
+                profiler.stop()
+                if elapsed >= self.profile_min_s:
+                    os.makedirs(self.profile_dir, exist_ok=True)
+                    with open(os.path.join(self.profile_dir, profile_name), "w") as f:
+                        f.write(profiler.collapsed())
+
+
+def _server_timing(timings: List[Tuple[str, float, float]], total: float) -> str:
+    per_stage: Dict[str, float] = {}
+    for name, seconds, _ in timings:
+        per_stage[name] = per_stage.get(name, 0.0) + seconds
+    per_stage["total"] = total
+    return ", ".join(f"{name};dur={seconds * 1000:.2f}" for name, seconds in per_stage.items())
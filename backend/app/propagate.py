@@ -1,12 +1,49 @@
 # backend/app/propagate.py
+import os
 import numpy as np
 from datetime import datetime, timezone, timedelta
-from math import atan2
-from typing import Tuple
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.cache import LRUCache, tle_key
+from app.metrics import stage
+from app.trajectory import Trajectory
 
 mu = 398600.4418  # km^3/s^2
 J2 = 1.08263e-3
 Re = 6378.137     # km
+WGS84_F = 1 / 298.257223563
+WGS84_E2 = WGS84_F * (2 - WGS84_F)  # first eccentricity squared
+
+_J2_AXIS_TERMS = np.array([1.0, 1.0, 3.0])
+
+# Propagation models selectable per request: "rk4" integrates the J2 equations
+# of motion with fixed 10 s steps, "dp45" adaptively to a tolerance, and
+# "secular_j2" evaluates the analytical model below.
+PROPAGATION_MODELS = ("rk4", "dp45", "secular_j2")
+DEFAULT_MODEL = "rk4"
+# request-tunable options per model, with their defaults
+MODEL_OPTIONS = {"dp45": {"rtol": 1e-10, "atol": 1e-7}}
+# options accepted by every model: geodetic=True reports WGS-84 geodetic
+# latitude/altitude instead of spherical-Earth values
+OUTPUT_OPTIONS = {"geodetic": False}
+
+# Parsed elements, epoch and initial state per TLE, keyed by tle_key(line1, line2)
+tle_cache = LRUCache(
+    max_entries=int(os.environ.get("TLE_CACHE_MAX_ENTRIES", "50000")),
+    max_bytes=int(os.environ.get("TLE_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+)
+
+# Propagated trajectories (read-only Trajectory objects) keyed by
+# (tle key, sample spacing, model, options); see cached_trajectories
+def _cached_nbytes(entry: Trajectory) -> int:
+    return 512 + entry.nbytes
+
+trajectory_cache = LRUCache(
+    max_entries=int(os.environ.get("TRAJECTORY_CACHE_MAX_ENTRIES", "20000")),
+    max_bytes=int(os.environ.get("TRAJECTORY_CACHE_MAX_BYTES", str(256 * 1024 * 1024))),
+    sizeof=_cached_nbytes,
+    ttl_seconds=float(os.environ.get("TRAJECTORY_CACHE_TTL", "300")),
+)
 
 def tle_line2_to_elements(line2: str) -> Tuple[float,float,float,float,float,float]:
     # Parse columns from TLE line 2 (classic fixed columns)
@@ -21,46 +58,49 @@ def tle_line2_to_elements(line2: str) -> Tuple[float,float,float,float,float,flo
     return a, e, i, raan, argp, M
 
 def kepler_E(M, e, tol=1e-10):
-    E = M if e < 0.8 else np.pi
+    # Newton iteration on Kepler's equation; M and e may be scalars or
+    # equal-length arrays (all entries are iterated until the worst converges)
+    M = np.asarray(M, dtype=float)
+    e = np.asarray(e, dtype=float)
+    E = np.where(e < 0.8, M, np.pi)
     for _ in range(1000):
         f = E - e*np.sin(E) - M
         fp = 1 - e*np.cos(E)
         dE = -f / fp
-        E += dE
-        if abs(dE) < tol:
+        E = E + dE
+        if np.all(np.abs(dE) < tol):
             break
-    return E
+    return E if E.ndim else float(E)
 
 def coe_to_rv(a, e, i, raan, argp, M):
+    # Elements may be scalars (returns (3,) vectors) or arrays of length N
+    # (returns (N,3) vectors), so a whole catalog converts in one call.
     E = kepler_E(M, e)
     # true anomaly
     nu = 2*np.arctan2(np.sqrt(1+e)*np.sin(E/2.0), np.sqrt(1-e)*np.cos(E/2.0))
     # perifocal coordinates
-    r_pf = np.array([a*(np.cos(E)-e), a*np.sqrt(1-e**2)*np.sin(E), 0.0])
-    r_norm = np.linalg.norm(r_pf)
-    v_pf = np.array([-np.sin(E), np.sqrt(1-e**2)*np.cos(E), 0.0]) * np.sqrt(mu*a) / r_norm
+    x_pf = a*(np.cos(E)-e)
+    y_pf = a*np.sqrt(1-e**2)*np.sin(E)
+    r_norm = np.hypot(x_pf, y_pf)
+    vx_pf = -np.sin(E) * np.sqrt(mu*a) / r_norm
+    vy_pf = np.sqrt(1-e**2)*np.cos(E) * np.sqrt(mu*a) / r_norm
     cosO, sinO = np.cos(raan), np.sin(raan)
     cosi, sini = np.cos(i), np.sin(i)
     cosw, sinw = np.cos(argp), np.sin(argp)
-    R3_O = np.array([[cosO, -sinO, 0],[sinO, cosO, 0],[0,0,1]])
-    R1_i = np.array([[1,0,0],[0, cosi, -sini],[0, sini, cosi]])
-    R3_w = np.array([[cosw, -sinw, 0],[sinw, cosw, 0],[0,0,1]])
-    Q = R3_O @ R1_i @ R3_w
-    r_eci = Q @ r_pf
-    v_eci = Q @ v_pf
+    # first two columns of Q = R3(raan) @ R1(i) @ R3(argp)
+    P = np.stack([cosO*cosw - sinO*sinw*cosi, sinO*cosw + cosO*sinw*cosi, sinw*sini], axis=-1)
+    Q = np.stack([-cosO*sinw - sinO*cosw*cosi, -sinO*sinw + cosO*cosw*cosi, cosw*sini], axis=-1)
+    r_eci = np.asarray(x_pf)[..., None]*P + np.asarray(y_pf)[..., None]*Q
+    v_eci = np.asarray(vx_pf)[..., None]*P + np.asarray(vy_pf)[..., None]*Q
     return r_eci, v_eci, nu
 
 def acceleration_with_J2(r):
-    x, y, z = r
-    r_norm = np.linalg.norm(r)
+    # r is a single (3,) position or an (N,3) stack of positions
+    r_norm = np.linalg.norm(r, axis=-1, keepdims=True)
     a_gravity = -mu * r / r_norm**3
-    z2 = z**2
+    z2 = r[..., 2:3]**2
     r2 = r_norm**2
-    a_J2 = 1.5 * J2 * mu * (Re**2 / r_norm**5) * np.array([
-        x * (5*z2/r2 - 1),
-        y * (5*z2/r2 - 1),
-        z * (5*z2/r2 - 3)
-    ])
+    a_J2 = 1.5 * J2 * mu * (Re**2 / r_norm**5) * r * (5*z2/r2 - _J2_AXIS_TERMS)
     return a_gravity + a_J2
 
 def propagate_rk4_J2(r0, v0, dt, steps=1):
@@ -76,6 +116,262 @@ def propagate_rk4_J2(r0, v0, dt, steps=1):
         v = v + (h/6.0)*(k1v + 2*k2v + 2*k3v + k4v)
     return r, v
 
+def propagate_rk4_J2_stepper(r0, v0, offsets, max_step=10.0):
+    # Continuous stepper: carries the state forward from one output offset
+    # (seconds from the r0/v0 epoch) to the next instead of re-integrating
+    # from epoch for every sample, yielding (r, v) at each offset in order.
+    # Each interval is split into equal steps of at most `max_step` seconds;
+    # for LEO this agrees with per-sample integration from epoch to within
+    # a few millimetres over a day (both are 10 s RK4 with slightly different
+    # step placement; identical when the sample spacing is a multiple of
+    # `max_step`).
+    r = r0.copy()
+    v = v0.copy()
+    t = 0.0
+    for off in offsets:
+        dt = off - t
+        if dt != 0:
+            steps = max(1, int(np.ceil(abs(dt) / max_step)))
+            r, v = propagate_rk4_J2(r, v, dt, steps=steps)
+            t = off
+        yield r, v
+
+def secular_j2_rates(a, e, i):
+    # First-order secular J2 rates (rad/s) of RAAN, argument of perigee and
+    # mean anomaly for mean elements a (km), e, i (rad); scalars or arrays.
+    n = np.sqrt(mu / a**3)
+    p = a * (1 - e**2)
+    k = 1.5 * J2 * (Re / p)**2 * n
+    sin2i = np.sin(i)**2
+    raan_dot = -k * np.cos(i)
+    argp_dot = k * (2.0 - 2.5*sin2i)
+    M_dot = n + k * np.sqrt(1 - e**2) * (1.0 - 1.5*sin2i)
+    return raan_dot, argp_dot, M_dot
+
+def _mean_semi_major_axis(a, e, i, argp, M):
+    # The RK4 path treats the TLE elements as osculating, so its orbit has the
+    # mean semi-major axis a - da, with da the first-order J2 short-period
+    # term at epoch (Kozai). Using that mean value keeps the analytical mean
+    # motion consistent with the integrated orbit (1e-3 relative otherwise,
+    # i.e. ~35 km/h along-track in LEO).
+    E = kepler_E(M, e)
+    nu = 2*np.arctan2(np.sqrt(1+e)*np.sin(E/2.0), np.sqrt(1-e)*np.cos(E/2.0))
+    a_r3 = (1.0 / (1 - e*np.cos(E)))**3
+    sin2i = np.sin(i)**2
+    da = J2 * Re**2 / a * ((1 - 1.5*sin2i)*(a_r3 - (1 - e**2)**-1.5) + 1.5*sin2i*a_r3*np.cos(2*(argp + nu)))
+    return a - da
+
+def _kepler_cos_sin(M, e, tol=1e-10):
+    # cos(E), sin(E) solving Kepler's equation like kepler_E, but once the
+    # Newton corrections are small (|dE| < 1e-3) cos/sin are updated by
+    # rotating through dE with a short series instead of re-evaluating trig,
+    # which dominates the cost for large (samples, sats) grids.
+    E = np.where(e < 0.8, M + e*np.sin(M), np.pi)
+    c, s = np.cos(E), np.sin(E)
+    for _ in range(1000):
+        dE = (M - E + e*s) / (1 - e*c)
+        E = E + dE
+        big = np.abs(dE).max() if dE.size else 0.0
+        if big > 1e-3:
+            c, s = np.cos(E), np.sin(E)
+            continue
+        d2 = dE*dE
+        cd = 1 - d2*(0.5 - d2/24.0)
+        sd = dE*(1 - d2/6.0)
+        c, s = c*cd - s*sd, s*cd + c*sd
+        if big < tol:
+            break
+    return c, s
+
+def _cos_sin_linear(x0, rate, t):
+    # cos/sin of x0 + rate*t over a (S,1) time column; on a uniform grid the
+    # angle is advanced by repeated rotation (one trig call per satellite)
+    t = t[:, 0]
+    S = len(t)
+    h = t[1] - t[0] if S > 1 else 0.0
+    if S < 3 or not np.allclose(np.diff(t), h, rtol=0, atol=1e-9 * max(1.0, abs(h))):
+        x = x0 + rate*t[:, None]
+        return np.cos(x), np.sin(x)
+    c = np.empty((S, len(x0)))
+    s = np.empty((S, len(x0)))
+    c[0], s[0] = np.cos(x0 + rate*t[0]), np.sin(x0 + rate*t[0])
+    cd, sd = np.cos(rate*h), np.sin(rate*h)
+    for k in range(1, S):
+        c[k] = c[k-1]*cd - s[k-1]*sd
+        s[k] = s[k-1]*cd + c[k-1]*sd
+    return c, s
+
+def propagate_secular_j2(elements, offsets):
+    """
+    Analytical propagation: Keplerian motion on the TLE elements (as returned
+    by tle_line2_to_elements) with RAAN, argument of perigee and mean anomaly
+    drifting at their secular J2 rates. Every offset (seconds from epoch) is
+    evaluated in closed form, so cost grows with the number of samples, not
+    with the window length. For 1000 satellites over 24 h, propagation alone
+    is ~70-95x cheaper than "rk4" at 15-minute sampling (97 samples: ~0.05 s
+    vs ~4.7 s), ~25x at 5-minute and ~5x at 1-minute sampling; counting the
+    frame conversion both paths share, ~40-50x, ~15-20x and ~3-4x. The Kepler
+    solve per sample dominates, so dense sampling gains little over "rk4".
+    `elements` is (6,) or (N,6); returns R, V of shape (S,N,3).
+
+    Accuracy against the RK4 path: the semi-major axis is mapped to the mean
+    value of the orbit RK4 integrates (_mean_semi_major_axis), so the two share
+    the same mean motion and differ mainly by the J2 short-period terms the
+    analytical model leaves out: within ~10 km over 24 h for an ISS-like orbit
+    and ~30 km for a Molniya orbit (without the mapping the along-track error
+    grows to ~900 km per day). Velocities differ by 10-20 m/s. Good enough
+    as a first-pass conjunction filter with a padded threshold; use "rk4" for
+    reported distances.
+    """
+    el = np.asarray(elements, dtype=float).reshape(-1, 6)
+    a, e, i, raan, argp, M = el.T
+    a = _mean_semi_major_axis(a, e, i, argp, M)
+    raan_dot, argp_dot, M_dot = secular_j2_rates(a, e, i)
+    t = np.asarray(offsets, dtype=float).reshape(-1, 1)
+    # same perifocal -> ECI conversion as coe_to_rv, with the per-satellite
+    # terms computed once instead of once per sample
+    cosE, sinE = _kepler_cos_sin(M + M_dot*t, e)
+    b = np.sqrt(1 - e**2)
+    x_pf = a*(cosE - e)
+    y_pf = (a*b)*sinE
+    k = np.sqrt(mu*a) / (a*(1 - e*cosE))
+    vx_pf = -sinE*k
+    vy_pf = b*cosE*k
+    cosO, sinO = _cos_sin_linear(raan, raan_dot, t)
+    cosw, sinw = _cos_sin_linear(argp, argp_dot, t)
+    cosi, sini = np.cos(i), np.sin(i)
+    P = (cosO*cosw - sinO*sinw*cosi, sinO*cosw + cosO*sinw*cosi, sinw*sini)
+    Q = (-cosO*sinw - sinO*cosw*cosi, -sinO*sinw + cosO*cosw*cosi, cosw*sini)
+    R = np.empty(cosE.shape + (3,))
+    V = np.empty(cosE.shape + (3,))
+    for c in range(3):
+        R[..., c] = x_pf*P[c] + y_pf*Q[c]
+        V[..., c] = vx_pf*P[c] + vy_pf*Q[c]
+    return R, V
+
+# Dormand-Prince 5(4) tableau with Shampine's 4th-order dense output
+_DP_A = [
+    [],
+    [1/5],
+    [3/40, 9/40],
+    [44/45, -56/15, 32/9],
+    [19372/6561, -25360/2187, 64448/6561, -212/729],
+    [9017/3168, -355/33, 46732/5247, 49/176, -5103/18656],
+]
+_DP_B = np.array([35/384, 0, 500/1113, 125/192, -2187/6784, 11/84, 0])
+_DP_E = np.array([-71/57600, 0, 71/16695, -71/1920, 17253/339200, -22/525, 1/40])  # 5th - 4th order
+_DP_P = np.array([
+    [1, -8048581381/2820520608, 8663915743/2820520608, -12715105075/11282082432],
+    [0, 0, 0, 0],
+    [0, 131558114200/32700410799, -68118460800/10900136933, 87487479700/32700410799],
+    [0, -1754552775/470086768, 14199869525/1410260304, -10690763975/1880347072],
+    [0, 127303824393/49829197408, -318862633887/49829197408, 701980252875/199316789632],
+    [0, -282668133/205662961, 2019193451/616988883, -1453857185/822651844],
+    [0, 40617522/29380423, -110615467/29380423, 69997945/29380423],
+])
+
+def _state_derivative(y):
+    # y is (N,6) stacked [r, v]; returns [v, a]
+    return np.concatenate([y[:, 3:], acceleration_with_J2(y[:, :3])], axis=1)
+
+def _rms(x):
+    return np.sqrt(np.mean(x*x, axis=1))
+
+def propagate_dp45_J2(r0, v0, offsets, rtol=1e-9, atol=1e-6, max_steps=100000):
+    """
+    Adaptive Dormand-Prince 5(4) integration of the J2 equations of motion.
+    Every satellite gets its own step size, controlled so the local error
+    estimate stays below atol + rtol*|y| per component (km and km/s), and
+    samples at `offsets` (seconds from epoch, monotonic) are read off the
+    dense-output polynomial instead of forcing steps onto the sample grid.
+    All satellites are stepped together as arrays; ones that have reached
+    their last sample drop out of the working set.
+
+    r0, v0 are (3,) or (N,3); returns R, V of shape (S,N,3) and the number of
+    acceleration evaluations per satellite (the fixed-step RK4 path costs
+    4 per 10 s of window regardless of orbit).
+    """
+    y0 = np.concatenate([np.reshape(r0, (-1, 3)), np.reshape(v0, (-1, 3))], axis=1)
+    offs = np.asarray(offsets, dtype=float)
+    n, S = len(y0), len(offs)
+    Y = np.empty((S, n, 6))
+    nfev = np.zeros(n, dtype=int)
+    if S == 0 or n == 0:
+        return Y[..., :3], Y[..., 3:], nfev
+    direction = 1.0 if offs[-1] >= offs[0] else -1.0
+    t_end = offs[-1]
+
+    y = y0.copy()
+    f = _state_derivative(y)
+    t = np.zeros(n)
+    nxt = np.zeros(n, dtype=int)  # next sample index per satellite
+
+    # initial step (Hairer, Norsett & Wanner II.4)
+    scale = atol + np.abs(y)*rtol
+    d0, d1 = _rms(y/scale), _rms(f/scale)
+    h0 = np.where((d0 < 1e-5) | (d1 < 1e-5), 1e-6, 0.01*d0/np.maximum(d1, 1e-300))
+    f1 = _state_derivative(y + direction*h0[:, None]*f)
+    d2 = _rms((f1 - f)/scale)/h0
+    h1 = np.where(np.maximum(d1, d2) <= 1e-15, np.maximum(1e-6, h0*1e-3),
+                  (0.01/np.maximum(np.maximum(d1, d2), 1e-300))**0.2)
+    h = np.minimum(100*h0, h1)
+    nfev += 2
+
+    for _ in range(max_steps):
+        # samples at or behind the current time (offset 0, or reached exactly)
+        while True:
+            idx = np.nonzero((nxt < S) & (direction*offs[np.minimum(nxt, S-1)] <= direction*t))[0]
+            if not len(idx):
+                break
+            Y[nxt[idx], idx] = y[idx]
+            nxt[idx] += 1
+        idx = np.nonzero(nxt < S)[0]
+        if not len(idx):
+            break
+        yi, fi, ti = y[idx], f[idx], t[idx]
+        hi = direction*np.minimum(h[idx], direction*(t_end - ti))
+        K = np.empty((7, len(idx), 6))
+        K[0] = fi
+        for j in range(1, 6):
+            K[j] = _state_derivative(yi + hi[:, None]*np.tensordot(_DP_A[j], K[:j], axes=1))
+        y_new = yi + hi[:, None]*np.tensordot(_DP_B[:6], K[:6], axes=1)
+        K[6] = _state_derivative(y_new)
+        nfev[idx] += 6
+        err = hi[:, None]*np.tensordot(_DP_E, K, axes=1)
+        err_norm = _rms(err / (atol + rtol*np.maximum(np.abs(yi), np.abs(y_new))))
+        ok = err_norm <= 1.0
+        with np.errstate(divide="ignore"):
+            factor = 0.9*err_norm**-0.2
+        h[idx] = np.abs(hi)*np.clip(factor, 0.2, np.where(ok, 10.0, 1.0))
+
+        # dense output for samples inside accepted steps
+        acc = np.nonzero(ok)[0]
+        t_new = ti + hi
+        while len(acc):
+            k_next = nxt[idx[acc]]
+            inside = (k_next < S) & (direction*offs[np.minimum(k_next, S-1)] < direction*t_new[acc])
+            acc = acc[inside]
+            if not len(acc):
+                break
+            theta = (offs[nxt[idx[acc]]] - ti[acc]) / hi[acc]
+            w = _DP_P @ np.stack([theta, theta**2, theta**3, theta**4])  # (7, m)
+            Y[nxt[idx[acc]], idx[acc]] = yi[acc] + hi[acc, None]*np.einsum("jm,jmk->mk", w, K[:, acc])
+            nxt[idx[acc]] += 1
+
+        sel = idx[ok]
+        y[sel] = y_new[ok]
+        f[sel] = K[6][ok]
+        t[sel] = t_new[ok]
+    else:
+        raise RuntimeError(f"dp45 integration did not finish within {max_steps} steps")
+    return Y[..., :3], Y[..., 3:], nfev
+
+def _propagate_from_epoch(r0, v0, dt):
+    if dt == 0:
+        return r0.copy(), v0.copy()
+    steps = max(1, int(max(1, abs(dt)) / 10))
+    return propagate_rk4_J2(r0, v0, dt, steps=steps)
+
 def julian_date(dt: datetime):
     year = dt.year; month = dt.month; day = dt.day
     hour = dt.hour + dt.minute/60 + dt.second/3600 + dt.microsecond/3.6e9
@@ -85,60 +381,273 @@ def julian_date(dt: datetime):
     jd = int(365.25*(year+4716)) + int(30.6001*(month+1)) + day + B - 1524.5 + hour/24.0
     return jd
 
-def gst_from_datetime(dt: datetime):
-    jd = julian_date(dt)
+def gst_from_jd(jd):
+    # Greenwich sidereal time (rad) for a Julian date or an array of them
+    jd = np.asarray(jd, dtype=float)
     T = (jd - 2451545.0) / 36525.0
     gst = 280.46061837 + 360.98564736629 * (jd - 2451545.0) + 0.000387933*T**2 - T**3/38710000.0
     gst = (gst % 360.0)
     return np.deg2rad(gst)
 
-def eci_to_geodetic(r_eci, dt_utc: datetime):
-    gst = gst_from_datetime(dt_utc)
+def gst_from_datetime(dt: datetime):
+    return float(gst_from_jd(julian_date(dt)))
+
+def eci_to_geodetic_array(R, t, epoch_jd: Optional[float] = None, geodetic: bool = False):
+    """
+    Latitude/longitude (deg) and altitude (m) for a stack of ECI positions in
+    one call. R is (..., 3) km; t broadcasts against R[..., 0] and holds Julian
+    dates, or seconds from `epoch_jd` when that is given. With geodetic=True
+    latitude and altitude are WGS-84 geodetic (iterated to sub-mm), otherwise
+    geocentric over a spherical Earth of radius Re as before.
+    """
+    R = np.asarray(R, dtype=float)
+    jd = np.asarray(t, dtype=float) if epoch_jd is None else epoch_jd + np.asarray(t, dtype=float) / 86400.0
+    gst = gst_from_jd(jd)
     cosg, sing = np.cos(gst), np.sin(gst)
-    Rz = np.array([[cosg, sing, 0], [-sing, cosg, 0], [0,0,1]])
-    r_ecef = Rz @ r_eci
-    x, y, z = r_ecef
-    r_norm = np.linalg.norm(r_ecef)
-    lat = np.arcsin(z / r_norm)
-    lon = atan2(y, x)
-    alt = r_norm - Re
+    x = cosg*R[..., 0] + sing*R[..., 1]
+    y = -sing*R[..., 0] + cosg*R[..., 1]
+    z = R[..., 2]
+    lon = np.arctan2(y, x)
+    if not geodetic:
+        r_norm = np.sqrt(x*x + y*y + z*z)
+        return np.rad2deg(np.arcsin(z / r_norm)), np.rad2deg(lon), (r_norm - Re)*1000.0
+    p = np.hypot(x, y)
+    lat = np.arctan2(z, p*(1 - WGS84_E2))
+    for _ in range(4):
+        sin_lat = np.sin(lat)
+        N = Re / np.sqrt(1 - WGS84_E2*sin_lat**2)
+        alt = p*np.cos(lat) + z*sin_lat - Re*Re/N
+        lat = np.arctan2(z, p*(1 - WGS84_E2*N/(N + alt)))
+    sin_lat = np.sin(lat)
+    N = Re / np.sqrt(1 - WGS84_E2*sin_lat**2)
+    alt = p*np.cos(lat) + z*sin_lat - Re*Re/N
     return np.rad2deg(lat), np.rad2deg(lon), alt*1000.0
 
-def propagate_from_tle(name: str, line1: str, line2: str, propagate_seconds: int = 3600, samples: int = 60):
-    # Parse epoch from line1 (YYDDD.DDDDDDDD) fallback to now UTC
+def eci_to_geodetic(r_eci, dt_utc: datetime, geodetic: bool = False):
+    # single position/time; see eci_to_geodetic_array for whole trajectories
+    lat, lon, alt = eci_to_geodetic_array(r_eci, julian_date(dt_utc), geodetic=geodetic)
+    return float(lat), float(lon), float(alt)
+
+def _parse_tle_epoch(line1: str) -> Optional[datetime]:
+    # Parse epoch from line1 (YYDDD.DDDDDDDD); None if the field is unusable
     try:
         epoch_str = line1[18:32].strip()
         yy = int(epoch_str[0:2])
         year = 1900 + yy if yy >= 57 else 2000 + yy
         doy = float(epoch_str[2:])
         day = int(doy); frac_day = doy - day
-        epoch = datetime(year, 1, 1, tzinfo=timezone.utc) + timedelta(days=day-1) + timedelta(days=frac_day)
+        return datetime(year, 1, 1, tzinfo=timezone.utc) + timedelta(days=day-1) + timedelta(days=frac_day)
     except Exception:
-        epoch = datetime.now(timezone.utc)
+        return None
+
+def parse_tles(tles: List[Dict]) -> List[Dict]:
+    """
+    Parse {name, line1, line2} dicts into records holding the stable id, epoch,
+    elements and initial state (r0, v0), served from tle_cache when the same
+    lines were seen before. Misses are converted together in one coe_to_rv call.
+    TLEs whose epoch can't be parsed fall back to now, are marked
+    `epoch_fallback` and are kept out of tle_cache and trajectory_cache.
+    Items that already are such records (e.g. from the catalog store) are
+    passed through untouched.
+    """
+    with stage("parse", objects=len(tles)):
+        if all("r0" in t for t in tles):
+            return list(tles)
+        keys = [t["key"] if "r0" in t else tle_key(t["line1"], t["line2"]) for t in tles]
+        entries = [t if "r0" in t else tle_cache.get(key) for t, key in zip(tles, keys)]
+        missing = list({keys[idx]: idx for idx, entry in enumerate(entries) if entry is None}.values())
+        if missing:
+            elements = np.array([tle_line2_to_elements(tles[idx]["line2"]) for idx in missing]).reshape(-1, 6)
+            r0, v0, _ = coe_to_rv(*elements.T)
+            for n, idx in enumerate(missing):
+                epoch = _parse_tle_epoch(tles[idx]["line1"])
+                entry = {
+                    "key": keys[idx],
+                    "epoch": epoch or datetime.now(timezone.utc),
+                    "elements": tuple(float(x) for x in elements[n]),
+                    "r0": r0[n].copy(),
+                    "v0": v0[n].copy(),
+                }
+                if epoch is None:
+                    entry["epoch_fallback"] = True  # "now" of this request only
+                # cached states are shared between requests: keep them immutable
+                entry["r0"].setflags(write=False); entry["v0"].setflags(write=False)
+                if epoch is not None:
+                    tle_cache.put(keys[idx], entry)
+                entries[idx] = entry
+            by_key = {keys[idx]: entries[idx] for idx in missing}
+            entries = [entry if entry is not None else by_key[key] for key, entry in zip(keys, entries)]
+        return [
+            t if "r0" in t else dict(entry, name=t["name"], id=_satellite_id(t["name"], entry["key"]))
+            for t, entry in zip(tles, entries)
+        ]
+
+def sample_offsets(propagate_seconds: int, samples: int):
+    # seconds from epoch of each returned sample
+    return [(propagate_seconds * k)/(samples-1) if samples>1 else 0 for k in range(samples)]
 
-    a, e, i, raan, argp, M = tle_line2_to_elements(line2)
-    r0, v0, nu0 = coe_to_rv(a, e, i, raan, argp, M)
+def _satellite_id(name: str, key: str) -> str:
+    return name.replace(" ", "_") + "_" + key[0:8]
 
-    times = [epoch + timedelta(seconds = (propagate_seconds * k)/(samples-1) if samples>1 else 0) for k in range(samples)]
-    traj = []
-    for t in times:
-        dt = (t - epoch).total_seconds()
-        if dt == 0:
-            r, v = r0.copy(), v0.copy()
+def _trajectory(rec: Dict, offsets, R, V, lla, nfev: int = 0) -> Trajectory:
+    return Trajectory(rec["id"], rec["name"], rec["epoch"], np.asarray(offsets, dtype=float),
+                      np.ascontiguousarray(R), np.ascontiguousarray(V),
+                      *(np.ascontiguousarray(x) for x in lla), nfev=int(nfev))
+
+def _rk4_nfev(offsets, max_step=10.0) -> int:
+    # acceleration evaluations propagate_rk4_J2_stepper spends per satellite
+    t, steps = 0.0, 0
+    for off in offsets:
+        if off != t:
+            steps += max(1, int(np.ceil(abs(off - t) / max_step)))
+            t = off
+    return 4 * steps
+
+def propagate_from_tle(name: str, line1: str, line2: str, propagate_seconds: int = 3600, samples: int = 60,
+                       incremental: bool = True, model: str = DEFAULT_MODEL, options: Optional[Dict] = None):
+    options = model_options(model, options)
+    rec = parse_tles([{"name": name, "line1": line1, "line2": line2}])[0]
+    epoch, r0, v0 = rec["epoch"], rec["r0"], rec["v0"]
+
+    offsets = sample_offsets(propagate_seconds, samples)
+    nfev = 0
+    if model == "secular_j2":
+        R, V = propagate_secular_j2(rec["elements"], offsets)
+        states = zip(R[:, 0], V[:, 0])
+    elif model == "dp45":
+        R, V, nfevs = propagate_dp45_J2(r0, v0, offsets, rtol=options["rtol"], atol=options["atol"])
+        states, nfev = zip(R[:, 0], V[:, 0]), int(nfevs[0])
+    elif incremental:
+        states, nfev = propagate_rk4_J2_stepper(r0, v0, offsets), _rk4_nfev(offsets)
+    else:
+        # legacy path: integrate from epoch for every sample (quadratic in samples)
+        states = (_propagate_from_epoch(r0, v0, dt) for dt in offsets)
+        nfev = sum(4 * max(1, int(max(1, abs(dt)) / 10)) for dt in offsets if dt != 0)
+    R, V = (np.array(x).reshape(-1, 3) for x in zip(*states)) if offsets else (np.empty((0, 3)),) * 2
+    lla = eci_to_geodetic_array(R, offsets, julian_date(epoch), options["geodetic"])
+    return _trajectory(rec, offsets, R, V, lla, nfev).to_dict()
+
+def check_model(model: str) -> str:
+    if model not in PROPAGATION_MODELS:
+        raise ValueError(f"Unknown propagation model '{model}', expected one of {PROPAGATION_MODELS}")
+    return model
+
+def model_options(model: str, options: Optional[Dict] = None) -> Dict[str, Any]:
+    # validated options for `model` (plus OUTPUT_OPTIONS) with defaults filled
+    # in; None values are ignored
+    defaults = {**MODEL_OPTIONS.get(check_model(model), {}), **OUTPUT_OPTIONS}
+    out = dict(defaults)
+    for key, value in (options or {}).items():
+        if value is None:
+            continue
+        if key not in defaults:
+            raise ValueError(f"Option '{key}' does not apply to model '{model}'")
+        if isinstance(defaults[key], bool):
+            out[key] = value if isinstance(value, bool) else str(value).lower() in ("1", "true", "yes")
+            continue
+        value = float(value)
+        if not value > 0:
+            raise ValueError(f"Option '{key}' must be positive")
+        out[key] = value
+    return out
+
+def _trajectory_key(rec: Dict, propagate_seconds: int, samples: int, model: str = DEFAULT_MODEL,
+                    options: Optional[Dict] = None):
+    step = round(propagate_seconds / (samples - 1), 6) if samples > 1 else None
+    return (rec["key"], step, model, tuple(sorted((options or {}).items())))
+
+def cached_trajectories(records: List[Dict], propagate_seconds: int, samples: int, model: str = DEFAULT_MODEL,
+                        options: Optional[Dict] = None):
+    """
+    Look up parsed records in trajectory_cache. Windows always start at the TLE
+    epoch, so a cached window with the same sample spacing that is at least as
+    long serves the request with a view of its first `samples` samples (nfev
+    stays that of the cached run). Returns (results, missing) where results
+    holds None at the indices in `missing`.
+    """
+    results: List[Optional[Trajectory]] = []
+    missing = []
+    for idx, rec in enumerate(records):
+        cached = None
+        if not rec.get("epoch_fallback"):
+            cached = trajectory_cache.get(_trajectory_key(rec, propagate_seconds, samples, model, options),
+                                          accept=lambda entry: len(entry) >= samples)
+        if cached is None:
+            results.append(None)
+            missing.append(idx)
+            continue
+        results.append(cached[:samples].renamed(rec["id"], rec["name"]))
+    return results, missing
+
+def store_trajectories(records: List[Dict], fresh: List[Trajectory], propagate_seconds: int, samples: int,
+                       model: str = DEFAULT_MODEL, options: Optional[Dict] = None):
+    for rec, traj in zip(records, fresh):
+        if rec.get("epoch_fallback"):
+            continue  # timestamps from a fallback epoch would go stale in the cache
+        trajectory_cache.put(_trajectory_key(rec, propagate_seconds, samples, model, options),
+                             traj.renamed(None, None).freeze())
+
+def propagate_batch(tles: List[Dict], propagate_seconds: int = 3600, samples: int = 60, model: str = DEFAULT_MODEL,
+                    options: Optional[Dict] = None, store: bool = True) -> List[Trajectory]:
+    """
+    Propagate many satellites at once. `tles` is a list of {name, line1, line2}
+    dicts; returns one Trajectory per satellite, in input order (to_dict()
+    gives the same shape as propagate_from_tle). All element sets are converted and integrated together as (N,3)
+    arrays, so the per-step interpreter overhead is paid once per catalog
+    instead of once per satellite. Sample offsets are shared (every satellite
+    is sampled from its own epoch), so one stepper pass serves the whole batch.
+    Trajectories already in trajectory_cache are not recomputed; new ones are
+    added to it unless `store` is false (streamed requests, whose memory
+    should stay bounded by one chunk).
+
+    `model` is one of PROPAGATION_MODELS ("secular_j2" is the closed-form
+    first-pass model, see propagate_secular_j2) and `options` its
+    MODEL_OPTIONS (rtol/atol for "dp45"). Each satellite reports `nfev`, the
+    acceleration evaluations spent on it (0 for the analytical model).
+    """
+    options = model_options(model, options)
+    records = parse_tles(tles)
+    results, missing = cached_trajectories(records, propagate_seconds, samples, model, options)
+    if missing:
+        todo = [records[idx] for idx in missing]
+        fresh = propagate_parsed(todo, propagate_seconds, samples, model, options)
+        if store:
+            store_trajectories(todo, fresh, propagate_seconds, samples, model, options)
+        for idx, sat in zip(missing, fresh):
+            results[idx] = sat
+    return results
+
+def propagate_parsed(records: List[Dict], propagate_seconds: int = 3600, samples: int = 60,
+                     model: str = DEFAULT_MODEL, options: Optional[Dict] = None) -> List[Trajectory]:
+    # propagate_batch for records already produced by parse_tles (e.g. parsed
+    # once in the API process and shipped to pool workers)
+    if not records:
+        return []
+    options = model_options(model, options)
+    offsets = sample_offsets(propagate_seconds, samples)
+    n = len(records)
+    r0 = np.array([rec["r0"] for rec in records])
+    v0 = np.array([rec["v0"] for rec in records])
+    with stage("propagate", objects=n, samples=n * len(offsets)):
+        if model == "secular_j2":
+            R, V = propagate_secular_j2([rec["elements"] for rec in records], offsets)
+            nfev = np.zeros(n, dtype=int)
+        elif model == "dp45":
+            R, V, nfev = propagate_dp45_J2(r0, v0, offsets, rtol=options["rtol"], atol=options["atol"])
         else:
-            steps = max(1, int(max(1, abs(dt)) / 10))
-            r, v = propagate_rk4_J2(r0, v0, dt, steps=steps)
-        lat, lon, alt_m = eci_to_geodetic(r, t)
-        traj.append({
-            "timestamp": t.isoformat(),
-            "lat": float(lat),
-            "lon": float(lon),
-            "alt_m": float(alt_m),
-            "r_km": [float(r[0]), float(r[1]), float(r[2])],
-            "v_km_s": [float(v[0]), float(v[1]), float(v[2])]
-        })
-    return {
-        "id": name.replace(" ", "_") + "_" + str(abs(hash(line1+line2)))[0:8],
-        "name": name,
-        "trajectory": traj
-    }
+            nfev = np.full(n, _rk4_nfev(offsets))
+            R = np.empty((len(offsets), n, 3))
+            V = np.empty((len(offsets), n, 3))
+            for k, (r, v) in enumerate(propagate_rk4_J2_stepper(r0, v0, offsets)):
+                R[k] = r
+                V[k] = v
+
+    # lat/lon/alt for every sample of every satellite in one vectorized call
+    with stage("frames", objects=n, samples=n * len(offsets)):
+        epoch_jd = np.array([julian_date(rec["epoch"]) for rec in records])
+        LAT, LON, ALT = eci_to_geodetic_array(R, np.reshape(offsets, (-1, 1)) / 86400.0 + epoch_jd,
+                                              geodetic=options["geodetic"])
+    return [
+        _trajectory(rec, offsets, R[:, idx], V[:, idx], (LAT[:, idx], LON[:, idx], ALT[:, idx]), nfev[idx])
+        for idx, rec in enumerate(records)
+    ]
@@ -0,0 +1,202 @@
+# backend/app/screening.py
+import itertools
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from app.ephemeris import propagate_to_grid
+from app.utils import close_approach_episodes
+
+
+class ScreeningSession:
+    """
+    Conjunction screen that is kept up to date instead of being rerun: the
+    RK4 J2 states of every object on the grid start + k*step_s (k < count)
+    and the current encounter episodes are retained between updates. An
+    update re-propagates only objects whose TLE changed (or that are new) and
+    re-screens only the pairs involving them; the encounters of all other
+    pairs are carried over untouched.
+
+    Objects are identified by `catalog_id`; records are parse_tles-style
+    (catalog records as they are). Re-screened episodes are matched to the
+    previous ones of the same pair by overlapping time span and keep their
+    `encounter_id`; update() reports those that are new, cleared or moved by
+    more than `distance_tol_km` / `tca_tol_s`, so unchanged conjunctions
+    aren't reported again.
+    """
+
+    def __init__(self, start: datetime, step_s: float, count: int, threshold_km: float = 50.0,
+                 distance_tol_km: float = 0.1, tca_tol_s: float = 1.0):
+        self.id = uuid.uuid4().hex
+        self.start = start
+        self.step_s = float(step_s)
+        self.count = int(count)
+        self.threshold_km = float(threshold_km)
+        self.distance_tol_km = float(distance_tol_km)
+        self.tca_tol_s = float(tca_tol_s)
+        self.T = np.arange(self.count) * self.step_s
+        # (samples, columns, 3) like the screens expect; free columns are NaN
+        self.R = np.full((self.count, 0, 3), np.nan)
+        self.V = np.full((self.count, 0, 3), np.nan)
+        self.ids: List[Optional[int]] = []  # column -> catalog id, None when free
+        self.columns: Dict[int, int] = {}
+        self.records: Dict[int, Dict[str, Any]] = {}
+        self.encounters: Dict[Tuple[int, int], List[Dict[str, Any]]] = {}  # by sorted id pair
+        self.version = 0
+        self.created = self.updated = time.time()
+        self._serial = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.columns)
+
+    @property
+    def end(self) -> datetime:
+        return self.start + timedelta(seconds=self.step_s * (self.count - 1))
+
+    def _columns_for(self, n: int) -> List[int]:
+        free = [col for col, cid in enumerate(self.ids) if cid is None][:n]
+        if len(free) < n:
+            grow = max(n - len(free), len(self.ids))  # double, so repeated additions stay cheap
+            pad = np.full((self.count, grow, 3), np.nan)
+            self.R = np.concatenate([self.R, pad], axis=1)
+            self.V = np.concatenate([self.V, pad], axis=1)
+            free += list(range(len(self.ids), len(self.ids) + n - len(free)))
+            self.ids += [None] * grow
+        return free
+
+    def update(self, records: List[Dict[str, Any]], remove: Iterable[int] = (), progress=None) -> Dict[str, Any]:
+        """
+        Apply new TLEs (records of new objects or with a different TLE key than
+        the stored one; the rest are skipped) and drop the `remove` catalog ids.
+        Returns the ids `propagated` and `removed` plus the `new`, `updated`
+        (with their `previous` tca/min_distance_km) and `cleared` encounters.
+        `progress` is passed on to the screen.
+        """
+        with self._lock:
+            remove = set(remove) & set(self.records)
+            changed: Dict[int, Dict[str, Any]] = {}
+            for rec in records:
+                cid = rec["catalog_id"]
+                old = self.records.get(cid)
+                if cid not in remove and (old is None or old["key"] != rec["key"]):
+                    changed[cid] = rec  # a later duplicate wins
+
+            for cid in remove:
+                col = self.columns.pop(cid)
+                self.R[:, col] = np.nan
+                self.V[:, col] = np.nan
+                self.ids[col] = None
+                del self.records[cid]
+            new_ids = [cid for cid in changed if cid not in self.columns]
+            for cid, col in zip(new_ids, self._columns_for(len(new_ids))):
+                self.columns[cid] = col
+                self.ids[col] = cid
+            if changed:
+                cols = [self.columns[cid] for cid in changed]
+                states = np.empty((len(changed), self.count, 6))
+                propagate_to_grid(list(changed.values()), self.start, self.step_s, self.count, states)
+                self.R[:, cols] = states[..., :3].transpose(1, 0, 2)
+                self.V[:, cols] = states[..., 3:].transpose(1, 0, 2)
+                self.records.update(changed)
+
+            found: Dict[Tuple[int, int], List[Dict[str, Any]]] = {}
+            if changed:
+                # a full screen when everything changed (e.g. the first update)
+                subset = None
+                if len(changed) < len(self.columns):
+                    subset = np.zeros(len(self.ids), dtype=bool)
+                    subset[cols] = True
+                episodes = close_approach_episodes(self.T, self.R, self.V, self.threshold_km,
+                                                   progress=progress, subset=subset)
+                for n in range(len(episodes["i"])):
+                    enc = self._encounter(episodes, n)
+                    found.setdefault((enc["catalog_id1"], enc["catalog_id2"]), []).append(enc)
+
+            touched = set(changed) | remove
+            pairs = set(found) | {pair for pair in self.encounters if pair[0] in touched or pair[1] in touched}
+            new, updated, cleared = [], [], []
+            for pair in pairs:
+                previous = self.encounters.pop(pair, [])
+                current = found.get(pair, [])
+                for enc in current:
+                    match = self._match(enc, previous)
+                    if match is None:
+                        enc["encounter_id"] = f"{pair[0]}-{pair[1]}-{next(self._serial)}"
+                        new.append(enc)
+                        continue
+                    previous.remove(match)
+                    enc["encounter_id"] = match["encounter_id"]
+                    if (abs(enc["min_distance_km"] - match["min_distance_km"]) > self.distance_tol_km
+                            or abs(enc["tca_offset_s"] - match["tca_offset_s"]) > self.tca_tol_s):
+                        updated.append(dict(enc, previous={"tca": match["tca"],
+                                                           "min_distance_km": match["min_distance_km"]}))
+                cleared += previous
+                if current:
+                    self.encounters[pair] = current
+
+            self.version += 1
+            self.updated = time.time()
+            by_tca = lambda enc: (enc["tca_offset_s"], enc["encounter_id"])
+            return {
+                "version": self.version,
+                "propagated": list(changed),
+                "removed": sorted(remove),
+                "new": sorted(new, key=by_tca),
+                "updated": sorted(updated, key=by_tca),
+                "cleared": sorted(cleared, key=by_tca),
+            }
+
+    def _encounter(self, episodes: Dict[str, Any], n: int) -> Dict[str, Any]:
+        # sat1 is the object with the lower catalog id, so a pair always has the same key
+        a, b = self.ids[int(episodes["i"][n])], self.ids[int(episodes["j"][n])]
+        if b < a:
+            a, b = b, a
+        times = {}
+        for field in ("tca", "entry", "exit"):
+            offset = float(episodes[field][n])
+            times[field] = (self.start + timedelta(seconds=offset)).isoformat()
+            times[field + "_offset_s"] = offset
+        return {
+            "sat1": self.records[a]["name"],
+            "sat2": self.records[b]["name"],
+            "catalog_id1": a,
+            "catalog_id2": b,
+            "min_distance_km": float(episodes["distance_km"][n]),
+            **times,
+            "duration_s": times["exit_offset_s"] - times["entry_offset_s"],
+            "relative_speed_km_s": float(episodes["relative_speed_km_s"][n]),
+        }
+
+    def _match(self, enc: Dict[str, Any], previous: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        # the previous episode of the pair overlapping this one in time, closest TCA first
+        overlapping = [
+            old for old in previous
+            if old["entry_offset_s"] - self.tca_tol_s <= enc["exit_offset_s"]
+            and enc["entry_offset_s"] <= old["exit_offset_s"] + self.tca_tol_s
+        ]
+        return min(overlapping, key=lambda old: abs(old["tca_offset_s"] - enc["tca_offset_s"]), default=None)
+
+    def encounter_list(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            encounters = [enc for encs in self.encounters.values() for enc in encs]
+        return sorted(encounters, key=lambda enc: (enc["tca_offset_s"], enc["encounter_id"]))
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "session_id": self.id,
+            "start": self.start.isoformat(),
+            "end": self.end.isoformat(),
+            "step_s": self.step_s,
+            "samples": self.count,
+            "threshold_km": self.threshold_km,
+            "objects": len(self.columns),
+            "encounter_count": sum(len(encs) for encs in self.encounters.values()),
+            "version": self.version,
+            "created": self.created,
+            "updated": self.updated,
+        }
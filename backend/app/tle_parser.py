@@ -0,0 +1,139 @@
+# backend/app/tle_parser.py
+import codecs
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+# Events produced by the parser: ("tle", {name, line1, line2}) or
+# ("error", {line, error, text}) for a malformed record.
+Event = Tuple[str, Dict[str, Any]]
+
+TLE_LINE_LENGTH = 69
+
+
+def tle_checksum(line: str) -> int:
+    # modulo-10 checksum over the first 68 columns: digits count their value, '-' counts 1
+    total = 0
+    for ch in line[:68]:
+        if ch.isdigit():
+            total += int(ch)
+        elif ch == "-":
+            total += 1
+    return total % 10
+
+
+def validate_tle(line1: str, line2: str, validate_checksums: bool = True) -> Optional[str]:
+    """Return a description of what is wrong with the line pair, or None if it is usable."""
+    if not line1.startswith("1 "):
+        return "line 1 must start with '1 '"
+    if not line2.startswith("2 "):
+        return "line 2 must start with '2 '"
+    if line1[2:7] != line2[2:7]:
+        return f"catalog numbers differ ({line1[2:7].strip()} vs {line2[2:7].strip()})"
+    if validate_checksums:
+        for n, line in ((1, line1), (2, line2)):
+            if len(line) < TLE_LINE_LENGTH:
+                return f"line {n} has {len(line)} characters, expected {TLE_LINE_LENGTH}"
+            if not line[68].isdigit() or int(line[68]) != tle_checksum(line):
+                return f"line {n} checksum mismatch (expected {tle_checksum(line)}, got '{line[68]}')"
+    elif len(line2) < 63:
+        return f"line 2 has {len(line2)} characters, too short for mean motion"
+    return None
+
+
+class TLEStreamParser:
+    """
+    Incremental TLE parser: feed text in arbitrary chunks and get events back
+    as soon as records are complete. Accepts 3-line (name + two lines, with an
+    optional "0 " name prefix) and 2-line records; 2-line records are named
+    after their catalog number. Malformed records are reported one by one with
+    the line number where they start instead of failing the whole input.
+    """
+
+    def __init__(self, validate_checksums: bool = True):
+        self.validate_checksums = validate_checksums
+        self._buf = ""
+        self._line_no = 0
+        self._name: Optional[Tuple[int, str]] = None
+        self._line1: Optional[Tuple[int, str]] = None
+        self.records = 0
+        self.errors = 0
+
+    def feed(self, text: str) -> List[Event]:
+        self._buf += text
+        *lines, self._buf = self._buf.split("\n")
+        out: List[Event] = []
+        for line in lines:
+            self._line(line, out)
+        return out
+
+    def close(self) -> List[Event]:
+        out: List[Event] = []
+        if self._buf:
+            self._line(self._buf, out)
+            self._buf = ""
+        if self._line1 is not None:
+            self._error(out, self._line1[0], "line 1 not followed by line 2", self._line1[1])
+        elif self._name is not None:
+            self._error(out, self._name[0], "name line not followed by TLE lines", self._name[1])
+        self._name = self._line1 = None
+        return out
+
+    def _error(self, out: List[Event], line_no: int, message: str, text: str):
+        self.errors += 1
+        out.append(("error", {"line": line_no, "error": message, "text": text}))
+
+    def _line(self, raw: str, out: List[Event]):
+        self._line_no += 1
+        line = raw.rstrip("\r\n").rstrip()
+        if not line.strip():
+            return
+        if line.startswith("1 "):
+            if self._line1 is not None:
+                self._error(out, self._line1[0], "line 1 not followed by line 2", self._line1[1])
+            self._line1 = (self._line_no, line)
+        elif line.startswith("2 "):
+            if self._line1 is None:
+                self._error(out, self._line_no, "line 2 without a preceding line 1", line)
+                self._name = None
+                return
+            start = self._name[0] if self._name is not None else self._line1[0]
+            problem = validate_tle(self._line1[1], line, self.validate_checksums)
+            if problem:
+                self._error(out, start, problem, self._line1[1])
+            else:
+                name = self._name[1] if self._name is not None else self._line1[1][2:7].strip()
+                self.records += 1
+                out.append(("tle", {"name": name, "line1": self._line1[1], "line2": line}))
+            self._name = self._line1 = None
+        else:
+            if self._line1 is not None:
+                self._error(out, self._line1[0], "line 1 not followed by line 2", self._line1[1])
+                self._line1 = None
+            elif self._name is not None:
+                self._error(out, self._name[0], "name line not followed by TLE lines", self._name[1])
+            name = line.strip()
+            if name.startswith("0 "):
+                name = name[2:].strip()
+            self._name = (self._line_no, name)
+
+
+async def iter_tle_events(chunks: AsyncIterator[bytes], validate_checksums: bool = True) -> AsyncIterator[Event]:
+    """
+    Parse an async stream of UTF-8 byte chunks (an upload or request body)
+    into TLE events without buffering the whole input.
+    """
+    parser = TLEStreamParser(validate_checksums)
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    async for chunk in chunks:
+        for event in parser.feed(decoder.decode(chunk)):
+            yield event
+    for event in parser.feed(decoder.decode(b"", final=True)) + parser.close():
+        yield event
+
+
+async def iter_upload_chunks(upload, chunk_size: int = 64 * 1024) -> AsyncIterator[bytes]:
+    # read an UploadFile (or anything with an async read(n)) in fixed-size chunks
+    while True:
+        chunk = await upload.read(chunk_size)
+        if not chunk:
+            break
+        yield chunk
@@ -0,0 +1,123 @@
+# backend/app/trajectory.py
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+
+class Trajectory:
+    """
+    One satellite's propagated samples as contiguous float64 arrays: offsets
+    `t` (s from `epoch`), positions `r` and velocities `v` (S,3) in km and
+    km/s, and `lat`/`lon` (deg) and `alt` (m) per sample, 80 bytes a sample.
+    Slicing returns views sharing the arrays. Used everywhere internally;
+    the per-sample JSON dicts and column dicts of the API are only built at
+    the response boundary (to_dict / to_columns).
+    """
+
+    __slots__ = ("id", "name", "epoch", "t", "r", "v", "lat", "lon", "alt", "nfev")
+
+    def __init__(self, id: Optional[str], name: Optional[str], epoch: Optional[datetime], t, r, v, lat, lon, alt,
+                 nfev: int = 0):
+        self.id = id
+        self.name = name
+        self.epoch = epoch
+        self.t = t
+        self.r = r
+        self.v = v
+        self.lat = lat
+        self.lon = lon
+        self.alt = alt
+        self.nfev = nfev
+
+    def __len__(self) -> int:
+        return len(self.t)
+
+    def __getitem__(self, index: slice) -> "Trajectory":
+        if not isinstance(index, slice):
+            raise TypeError("Trajectory indices must be slices")
+        return Trajectory(self.id, self.name, self.epoch, self.t[index], self.r[index], self.v[index],
+                          self.lat[index], self.lon[index], self.alt[index], self.nfev)
+
+    def renamed(self, id: Optional[str], name: Optional[str]) -> "Trajectory":
+        # same arrays under another satellite id/name (e.g. a cache hit)
+        return Trajectory(id, name, self.epoch, self.t, self.r, self.v, self.lat, self.lon, self.alt, self.nfev)
+
+    def freeze(self) -> "Trajectory":
+        # mark the arrays read-only before sharing them (cache entries)
+        for arr in (self.t, self.r, self.v, self.lat, self.lon, self.alt):
+            arr.setflags(write=False)
+        return self
+
+    @property
+    def step_s(self) -> float:
+        return float(self.t[1] - self.t[0]) if len(self.t) > 1 else 0.0
+
+    @property
+    def nbytes(self) -> int:
+        return sum(arr.nbytes for arr in (self.t, self.r, self.v, self.lat, self.lon, self.alt))
+
+    def timestamps(self) -> List[Optional[str]]:
+        if self.epoch is None:
+            return [None] * len(self.t)
+        return [(self.epoch + timedelta(seconds=dt)).isoformat() for dt in self.t.tolist()]
+
+    def to_dict(self) -> Dict[str, Any]:
+        # API shape: {id, name, trajectory: [{timestamp, lat, lon, alt_m, r_km, v_km_s}, ...], nfev}
+        lat, lon, alt = (_nullable(a) for a in (self.lat, self.lon, self.alt))
+        r, v = _nullable_rows(self.r), _nullable_rows(self.v)
+        samples = [
+            {"timestamp": ts, "lat": lat[k], "lon": lon[k], "alt_m": alt[k], "r_km": r[k], "v_km_s": v[k]}
+            for k, ts in enumerate(self.timestamps())
+        ]
+        return {"id": self.id, "name": self.name, "trajectory": samples, "nfev": self.nfev}
+
+    def to_columns(self) -> Dict[str, Any]:
+        # columnar API shape: start epoch plus step and the arrays themselves
+        return {
+            "id": self.id,
+            "name": self.name,
+            "epoch": self.epoch.isoformat() if self.epoch is not None else None,
+            "step_s": self.step_s,
+            "count": len(self.t),
+            "lat": self.lat,
+            "lon": self.lon,
+            "alt_m": self.alt,
+            "r_km": self.r,
+            "v_km_s": self.v,
+            "nfev": self.nfev,
+        }
+
+    @classmethod
+    def from_dict(cls, sat: Dict[str, Any]) -> "Trajectory":
+        # from the per-sample API shape (e.g. the dev mock propagator); missing
+        # values become NaN and unparsable timestamps leave the clock unknown
+        samples = sat.get("trajectory") or []
+        try:
+            times = [datetime.fromisoformat(p["timestamp"]) for p in samples]
+        except Exception:
+            times = None
+        epoch = times[0] if times else None
+        t = np.array([(x - epoch).total_seconds() for x in times]) if times else np.full(len(samples), np.nan)
+
+        def col(key, width=None):
+            nan = [np.nan] * width if width else np.nan
+            return np.array([nan if p.get(key) is None else p[key] for p in samples], dtype=float)
+
+        return cls(sat.get("id"), sat.get("name"), epoch, t, col("r_km", 3).reshape(-1, 3),
+                   col("v_km_s", 3).reshape(-1, 3), col("lat"), col("lon"), col("alt_m"), sat.get("nfev", 0))
+
+
+def _nullable(arr) -> List[Optional[float]]:
+    # NaN (unknown) becomes null in JSON
+    values = arr.tolist()
+    if np.isnan(arr).any():
+        values = [None if x != x else x for x in values]
+    return values
+
+
+def _nullable_rows(arr) -> List[Optional[List[float]]]:
+    rows = arr.tolist()
+    if np.isnan(arr).any():
+        rows = [None if row[0] != row[0] else row for row in rows]
+    return rows
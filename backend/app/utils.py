@@ -1,15 +1,362 @@
 # backend/app/utils.py
 import numpy as np
-from typing import List, Dict
+from typing import List
 
-def pairwise_collision_check(states: List[Dict], threshold_km: float = 50.0):
+from app.trajectory import Trajectory
+
+# Neighbour cell offsets for the uniform-grid screen: the cell itself plus the
+# 13 "forward" neighbours, so every unordered pair of adjacent cells is visited
+# exactly once.
+_FORWARD_OFFSETS = [(dx, dy, dz)
+                    for dx in (-1, 0, 1) for dy in (-1, 0, 1) for dz in (-1, 0, 1)
+                    if (dx, dy, dz) > (0, 0, 0)]
+
+
+def close_pairs(pos, radius_km: float, inclusive: bool = True, pair_mask=None, subset=None):
+    """
+    Find all pairs of points in `pos` ((N,3) km, no NaNs) closer than
+    `radius_km`, using a uniform grid with cells at least `radius_km` wide so
+    only points in the same or adjacent cells are compared.
+
+    `pair_mask(i, j)` may reject candidate pairs before distances are computed.
+    With `subset` (boolean mask over the points) only pairs with at least one
+    member in it are returned, and only those points' neighbourhoods are searched.
+    Returns (i, j, d) arrays with i < j, sorted by (i, j).
+    """
+    pos = np.asarray(pos, dtype=float)
+    n = len(pos)
+    empty = (np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp), np.empty(0))
+    if n < 2 or radius_km <= 0:
+        return empty
+    lo = pos.min(axis=0)
+    # keep the cell index range small enough to pack three coordinates in an int64
+    cell = max(float(radius_km), float((pos.max(axis=0) - lo).max()) / 1e6)
+    c = np.floor((pos - lo) / cell).astype(np.int64) + 1
+    dims = c.max(axis=0) + 2
+    keys = (c[:, 0]*dims[1] + c[:, 1])*dims[2] + c[:, 2]
+    order = np.argsort(keys, kind="stable")
+    sorted_keys = keys[order]
+    offsets = [(0, 0, 0)] + _FORWARD_OFFSETS
+    if subset is None:
+        src_pos = np.arange(n)
+    else:
+        # search every neighbour cell, but only around the subset's points
+        subset = np.asarray(subset, dtype=bool)
+        offsets += [(-dx, -dy, -dz) for dx, dy, dz in _FORWARD_OFFSETS]
+        src_pos = np.flatnonzero(subset[order])
+
+    out_i, out_j, out_d = [], [], []
+    for dx, dy, dz in offsets:
+        nkeys = sorted_keys[src_pos] + (dx*dims[1] + dy)*dims[2] + dz
+        if (dx, dy, dz) == (0, 0, 0) and subset is None:
+            start = src_pos + 1  # same cell: only later points, so each pair once
+        else:
+            start = np.searchsorted(sorted_keys, nkeys, side="left")
+        stop = np.searchsorted(sorted_keys, nkeys, side="right")
+        counts = np.maximum(stop - start, 0)
+        total = int(counts.sum())
+        if total == 0:
+            continue
+        src = np.repeat(src_pos, counts)
+        first = np.repeat(start - np.cumsum(counts) + counts, counts)
+        dst = first + np.arange(total)
+        a = order[src]; b = order[dst]
+        if subset is not None:
+            # pairs inside the subset are found from both ends: keep one
+            keep = (a != b) & (~subset[b] | (a < b))
+            a = a[keep]; b = b[keep]
+        i = np.minimum(a, b); j = np.maximum(a, b)
+        if pair_mask is not None:
+            keep = pair_mask(i, j)
+            i = i[keep]; j = j[keep]
+        d = np.linalg.norm(pos[i] - pos[j], axis=1)
+        hit = d <= radius_km if inclusive else d < radius_km
+        out_i.append(i[hit]); out_j.append(j[hit]); out_d.append(d[hit])
+
+    if not out_i:
+        return empty
+    i = np.concatenate(out_i); j = np.concatenate(out_j); d = np.concatenate(out_d)
+    srt = np.lexsort((j, i))
+    return i[srt], j[srt], d[srt]
+
+
+def altitude_band_mask(r_min, r_max, threshold_km: float):
+    """
+    Apogee/perigee prefilter: returns pair_mask(i, j) that keeps only pairs
+    whose radial shells [r_min, r_max] come within `threshold_km` of each other.
+    """
+    def mask(i, j):
+        return (r_min[i] <= r_max[j] + threshold_km) & (r_min[j] <= r_max[i] + threshold_km)
+    return mask
+
+
+def _isolated_by_altitude(r_min, r_max, threshold_km: float):
+    # Objects whose padded shell overlaps no other object's shell can never be
+    # part of a conjunction; found by merging the sorted radial intervals.
+    n = len(r_min)
+    if n == 0:
+        return np.zeros(0, dtype=bool)
+    order = np.argsort(r_min)
+    lo = r_min[order]; hi = r_max[order] + threshold_km
+    reach = np.maximum.accumulate(hi)
+    new_group = np.ones(n, dtype=bool)
+    new_group[1:] = lo[1:] > reach[:-1]
+    group = np.cumsum(new_group)
+    sizes = np.bincount(group)
+    isolated = np.empty(n, dtype=bool)
+    isolated[order] = sizes[group] == 1
+    return isolated
+
+
+def _screen_steps(R, radius_km: float, inclusive: bool = True, progress=None, subset=None):
+    # Shared driver for the trajectory screens: reduces objects by their
+    # apogee/perigee band, then yields (k, i, j, d) hit arrays per sample index.
+    # `progress(samples_done, samples, candidate_pairs)` is called after every
+    # sample; it may raise to abort the screen. `subset` (boolean mask over
+    # objects) keeps only pairs involving at least one of them.
+    radius = np.linalg.norm(R, axis=2)
+    r_min = np.min(np.where(np.isnan(radius), np.inf, radius), axis=0)
+    r_max = np.max(np.where(np.isnan(radius), -np.inf, radius), axis=0)
+    candidates = np.flatnonzero(~_isolated_by_altitude(r_min, r_max, radius_km) & np.isfinite(r_min))
+    if len(candidates) < 2 or (subset is not None and not subset[candidates].any()):
+        return
+    band = altitude_band_mask(r_min[candidates], r_max[candidates], radius_km)
+    pairs = 0
+    for k in range(R.shape[0]):
+        pos = R[k, candidates]
+        valid = np.flatnonzero(~np.isnan(pos).any(axis=1))
+        if len(valid) >= 2:
+            i, j, d = close_pairs(pos[valid], radius_km, inclusive=inclusive,
+                                  pair_mask=lambda a, b: band(valid[a], valid[b]),
+                                  subset=None if subset is None else subset[candidates[valid]])
+            pairs += len(i)
+            if len(i):
+                yield k, candidates[valid[i]], candidates[valid[j]], d
+        if progress is not None:
+            progress(k + 1, R.shape[0], pairs)
+
+
+def screen_trajectories(R, threshold_km: float = 50.0, inclusive: bool = True):
+    """
+    Conjunction screen over sampled positions `R` of shape (samples, N, 3) in
+    km; NaN rows mark missing samples. Objects are first reduced by their
+    apogee/perigee band, then each timestep is screened with close_pairs.
+    Returns (k, i, j, d) arrays of every sample index k at which satellites
+    i < j are within the threshold, sorted by (k, i, j).
+    """
+    R = np.asarray(R, dtype=float)
+    empty = (np.empty(0, dtype=np.intp),) * 3 + (np.empty(0),)
+    if R.ndim != 3 or R.shape[0] == 0 or R.shape[1] < 2:
+        return empty
+    out = [(np.full(len(i), k), i, j, d) for k, i, j, d in _screen_steps(R, threshold_km, inclusive)]
+    if not out:
+        return empty
+    return tuple(np.concatenate(parts) for parts in zip(*out))
+
+
+def hermite_tca(dr0, dv0, dr1, dv1, h):
+    """
+    Time of closest approach inside one sample interval. The relative position
+    is interpolated with a cubic Hermite polynomial built from the relative
+    position/velocity at both ends ((M,3) arrays, interval length `h` seconds),
+    and the root of the relative range-rate p(s)·p'(s) is found by bisection.
+    Callers must pass bracketing intervals (range-rate < 0 at the start and
+    >= 0 at the end). Returns (s in [0,1], miss distance km, relative speed km/s).
+    """
+    h = np.asarray(h, dtype=float).reshape(-1, 1) * np.ones((len(dr0), 1))
+    m0 = dv0 * h; m1 = dv1 * h
+
+    def state(s):
+        s = s[:, None]; s2 = s*s; s3 = s2*s
+        p = (2*s3 - 3*s2 + 1)*dr0 + (s3 - 2*s2 + s)*m0 + (-2*s3 + 3*s2)*dr1 + (s3 - s2)*m1
+        dp = (6*s2 - 6*s)*dr0 + (3*s2 - 4*s + 1)*m0 + (-6*s2 + 6*s)*dr1 + (3*s2 - 2*s)*m1
+        return p, dp
+
+    lo = np.zeros(len(dr0)); hi = np.ones(len(dr0))
+    for _ in range(48):
+        mid = 0.5*(lo + hi)
+        p, dp = state(mid)
+        closing = np.einsum("ij,ij->i", p, dp) < 0
+        lo = np.where(closing, mid, lo)
+        hi = np.where(closing, hi, mid)
+    s = 0.5*(lo + hi)
+    p, dp = state(s)
+    return s, np.linalg.norm(p, axis=1), np.linalg.norm(dp, axis=1) / h[:, 0]
+
+
+def find_close_approaches(T, R, V, threshold_km: float = 50.0, progress=None, subset=None):
+    """
+    Screen sampled trajectories for close approaches and refine each one to its
+    true time of closest approach (TCA) between samples, so passes that happen
+    between two coarse samples are not missed.
+
+    T is the (samples,) array of sample offsets in seconds, R and V are
+    (samples, N, 3) positions (km) and velocities (km/s), compared at equal
+    sample index: row k of every object must be its state at the same time
+    T[k] (a common UTC grid, see ephemeris.propagate_to_grid), not an offset
+    from each object's own epoch. The grid screen runs with the threshold padded by how far
+    any pair can close within half a sample interval; each hit is then kept
+    only if its own relative speed could bring it inside the threshold, and
+    the adjacent intervals are searched for a range-rate sign change with
+    hermite_tca. Each minimum is attributed to its nearest sample, so it is
+    reported once. Pairs without velocities fall back to the sampled distance.
+
+    Returns a dict of arrays: i, j (i < j), k (nearest sample index), tca
+    (offset seconds), distance_km and relative_speed_km_s, sorted by (tca, i, j).
+    `progress` is passed on to the per-sample screen (see _screen_steps), as
+    is `subset`, a boolean mask over satellites restricting the screen to
+    pairs that involve at least one of them.
+    """
+    T = np.asarray(T, dtype=float)
+    R = np.asarray(R, dtype=float)
+    V = np.asarray(V, dtype=float)
+    n_samples = R.shape[0] if R.ndim == 3 else 0
+    keys = ("i", "j", "k", "tca", "distance_km", "relative_speed_km_s")
+    out = {key: [] for key in keys}
+
+    def emit(i, j, k, tca, d, vrel):
+        keep = d <= threshold_km
+        for key, arr in zip(keys, (i, j, k, tca, d, vrel)):
+            out[key].append(np.asarray(arr)[keep])
+
+    if n_samples and R.shape[1] >= 2:
+        gaps = np.diff(T)
+        half_gap = np.zeros(n_samples)  # longest half-interval touching each sample
+        if n_samples > 1:
+            half_gap[:-1] = np.maximum(half_gap[:-1], gaps / 2)
+            half_gap[1:] = np.maximum(half_gap[1:], gaps / 2)
+        speed = np.linalg.norm(V, axis=2)
+        v_max = float(np.nanmax(speed)) if np.isfinite(speed).any() else 0.0
+        # 10% margin plus 1 km covers the change of relative velocity over the half-interval
+        pad = 1.1 * 2 * v_max * float(half_gap.max()) + 1.0
+
+        for k, i, j, d in _screen_steps(R, threshold_km + pad, inclusive=True, progress=progress,
+                                         subset=subset):
+            dr = R[k, j] - R[k, i]
+            dv = V[k, j] - V[k, i]
+            vrel = np.linalg.norm(dv, axis=1)
+            no_vel = np.isnan(vrel)
+            if no_vel.any():
+                sel = no_vel
+                emit(i[sel], j[sel], np.full(sel.sum(), k), np.full(sel.sum(), T[k]), d[sel], vrel[sel])
+            sel = ~no_vel & (d <= threshold_km + 1.1 * vrel * half_gap[k] + 1.0)
+            i, j, d, dr, dv, vrel = i[sel], j[sel], d[sel], dr[sel], dv[sel], vrel[sel]
+            if not len(i):
+                continue
+            f = np.einsum("ij,ij->i", dr, dv)
+            # window edges: the minimum may sit on the first/last sample itself
+            edge = np.zeros(len(f), dtype=bool)
+            if k == 0:
+                edge |= f >= 0
+            if k == n_samples - 1:
+                edge |= f < 0
+            if edge.any():
+                emit(i[edge], j[edge], np.full(edge.sum(), k), np.full(edge.sum(), T[k]), d[edge], vrel[edge])
+            for k0, near_start in ((k, True), (k - 1, False)):
+                if k0 < 0 or k0 + 1 >= n_samples:
+                    continue
+                dr0 = R[k0, j] - R[k0, i]; dv0 = V[k0, j] - V[k0, i]
+                dr1 = R[k0 + 1, j] - R[k0 + 1, i]; dv1 = V[k0 + 1, j] - V[k0 + 1, i]
+                f0 = np.einsum("ij,ij->i", dr0, dv0)
+                f1 = np.einsum("ij,ij->i", dr1, dv1)
+                br = (f0 < 0) & (f1 >= 0)
+                if not br.any():
+                    continue
+                h = T[k0 + 1] - T[k0]
+                s, dmin, vmin = hermite_tca(dr0[br], dv0[br], dr1[br], dv1[br], h)
+                mine = s < 0.5 if near_start else s >= 0.5
+                emit(i[br][mine], j[br][mine], np.full(mine.sum(), k),
+                     T[k0] + s[mine]*h, dmin[mine], vmin[mine])
+
+    res = {key: (np.concatenate(out[key]) if out[key] else np.empty(0)) for key in keys}
+    for key in ("i", "j", "k"):
+        res[key] = res[key].astype(np.intp)
+    order = np.lexsort((res["j"], res["i"], res["tca"]))
+    return {key: arr[order] for key, arr in res.items()}
+
+
+def _crossing(t0, d0, t1, d1, threshold_km: float) -> float:
+    # time the sampled distance crosses the threshold, linear in distance
+    return t0 + (d0 - threshold_km) / (d0 - d1) * (t1 - t0)
+
+
+def close_approach_episodes(T, R, V, threshold_km: float = 50.0, progress=None, subset=None):
+    """
+    Group the close approaches of find_close_approaches into encounter
+    episodes: one per pair and contiguous stretch of time spent within
+    `threshold_km`, so a pair meeting on several orbits yields several
+    episodes. Each episode keeps its closest approach (k, tca, distance_km,
+    relative_speed_km_s) plus `entry`/`exit` offsets (s) where the separation
+    crosses the threshold, interpolated between samples; episodes still open
+    at a window edge are clipped to it. A pass that dips inside between two
+    samples is bounded by straight-line relative motion around its TCA.
+
+    Hits are matched to episodes through a per-pair sample-index table, so
+    grouping is linear in the number of hits. Returns a dict of arrays like
+    find_close_approaches plus entry and exit, sorted by (tca, i, j);
+    `progress` and `subset` are passed on to find_close_approaches.
+    """
+    T = np.asarray(T, dtype=float)
+    R = np.asarray(R, dtype=float)
+    hits = find_close_approaches(T, R, V, threshold_km=threshold_km, progress=progress,
+                                 subset=subset)
+    keys = ("i", "j", "k", "tca", "distance_km", "relative_speed_km_s", "entry", "exit")
+    runs = {}  # (i, j) -> (sample -> episode id, [[entry, exit], ...]) from the sampled distances
+    best = {}  # (i, j, episode id) -> [hit index, entry, exit]
+    last = len(T) - 1
+    for n, (i, j) in enumerate(zip(hits["i"].tolist(), hits["j"].tolist())):
+        if (i, j) not in runs:
+            d = np.linalg.norm(R[:, j] - R[:, i], axis=1)
+            inside = np.concatenate([[False], d <= threshold_km, [False]])
+            edges = np.flatnonzero(np.diff(inside.astype(np.int8)))
+            run_of = np.full(len(T), -1)
+            bounds = []
+            for run, (a, b) in enumerate(zip(edges[::2], edges[1::2] - 1)):
+                run_of[a:b + 1] = run
+                entry = T[0] if a == 0 else _crossing(T[a - 1], d[a - 1], T[a], d[a], threshold_km)
+                exit = T[last] if b == last else _crossing(T[b], d[b], T[b + 1], d[b + 1], threshold_km)
+                bounds.append([entry, exit])
+            runs[(i, j)] = (run_of, bounds)
+        run_of, bounds = runs[(i, j)]
+        k = int(hits["k"][n])
+        tca = float(hits["tca"][n])
+        run = next((int(run_of[x]) for x in (k, k - 1, k + 1) if 0 <= x <= last and run_of[x] >= 0), -1)
+        if run >= 0:
+            key, (entry, exit) = (i, j, run), bounds[run]
+        else:
+            # inside only between samples a and a + 1
+            a = min(max(int(np.searchsorted(T, tca)) - 1, 0), max(last - 1, 0))
+            dist, vrel = float(hits["distance_km"][n]), float(hits["relative_speed_km_s"][n])
+            half = np.sqrt(max(threshold_km**2 - dist**2, 0.0)) / vrel if vrel > 0 else 0.0
+            key = (i, j, "between", a)
+            entry, exit = max(tca - half, T[a]), min(tca + half, T[min(a + 1, last)])
+        if key not in best or hits["distance_km"][n] < hits["distance_km"][best[key][0]]:
+            # the crossings are interpolated from the sampled distance; never let them exclude the TCA
+            best[key] = [n, min(entry, tca), max(exit, tca)]
+
+    rows = sorted(best.values())
+    picked = np.array([n for n, _, _ in rows], dtype=np.intp)
+    out = {key: hits[key][picked] for key in keys[:6]}
+    out["entry"] = np.array([entry for _, entry, _ in rows], dtype=float)
+    out["exit"] = np.array([exit for _, _, exit in rows], dtype=float)
+    return out
+
+
+def pairwise_collision_check(states: List, threshold_km: float = 50.0):
+    # states: {name, r_km} dicts or Trajectory objects (checked at their last sample)
     alerts = []
-    n = len(states)
-    for i in range(n):
-        for j in range(i+1, n):
-            a = states[i]; b = states[j]
-            r1 = np.array(a["r_km"]); r2 = np.array(b["r_km"])
-            dist = float(np.linalg.norm(r1 - r2))
-            if dist < threshold_km:
-                alerts.append({"sat1": a["name"], "sat2": b["name"], "distance_km": dist})
+    names, pos = [], []
+    for s in states:
+        if isinstance(s, Trajectory):
+            if len(s) and not np.isnan(s.r[-1]).any():
+                names.append(s.name)
+                pos.append(s.r[-1])
+        else:
+            names.append(s["name"])
+            pos.append(s["r_km"])
+    if len(pos) < 2:
+        return alerts
+    i, j, d = close_pairs(np.array(pos, dtype=float), threshold_km, inclusive=False)
+    for a, b, dist in zip(i, j, d):
+        alerts.append({"sat1": names[a], "sat2": names[b], "distance_km": float(dist)})
     return alerts
@@ -0,0 +1,6 @@
+# backend/bench/__main__.py
+import sys
+
+from bench.run import main_cli
+
+sys.exit(main_cli())
@@ -0,0 +1,55 @@
+# backend/bench/asgi.py
+import asyncio
+import json
+from typing import Any, Dict, Optional
+
+
+async def _request(app, method: str, path: str, body: bytes, headers: Dict[str, str], query: str) -> Dict[str, Any]:
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": query.encode(),
+        "headers": [(k.lower().encode(), v.encode()) for k, v in headers.items()],
+        "server": ("bench", 80),
+        "client": ("bench", 1),
+    }
+    response = {"status": None, "headers": {}, "body": bytearray()}
+    sent = False
+
+    async def receive():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await asyncio.Event().wait()  # no disconnect until the response is complete
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response["status"] = message["status"]
+            response["headers"] = {k.decode(): v.decode() for k, v in message.get("headers", [])}
+        elif message["type"] == "http.response.body":
+            response["body"] += message.get("body", b"")
+
+    await app(scope, receive, send)
+    return response
+
+
+def request(app, method: str, path: str, json_body: Optional[Any] = None, query: str = "",
+            headers: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    """
+    Call an ASGI app in process, without a server or socket, and return
+    {status, headers, body}. The whole request runs in its own event loop,
+    so the measured latency includes routing, parsing and serialization.
+    """
+    headers = dict(headers or {})
+    body = b""
+    if json_body is not None:
+        body = json.dumps(json_body).encode()
+        headers.setdefault("content-type", "application/json")
+    return asyncio.run(_request(app, method, path, body, headers, query))
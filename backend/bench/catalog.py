@@ -0,0 +1,74 @@
+# backend/bench/catalog.py
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from app.propagate import Re, mu
+from app.tle_parser import tle_checksum
+
+# line 1 fields after the catalog number (international designator) and after the
+# epoch (drag terms, element set number), taken from a real ISS element set
+_LINE1_DESIGNATOR = "U 98067A   "
+_LINE1_TAIL = "  .00016717  00000-0  10270-3 0  999"
+
+# population mix: (fraction, kind)
+_MIX = ((0.4, "shell"), (0.4, "leo"), (0.15, "heo"), (0.05, "geo"))
+# constellation shells: (altitude km, inclination deg)
+_SHELLS = ((550.0, 53.0), (570.0, 70.0), (560.0, 97.6))
+
+
+def with_checksum(line: str) -> str:
+    # a 68-character TLE line with its checksum digit appended
+    return line + str(tle_checksum(line))
+
+
+def epoch_field(epoch: datetime) -> str:
+    # the YYDDD.DDDDDDDD epoch field (line 1 columns 19-32) for a UTC time
+    start = datetime(epoch.year, 1, 1, tzinfo=timezone.utc)
+    day = (epoch - start).total_seconds() / 86400.0 + 1
+    return f"{epoch.year % 100:02d}{day:012.8f}"
+
+
+def _tle(catnum: int, epoch: str, i: float, raan: float, e: float, argp: float, m: float, a: float) -> Dict[str, str]:
+    n = np.sqrt(mu / a**3) * 86400.0 / (2 * np.pi)  # rev/day
+    line1 = with_checksum(f"1 {catnum:05d}{_LINE1_DESIGNATOR}{epoch}{_LINE1_TAIL}")
+    line2 = with_checksum(f"2 {catnum:05d} {i:8.4f} {raan:8.4f} {int(round(e * 1e7)):07d} {argp:8.4f} "
+                          f"{m:8.4f} {n:11.8f}{catnum % 100000:5d}")
+    return {"name": f"BENCH-{catnum:05d}", "line1": line1, "line2": line2}
+
+
+def synthetic_tles(n: int, seed: int = 0, epoch: Optional[datetime] = None,
+                   first_catnum: int = 40000) -> List[Dict[str, str]]:
+    """
+    Reproducible synthetic catalog of `n` {name, line1, line2} element sets
+    with valid checksums, all at `epoch` (default 2024-01-01 12:00 UTC):
+    40% evenly phased constellation shells (which give the screens dense
+    regions to work on), 40% scattered LEO debris (perigee 300-1200 km,
+    e up to ~0.06), 15% semi-synchronous HEO (e 0.1-0.74) and 5% near-GEO.
+    """
+    rng = np.random.default_rng(seed)
+    epoch = epoch_field(epoch or datetime(2024, 1, 1, 12, tzinfo=timezone.utc))
+    kinds = rng.choice([kind for _, kind in _MIX], size=n, p=[f for f, _ in _MIX])
+    out = []
+    shell_count = 0
+    for k, kind in enumerate(kinds):
+        argp, m = rng.uniform(0, 360, 2)
+        if kind == "shell":
+            alt, inc = _SHELLS[shell_count % len(_SHELLS)]
+            plane, slot = divmod(shell_count // len(_SHELLS), 20)
+            a, e, i = Re + alt, 0.0001, inc
+            raan, argp, m = (plane * 7.5) % 360, 0.0, (slot * 18.0 + plane * 0.9) % 360
+            shell_count += 1
+        elif kind == "leo":
+            perigee = rng.uniform(300, 1200)
+            apogee = perigee + rng.exponential(150)
+            a = Re + (perigee + apogee) / 2
+            e, i, raan = (apogee - perigee) / (2 * a), rng.uniform(0, 100), rng.uniform(0, 360)
+        elif kind == "heo":
+            a = (mu * (43082.0 / (2 * np.pi))**2) ** (1 / 3)  # half a sidereal day
+            e, i, raan = rng.uniform(0.1, 0.74), rng.uniform(50, 65), rng.uniform(0, 360)
+        else:
+            a, e, i, raan = 42164.0 + rng.normal(0, 20), rng.uniform(0, 0.001), rng.uniform(0, 5), rng.uniform(0, 360)
+        out.append(_tle(first_catnum + k, epoch, i, raan, e, argp, m, a))
+    return out
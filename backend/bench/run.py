@@ -0,0 +1,250 @@
+# backend/bench/run.py
+"""
+Benchmark suite for the propagation, frame conversion and screening stages
+and for /api/propagate and /api/alert end to end (in process, see asgi.py).
+
+    cd backend
+    python -m bench                                  # every stage at 10..10000 objects
+    python -m bench --sizes 100,1000 --stages propagate,close_approaches
+    python -m bench --output results.json --save-baseline bench/baseline.json
+    python -m bench --baseline bench/baseline.json   # exits 1 on a regression
+    python -m bench --max-api-objects 10000 --api-format columnar
+
+Each stage runs `--repeat` times on a synthetic catalog (bench/catalog.py)
+and reports the best time, the throughput in the stage's own unit and the
+peak memory allocated during one extra traced run. With --baseline, a stage
+that is more than --tolerance slower (or --memory-tolerance bigger) than the
+baseline entry for the same stage, size and sample count is a regression.
+The API stages skip sizes above --max-api-objects (default 1000): a
+10000-object JSON response takes around a minute to encode.
+Baselines are machine specific: bench/baseline.json is the committed one
+(its meta names the machine); elsewhere, record your own to compare against.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app import main
+from app.propagate import (
+    eci_to_geodetic_array, julian_date, parse_tles, propagate_batch, propagate_rk4_J2_stepper, sample_offsets,
+    tle_cache, trajectory_cache,
+)
+from app.utils import pairwise_collision_check
+from bench.asgi import request
+from bench.catalog import synthetic_tles
+
+DEFAULT_SIZES = (10, 100, 1000, 10000)
+STAGES = ("parse", "propagate", "frames", "collision_check", "close_approaches", "api_propagate", "api_alert")
+
+
+def _clear_caches():
+    tle_cache.clear()
+    trajectory_cache.clear()
+
+
+def measure(fn: Callable[[], Any], repeat: int, setup: Optional[Callable[[], Any]] = None) -> Dict[str, float]:
+    # best and median wall time over `repeat` runs, then peak traced allocations of one more run
+    times = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    if setup is not None:
+        setup()
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"seconds": min(times), "median_s": statistics.median(times), "peak_mib": peak / 2**20}
+
+
+class Workload:
+    """Synthetic catalog of one size plus the intermediate products the stages start from."""
+
+    def __init__(self, n: int, samples: int, seconds: float, threshold_km: float, seed: int,
+                 api_format: str = "json"):
+        self.n, self.samples, self.seconds, self.threshold_km = n, samples, seconds, threshold_km
+        self.api_format = api_format
+        self.tles = synthetic_tles(n, seed=seed)
+        self.records = parse_tles(self.tles)
+        self.offsets = sample_offsets(seconds, samples)
+        self.r0 = np.array([rec["r0"] for rec in self.records])
+        self.v0 = np.array([rec["v0"] for rec in self.records])
+        self.R = self.propagate()
+        self.epoch_jd = np.array([julian_date(rec["epoch"]) for rec in self.records])
+        self.trajectories = propagate_batch(self.tles, seconds, samples)
+        _clear_caches()
+
+    @property
+    def pairs(self) -> int:
+        return self.n * (self.n - 1) // 2
+
+    def propagate(self):
+        R = np.empty((len(self.offsets), self.n, 3))
+        for k, (r, _) in enumerate(propagate_rk4_J2_stepper(self.r0, self.v0, self.offsets)):
+            R[k] = r
+        return R
+
+    def frames(self):
+        return eci_to_geodetic_array(self.R, np.reshape(self.offsets, (-1, 1)) / 86400.0 + self.epoch_jd)
+
+    def api(self, path: str):
+        body = {"tles": self.tles, "propagate_seconds": self.seconds, "samples": self.samples,
+                "threshold_km": self.threshold_km}
+        query = "" if self.api_format == "json" else f"format={self.api_format}"
+        response = request(main.app, "POST", path, body, query=query)
+        if response["status"] != 200:
+            raise RuntimeError(f"{path} answered {response['status']}: {bytes(response['body'][:200])!r}")
+        return response
+
+
+def stage(name: str, w: Workload) -> Tuple[Callable[[], Any], Optional[Callable[[], Any]], float, str]:
+    # (benchmarked call, per-run setup, units of work per call, unit)
+    sat_samples = w.n * w.samples
+    if name == "parse":
+        return (lambda: parse_tles(w.tles)), _clear_caches, w.n, "tles/s"
+    if name == "propagate":
+        return w.propagate, None, sat_samples, "sat_samples/s"
+    if name == "frames":
+        return w.frames, None, sat_samples, "sat_samples/s"
+    if name == "collision_check":
+        return (lambda: pairwise_collision_check(w.trajectories, w.threshold_km)), None, w.pairs, "pairs/s"
+    if name == "close_approaches":
+        return ((lambda: main._check_close_approaches(w.trajectories, w.threshold_km)), None,
+                w.pairs * w.samples, "pair_samples/s")
+    if name == "api_propagate":
+        return (lambda: w.api("/api/propagate")), _clear_caches, sat_samples, "sat_samples/s"
+    if name == "api_alert":
+        return (lambda: w.api("/api/alert")), _clear_caches, sat_samples, "sat_samples/s"
+    raise ValueError(f"Unknown stage {name!r}, expected one of {STAGES}")
+
+
+def run(sizes, stages, samples: int, seconds: float, threshold_km: float, repeat: int, seed: int,
+        max_api_objects: int = 1000, api_format: str = "json", log=sys.stderr) -> List[Dict[str, Any]]:
+    results = []
+    for n in sizes:
+        w = Workload(n, samples, seconds, threshold_km, seed, api_format)
+        for name in stages:
+            if name.startswith("api_") and n > max_api_objects:
+                continue
+            fn, setup, work, unit = stage(name, w)
+            m = measure(fn, repeat, setup)
+            results.append({"stage": name, "objects": n, "samples": samples, **m,
+                            "throughput": work / m["seconds"] if m["seconds"] > 0 else None, "unit": unit})
+            print(f"{name:>17} {n:>6} objects  {m['seconds'] * 1e3:10.2f} ms  "
+                  f"{results[-1]['throughput']:12.4g} {unit:<15} {m['peak_mib']:9.2f} MiB peak", file=log)
+    return results
+
+
+def _meta(args) -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "created": datetime.now(timezone.utc).isoformat(),
+        "commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "seed": args.seed,
+        "repeat": args.repeat,
+        "seconds": args.seconds,
+        "threshold_km": args.threshold_km,
+        "api_format": args.api_format,
+    }
+
+
+def compare(results: List[Dict[str, Any]], baseline: Dict[str, Any], tolerance: float,
+            memory_tolerance: float) -> List[Dict[str, Any]]:
+    """
+    Regressions against a baseline results file: entries of the same stage,
+    size and sample count that are slower than baseline * (1 + tolerance), or
+    use more peak memory than baseline * (1 + memory_tolerance). A 1 ms / 1 MiB
+    allowance keeps the smallest sizes from failing on timer and allocator noise.
+    """
+    before = {(b["stage"], b["objects"], b["samples"]): b for b in baseline.get("results", [])}
+    regressions = []
+    for r in results:
+        b = before.get((r["stage"], r["objects"], r["samples"]))
+        if b is None:
+            continue
+        if r["seconds"] > b["seconds"] * (1 + tolerance) + 1e-3:
+            regressions.append({**_key(r), "metric": "seconds", "baseline": b["seconds"], "value": r["seconds"]})
+        if r["peak_mib"] > b["peak_mib"] * (1 + memory_tolerance) + 1.0:
+            regressions.append({**_key(r), "metric": "peak_mib", "baseline": b["peak_mib"], "value": r["peak_mib"]})
+    return regressions
+
+
+def _key(r: Dict[str, Any]) -> Dict[str, Any]:
+    return {"stage": r["stage"], "objects": r["objects"], "samples": r["samples"]}
+
+
+def _csv(value: str, cast=str):
+    return [cast(x) for x in value.split(",") if x.strip()]
+
+
+def main_cli(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m bench", description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--sizes", type=lambda v: _csv(v, int), default=list(DEFAULT_SIZES),
+                        help="comma-separated catalog sizes (default 10,100,1000,10000)")
+    parser.add_argument("--stages", type=_csv, default=list(STAGES), help=f"comma-separated subset of {STAGES}")
+    parser.add_argument("--samples", type=int, default=60, help="samples per trajectory")
+    parser.add_argument("--seconds", type=int, default=3600, help="propagation span in seconds")
+    parser.add_argument("--threshold-km", type=float, default=50.0, help="screening threshold")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per stage (the best counts)")
+    parser.add_argument("--seed", type=int, default=0, help="synthetic catalog seed")
+    parser.add_argument("--max-api-objects", type=int, default=1000, help="largest size the API stages run at")
+    parser.add_argument("--api-format", choices=("json", "columnar", "npz"), default="json",
+                        help="response format requested from the API stages")
+    parser.add_argument("--output", help="write results JSON here (default: stdout)")
+    parser.add_argument("--baseline", help="results JSON to compare against; regressions exit with status 1")
+    parser.add_argument("--save-baseline", help="also write the results to this file as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown (0.25 = 25%%)")
+    parser.add_argument("--memory-tolerance", type=float, default=0.25, help="allowed peak memory growth")
+    args = parser.parse_args(argv)
+    unknown = [s for s in args.stages if s not in STAGES]
+    if unknown:
+        parser.error(f"unknown stages {unknown}, expected {STAGES}")
+
+    results = run(args.sizes, args.stages, args.samples, args.seconds, args.threshold_km, args.repeat, args.seed,
+                  args.max_api_objects, args.api_format)
+    report: Dict[str, Any] = {"meta": _meta(args), "results": results}
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        report["baseline"] = {"file": args.baseline, "meta": baseline.get("meta"), "tolerance": args.tolerance,
+                              "memory_tolerance": args.memory_tolerance}
+        report["regressions"] = compare(results, baseline, args.tolerance, args.memory_tolerance)
+        for reg in report["regressions"]:
+            print(f"REGRESSION {reg['stage']} {reg['objects']} objects: {reg['metric']} "
+                  f"{reg['value']:.4g} vs baseline {reg['baseline']:.4g}", file=sys.stderr)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump({"meta": report["meta"], "results": results}, f, indent=2)
+            f.write("\n")
+    return 1 if report.get("regressions") else 0
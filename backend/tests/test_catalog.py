@@ -0,0 +1,52 @@
+# backend/tests/test_catalog.py
+import pytest
+
+from app.catalog import Catalog, catalog_id, normalize_id
+from bench.catalog import synthetic_tles, with_checksum
+
+
+def with_catnum(tle, field):
+    # the same TLE under another 5-character catalog number field
+    return dict(tle, line1=with_checksum(tle["line1"][:2] + field + tle["line1"][7:68]),
+                line2=with_checksum(tle["line2"][:2] + field + tle["line2"][7:68]))
+
+
+@pytest.mark.parametrize("value, expected", [
+    (25544, 25544), ("25544", 25544), ("025544", 25544), (" 25544 ", 25544), ("00005", 5),
+    ("A0001", 100001), ("a0001", 100001), ("H9999", 179999), ("J0000", 180000), ("Z9999", 339999),
+])
+def test_normalize_id(value, expected):
+    assert normalize_id(value) == expected
+
+
+@pytest.mark.parametrize("value", ["", "ISS", "I0001", "O0001", "A001", "-5", True])
+def test_normalize_id_rejects(value):
+    with pytest.raises(ValueError):
+        normalize_id(value)
+
+
+def test_ids_are_integers_in_every_spelling():
+    catalog = Catalog(":memory:")
+    tles = synthetic_tles(3)
+    tles[2] = with_catnum(tles[2], "A0001")
+    assert catalog.upsert(tles)["stored"] == 3
+    assert catalog_id(tles[2]["line1"]) == 100001
+
+    records, missing = catalog.select(["040000", 40001, "a0001", "99999", "ISS"])
+    assert [rec["catalog_id"] for rec in records] == [40000, 40001, 100001]
+    assert missing == ["99999", "ISS"]
+    assert [rec["catalog_id"] for rec in catalog.select()[0]] == [40000, 40001, 100001]
+
+    assert catalog.delete(["040001", "bogus"]) == 1
+    assert [rec["catalog_id"] for rec in catalog.select()[0]] == [40000, 100001]
+
+
+def test_filters():
+    catalog = Catalog(":memory:")
+    catalog.upsert(synthetic_tles(50))
+    records, _ = catalog.select()
+    band = [rec for rec in records if rec["apogee_km"] >= 500 and rec["perigee_km"] <= 800]
+    assert 0 < len(band) < len(records)
+    assert catalog.select(min_alt_km=500, max_alt_km=800)[0] == band
+    assert catalog.select(min_alt_km=500, max_alt_km=800, limit=2)[0] == band[:2]
+    assert catalog.select(name_prefix="bench-4000")[0] == records[:10]
@@ -0,0 +1,81 @@
+# backend/tests/test_chebyshev.py
+from datetime import datetime, timezone
+
+import numpy as np
+import pytest
+
+from app import chebyshev
+from app.chebyshev import evaluate_records, segment_cache, segment_coefficients, segment_of
+from app.ephemeris import propagate_to_grid
+from app.propagate import parse_tles
+from bench.catalog import synthetic_tles
+
+SEGMENT_S = 900.0
+
+
+@pytest.fixture
+def records():
+    segment_cache.clear()
+    yield parse_tles(synthetic_tles(3))
+    segment_cache.clear()
+
+
+def fitted_runs(monkeypatch):
+    calls = []
+    fit = chebyshev.fit_segments
+
+    def spy(records, first, last, *args):
+        calls.append((len(records), first, last))
+        return fit(records, first, last, *args)
+
+    monkeypatch.setattr(chebyshev, "fit_segments", spy)
+    return calls
+
+
+def test_fits_contiguous_runs_only(records, monkeypatch):
+    calls = fitted_runs(monkeypatch)
+    base = int(records[0]["epoch"].timestamp() // SEGMENT_S)
+    wanted = [[base, base + 1, base + 40], [base + 40], [base + 1, base]]
+    coeffs = segment_coefficients(records, wanted, SEGMENT_S)
+    # the 38 segments between the two runs of records[0] are never fitted
+    assert sorted(calls) == [(2, base, base + 1), (2, base + 40, base + 40)]
+    assert [sorted(c) for c in coeffs] == [sorted(set(w)) for w in wanted]
+    assert segment_cache.stats()["entries"] == 6
+    # each cached segment owns its data, so the cache's byte count is what it holds
+    for per_seg in coeffs:
+        for c in per_seg.values():
+            assert c.base is None and not c.flags.writeable
+
+    calls.clear()
+    segment_coefficients(records, wanted, SEGMENT_S)
+    assert calls == []
+
+
+def test_evaluate_matches_propagation(records):
+    t0 = records[0]["epoch"].timestamp()
+    stamps = t0 + np.array([10.0, 1234.5, 5 * 3600.0 + 17.0])
+    r, v = evaluate_records(records, [0, 0, 0], stamps.tolist(), SEGMENT_S)
+    for k, t in enumerate(stamps):
+        truth = np.empty((1, 1, 6))
+        propagate_to_grid(records[:1], datetime.fromtimestamp(t, timezone.utc), 1.0, 1, truth)
+        assert np.linalg.norm(r[k] - truth[0, 0, :3]) < 1e-3
+        assert np.linalg.norm(v[k] - truth[0, 0, 3:]) < 1e-6
+
+
+def test_rejects_times_far_from_epoch(records):
+    t0 = records[0]["epoch"].timestamp()
+    far, _ = segment_of([t0 + 8 * 86400.0], SEGMENT_S)
+    with pytest.raises(ValueError):
+        segment_coefficients(records[:1], [far.tolist()], SEGMENT_S, max_age_s=7 * 86400.0)
+    near, _ = segment_of([t0 - 3600.0], SEGMENT_S)
+    assert segment_coefficients(records[:1], [near.tolist()], SEGMENT_S, max_age_s=7 * 86400.0)[0]
+
+
+def test_caps_fitted_segments(records):
+    base = int(records[0]["epoch"].timestamp() // SEGMENT_S)
+    wanted = [list(range(base, base + 4))] * 3
+    with pytest.raises(ValueError):
+        segment_coefficients(records, wanted, SEGMENT_S, max_segments=11)
+    assert segment_cache.stats()["entries"] == 0
+    segment_coefficients(records, wanted, SEGMENT_S, max_segments=12)
+    assert segment_cache.stats()["entries"] == 12
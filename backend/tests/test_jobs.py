@@ -0,0 +1,32 @@
+# backend/tests/test_jobs.py
+import asyncio
+
+from app.jobs import DONE, JobManager
+
+
+def run_jobs(manager, count):
+    async def runner(job):
+        return {"n": job.kind}
+
+    async def go():
+        jobs = [manager.submit(str(n), runner) for n in range(count)]
+        await manager._queue.join()
+        await manager.shutdown()
+        return jobs
+
+    return asyncio.run(go())
+
+
+def test_keeps_only_the_latest_results():
+    manager = JobManager(workers=1, max_queued=16, max_results=3)
+    jobs = run_jobs(manager, 8)
+    assert all(job.status == DONE for job in jobs)
+    assert [job.kind for job in manager.list()] == ["5", "6", "7"]
+    assert manager.get(jobs[0].id) is None
+    assert manager.get(jobs[-1].id).result == {"n": "7"}
+
+
+def test_results_expire_after_ttl():
+    manager = JobManager(workers=1, max_queued=16, result_ttl_s=0.0)
+    run_jobs(manager, 2)
+    assert manager.list() == []
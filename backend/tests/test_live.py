@@ -0,0 +1,66 @@
+# backend/tests/test_live.py
+import asyncio
+import threading
+import time
+from datetime import datetime, timezone
+
+from app import live
+from app.live import LiveFeed
+from app.propagate import parse_tles
+from bench.catalog import synthetic_tles
+
+
+def labels(records):
+    return {rec["key"]: (rec["id"], rec["name"]) for rec in records}
+
+
+def test_subscribe_and_unsubscribe_during_a_tick(monkeypatch):
+    in_tick, tick_done = threading.Event(), threading.Event()
+    close_pairs = live.close_pairs
+
+    def slow_close_pairs(*args, **kwargs):
+        # hold the channel lock in the worker thread for a while
+        in_tick.set()
+        time.sleep(0.5)
+        tick_done.set()
+        return close_pairs(*args, **kwargs)
+
+    monkeypatch.setattr(live, "close_pairs", slow_close_pairs)
+    records = parse_tles(synthetic_tles(4, epoch=datetime.now(timezone.utc)))
+    first, second = records[:2], records[1:]
+
+    async def go():
+        feed = LiveFeed(lambda fn, *args: asyncio.to_thread(fn, *args))
+        channel, sub1 = await feed.subscribe(first, labels(first), 0.2, 50.0)
+        while not in_tick.is_set():
+            await asyncio.sleep(0.01)
+        tick_done.clear()
+
+        # the joining coroutine waits for the tick in the threadpool; the event loop doesn't
+        gaps = []
+
+        async def heartbeat():
+            while not tick_done.is_set():
+                t0 = time.perf_counter()
+                await asyncio.sleep(0.01)
+                gaps.append(time.perf_counter() - t0)
+
+        beat = asyncio.create_task(heartbeat())
+        t0 = time.perf_counter()
+        joining = asyncio.create_task(feed.subscribe(second, labels(second), 0.2, 50.0))
+        await asyncio.sleep(0)
+        feed.unsubscribe(channel, sub1)
+        assert time.perf_counter() - t0 < 0.05
+        _, sub2 = await joining
+        await beat
+        assert gaps and max(gaps) < 0.1
+
+        while len(sub2.outbox._queue) == 0 or channel.ticks < 3:
+            await asyncio.sleep(0.05)
+        keys = [rec["key"] for rec in second]
+        assert sorted(channel.keys) == sorted(keys)
+        assert channel.refs == {key: 1 for key in keys}
+        assert channel.r.shape == (3, 3)
+        await feed.shutdown()
+
+    asyncio.run(go())
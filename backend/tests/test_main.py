@@ -0,0 +1,123 @@
+# backend/tests/test_main.py
+import asyncio
+import json
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+from app import main
+from app.ephemeris import propagate_to_grid
+from app.propagate import parse_tles, propagate_batch, trajectory_cache
+from bench.asgi import request
+from bench.catalog import epoch_field, synthetic_tles, with_checksum
+
+EPOCH = datetime(2024, 1, 1, 12, tzinfo=timezone.utc)
+
+
+def with_epoch(tle, epoch, name):
+    line1 = with_checksum(tle["line1"][:18] + epoch_field(epoch) + tle["line1"][32:68])
+    return dict(tle, name=name, line1=line1)
+
+
+def common_grid_truth(tles, span_s, step_s=0.5):
+    # separations of every object on one UTC grid from the latest epoch
+    records = parse_tles(tles)
+    start = max(rec["epoch"] for rec in records)
+    count = int(span_s / step_s) + 1
+    out = np.empty((len(records), count, 6))
+    propagate_to_grid(records, start, step_s, count, out)
+    return out[:, :, :3], step_s
+
+
+def test_same_orbit_different_epochs_is_not_an_encounter():
+    tle = synthetic_tles(1, seed=4, epoch=EPOCH)[0]
+    later = with_epoch(tle, EPOCH + timedelta(minutes=45), "LATER")
+    encounters = main._check_close_approaches(propagate_batch([tle, later], 3600, 61), 50.0)
+    R, _ = common_grid_truth([tle, later], 3600)
+    assert np.linalg.norm(R[0] - R[1], axis=1).min() > 50.0
+    assert encounters == []
+
+
+def test_mixed_epoch_tca_matches_common_grid():
+    tles = synthetic_tles(200, seed=2, epoch=EPOCH)
+    tles += synthetic_tles(200, seed=2, epoch=EPOCH + timedelta(minutes=20), first_catnum=41000)
+    encounters = main._check_close_approaches(propagate_batch(tles, 3600, 61), 20.0)
+    R, step_s = common_grid_truth(tles, 3600)
+    names = [t["name"] for t in tles]
+    assert encounters
+    for enc in encounters:
+        i, j = names.index(enc["sat1"]), names.index(enc["sat2"])
+        d = np.linalg.norm(R[i] - R[j], axis=1)
+        k = int(round(enc["tca_offset_s"] / step_s))
+        lo, hi = max(k - 60, 0), min(k + 61, len(d))
+        # within the sampling error of the 0.5 s truth grid (relative speeds reach ~15 km/s)
+        assert abs(lo + d[lo:hi].argmin() - enc["tca_offset_s"] / step_s) <= 1
+        assert d[lo:hi].min() - 0.5 <= enc["min_distance_km"] <= d[lo:hi].min() + 1e-6
+        tca = datetime.fromisoformat(enc["tca"]) - timedelta(seconds=enc["tca_offset_s"])
+        assert abs((tca - (EPOCH + timedelta(minutes=20))).total_seconds()) < 1e-3  # offsets count from the latest epoch
+
+
+def test_mixed_epoch_episode_windows_are_absolute():
+    # the second half is the first half re-epoched 20 minutes later, so each
+    # of its passes must repeat a pass of the first half 1200 s later
+    tles = synthetic_tles(200, seed=2, epoch=EPOCH)
+    tles += synthetic_tles(200, seed=2, epoch=EPOCH + timedelta(minutes=20), first_catnum=41000)
+    encounters = main._check_close_approaches(propagate_batch(tles, 3600, 61), 20.0)
+    R, step_s = common_grid_truth(tles, 3600)
+    names = [t["name"] for t in tles]
+    first = {}
+    for enc in encounters:
+        assert enc["entry_offset_s"] <= enc["tca_offset_s"] <= enc["exit_offset_s"]
+        i, j = names.index(enc["sat1"]), names.index(enc["sat2"])
+        d = np.linalg.norm(R[i] - R[j], axis=1)
+        window = d[int(np.ceil(enc["entry_offset_s"] / step_s)):int(enc["exit_offset_s"] / step_s) + 1]
+        assert window.max() <= 20.0 + 0.5
+        if i < 200 and j < 200:
+            first.setdefault((i, j), []).append(enc)
+    repeated = 0
+    for enc in encounters:
+        i, j = names.index(enc["sat1"]), names.index(enc["sat2"])
+        if i < 200 or j < 200 or enc["entry_offset_s"] < 1200.0 + step_s or enc["exit_offset_s"] >= 3600.0:
+            continue
+        match = [e for e in first.get((i - 200, j - 200), [])
+                 if abs(e["tca_offset_s"] + 1200.0 - enc["tca_offset_s"]) < 0.5]
+        assert len(match) == 1
+        assert abs(match[0]["entry_offset_s"] + 1200.0 - enc["entry_offset_s"]) < 1.0
+        assert abs(match[0]["exit_offset_s"] + 1200.0 - enc["exit_offset_s"]) < 1.0
+        repeated += 1
+    assert repeated
+
+
+def test_screening_rejects_malformed_catalog_numbers():
+    good, bad = synthetic_tles(2, seed=1, epoch=EPOCH)
+    bad = dict(bad, line1=bad["line1"][:2] + "4X001" + bad["line1"][7:],
+               line2=bad["line2"][:2] + "4X001" + bad["line2"][7:])
+    session = {"start": EPOCH.isoformat(), "duration_s": 600, "step_s": 60}
+
+    r = request(main.app, "POST", "/api/screenings", dict(session, tles=[good, bad]))
+    assert r["status"] == 400
+    detail = json.loads(r["body"])["detail"]
+    assert (detail["index"], detail["name"]) == (1, bad["name"])
+
+    r = request(main.app, "POST", "/api/screenings", dict(session, tles=[good]))
+    assert r["status"] == 200
+    session_id = json.loads(r["body"])["session_id"]
+    r = request(main.app, "POST", f"/api/screenings/{session_id}/update", {"tles": [bad]})
+    assert r["status"] == 400
+    assert json.loads(r["body"])["detail"]["name"] == bad["name"]
+    request(main.app, "DELETE", f"/api/screenings/{session_id}")
+
+
+def test_streamed_chunks_are_not_cached(monkeypatch):
+    monkeypatch.setattr(main, "STREAM_CHUNK_SIZE", 16)
+    trajectory_cache.clear()
+    tles = synthetic_tles(50, seed=5, epoch=EPOCH)
+
+    async def stream():
+        return [traj async for traj in main._iter_propagated(tles, 600, 11)]
+
+    streamed = asyncio.run(stream())
+    assert [traj.name for traj in streamed] == [t["name"] for t in tles]
+    assert trajectory_cache.stats()["entries"] == 0
+    propagate_batch(tles[:5], 600, 11)  # the non-streamed path still caches
+    assert trajectory_cache.stats()["entries"] == 5
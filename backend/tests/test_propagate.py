@@ -0,0 +1,23 @@
+# backend/tests/test_propagate.py
+import time
+
+from app.propagate import parse_tles, propagate_batch, tle_cache, trajectory_cache
+from bench.catalog import synthetic_tles
+
+
+def test_fallback_epoch_is_never_cached():
+    tle_cache.clear()
+    trajectory_cache.clear()
+    good, bad = synthetic_tles(2, seed=3)
+    bad = dict(bad, line1=bad["line1"][:18] + "??????????????" + bad["line1"][32:])
+    records = parse_tles([good, bad])
+    assert "epoch_fallback" not in records[0] and records[1]["epoch_fallback"]
+
+    first = propagate_batch([good, bad], 600, 11)
+    time.sleep(0.01)
+    second = propagate_batch([good, bad], 600, 11)
+    assert second[0].epoch == first[0].epoch
+    # a cache hit would hand out the first request's "now" again
+    assert second[1].epoch > first[1].epoch
+    assert trajectory_cache.stats()["entries"] == 1
+    assert tle_cache.stats()["entries"] == 1
@@ -0,0 +1,113 @@
+# backend/tests/test_utils.py
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+
+from app.ephemeris import propagate_to_grid
+from app.propagate import mu, propagate_rk4_J2
+from app.utils import close_pairs, find_close_approaches, screen_trajectories
+
+
+def brute_pairs(pos, radius_km, inclusive=True, pair_mask=None, subset=None):
+    d = np.linalg.norm(pos[:, None] - pos[None], axis=2)
+    i, j = np.triu_indices(len(pos), k=1)
+    keep = d[i, j] <= radius_km if inclusive else d[i, j] < radius_km
+    if pair_mask is not None:
+        keep &= pair_mask(i, j)
+    if subset is not None:
+        keep &= subset[i] | subset[j]
+    return i[keep], j[keep], d[i, j][keep]
+
+
+def random_positions(rng, n):
+    # a dense shell plus a few clusters, so most cells hold several points
+    pos = rng.normal(size=(n, 3))
+    pos *= 7000.0 / np.linalg.norm(pos, axis=1, keepdims=True)
+    pos[: n // 4] = pos[0] + rng.normal(scale=30.0, size=(n // 4, 3))
+    return pos
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("radius_km", [10.0, 50.0, 400.0])
+@pytest.mark.parametrize("inclusive", [True, False])
+def test_close_pairs_matches_brute_force(seed, radius_km, inclusive):
+    pos = random_positions(np.random.default_rng(seed), 400)
+    got = close_pairs(pos, radius_km, inclusive=inclusive)
+    want = brute_pairs(pos, radius_km, inclusive=inclusive)
+    np.testing.assert_array_equal(got[0], want[0])
+    np.testing.assert_array_equal(got[1], want[1])
+    np.testing.assert_allclose(got[2], want[2])
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_close_pairs_subset_and_pair_mask(seed):
+    rng = np.random.default_rng(seed)
+    pos = random_positions(rng, 400)
+    subset = rng.random(len(pos)) < 0.1
+    group = rng.integers(0, 3, size=len(pos))
+
+    def pair_mask(i, j):
+        return group[i] != group[j]
+
+    for kwargs in ({"subset": subset}, {"pair_mask": pair_mask}, {"subset": subset, "pair_mask": pair_mask}):
+        got = close_pairs(pos, 80.0, **kwargs)
+        want = brute_pairs(pos, 80.0, **kwargs)
+        np.testing.assert_array_equal(got[0], want[0])
+        np.testing.assert_array_equal(got[1], want[1])
+        np.testing.assert_allclose(got[2], want[2])
+
+
+def test_close_pairs_degenerate_inputs():
+    assert all(len(x) == 0 for x in close_pairs(np.zeros((1, 3)), 10.0))
+    assert all(len(x) == 0 for x in close_pairs(np.zeros((5, 3)), 0.0))
+    i, j, d = close_pairs(np.zeros((3, 3)), 1.0)
+    assert list(zip(i, j)) == [(0, 1), (0, 2), (1, 2)]
+    np.testing.assert_array_equal(d, 0.0)
+
+
+def test_screen_trajectories_matches_brute_force():
+    rng = np.random.default_rng(7)
+    R = np.stack([random_positions(rng, 200) for _ in range(6)])
+    R[2, 5] = np.nan  # missing sample
+    k, i, j, d = screen_trajectories(R, 60.0)
+    want = []
+    for step in range(len(R)):
+        valid = ~np.isnan(R[step]).any(axis=1)
+        bi, bj, bd = brute_pairs(np.where(valid[:, None], R[step], 1e9), 60.0)
+        want += [(step, a, b) for a, b in zip(bi, bj) if valid[a] and valid[b]]
+    assert list(zip(k.tolist(), i.tolist(), j.tolist())) == want
+
+
+def crossing_pair(miss_km, tca_s, span_s, step_s):
+    # two circular orbits crossing at the ascending node `tca_s` seconds in,
+    # `miss_km` apart radially, sampled every `step_s` seconds
+    r = 7000.0
+    speed = np.sqrt(mu / r)
+    r_tca = np.array([[r, 0.0, 0.0], [r + miss_km, 0.0, 0.0]])
+    v_tca = np.array([[0.0, speed, 0.0], [0.0, speed * np.cos(1.0), speed * np.sin(1.0)]])
+    r0, v0 = propagate_rk4_J2(r_tca, v_tca, -tca_s, steps=int(np.ceil(tca_s / 10)))
+    epoch = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    records = [{"epoch": epoch, "r0": r0[n], "v0": v0[n]} for n in range(2)]
+
+    def sample(start_s, step, count):
+        out = np.empty((2, count, 6))
+        propagate_to_grid(records, epoch + timedelta(seconds=start_s), step, count, out)
+        return out[:, :, :3].transpose(1, 0, 2), out[:, :, 3:].transpose(1, 0, 2)
+
+    T = np.arange(0.0, span_s + step_s / 2, step_s)
+    R, V = sample(0.0, step_s, len(T))
+    fine_R, _ = sample(tca_s - 30.0, 0.01, 6001)
+    d = np.linalg.norm(fine_R[:, 1] - fine_R[:, 0], axis=1)
+    return T, R, V, tca_s - 30.0 + 0.01 * d.argmin(), d.min()
+
+
+@pytest.mark.parametrize("step_s", [60.0, 256.0])
+def test_hermite_tca_matches_fine_grid(step_s):
+    T, R, V, true_tca, true_miss = crossing_pair(12.0, 1000.0, 2048.0, step_s)
+    hits = find_close_approaches(T, R, V, threshold_km=50.0)
+    assert len(hits["i"]) == 1
+    assert abs(hits["tca"][0] - true_tca) < 0.05
+    assert abs(hits["distance_km"][0] - true_miss) < 0.05
+    # the sampled distances alone are nowhere near the true miss distance
+    assert np.linalg.norm(R[:, 1] - R[:, 0], axis=1).min() > true_miss + 50.0